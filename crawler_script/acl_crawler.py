@@ -9,6 +9,9 @@ from urllib.parse import urljoin
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from dedup_index import DedupIndex
+from downloads import mark_redownloaded, pending_redownloads, save_response
+
 BASE = "https://aclanthology.org"
 EVENTS_URL = "https://aclanthology.org/events/"
 
@@ -47,6 +50,8 @@ else:
     data = []
 
 existing_titles = set(x["paper_name"] for x in data)
+dedup = DedupIndex()
+requeued = pending_redownloads()
 
 def save_json():
     with open(JSON_FILE, "w", encoding="utf-8") as f:
@@ -73,10 +78,7 @@ def download_file(url, path):
     try:
         with session.get(url, stream=True, timeout=30) as r:
             r.raise_for_status()
-            with open(path, "wb") as f:
-                for chunk in r.iter_content(8192):
-                    if chunk:
-                        f.write(chunk)
+            save_response(r, path)
 
         time.sleep(random.uniform(1.5, 3.5))
         return True
@@ -165,8 +167,12 @@ def process_paper(paper_url, year, conf_type):
         return
 
     paper_name = title_tag.text.strip()
+    lead = soup.find("p", class_="lead")
+    authors = [a.get_text(strip=True) for a in lead.find_all("a")] if lead else []
+    file_name = f"{year}_{sanitize(paper_name)}.pdf"
+    redownload = file_name in requeued
 
-    if paper_name in existing_titles:
+    if paper_name in existing_titles and not redownload:
         return
 
     pdf_link = None
@@ -178,13 +184,16 @@ def process_paper(paper_url, year, conf_type):
     if not pdf_link:
         return
 
-    safe_name = sanitize(paper_name)
-    file_path = os.path.join(SAVE_DIR, f"{year}_{safe_name}.pdf")
-
-    print("Downloading:", paper_name)
+    file_path = os.path.join(SAVE_DIR, file_name)
 
-    success = download_file(pdf_link, file_path)
-    if not success:
+    # Quarantined as broken by the extractor → fetch it again
+    if redownload:
+        print("Re-downloading:", paper_name)
+        if download_file(pdf_link, file_path):
+            dedup.add(file_path, paper_name, "ACL", pdf_path=file_path,
+                      year=year, authors=authors)
+            mark_redownloaded(file_name)
+            requeued.discard(file_name)
         return
 
     record = {
@@ -195,6 +204,26 @@ def process_paper(paper_url, year, conf_type):
         "paper_path": file_path
     }
 
+    # Same paper already crawled from another source → link, don't download
+    canonical = dedup.find_title(paper_name, year, authors)
+    if not canonical:
+        print("Downloading:", paper_name)
+
+        success = download_file(pdf_link, file_path)
+        if not success:
+            return
+
+        canonical = dedup.find_content(file_path)
+        if canonical:
+            os.remove(file_path)
+
+    if canonical:
+        print("Duplicate of:", canonical)
+        record["paper_path"] = canonical
+        record["duplicate_of"] = canonical
+    dedup.add(file_path, paper_name, "ACL", pdf_path=file_path, canonical=canonical,
+              year=year, authors=authors)
+
     data.append(record)
     existing_titles.add(paper_name)
     save_json()
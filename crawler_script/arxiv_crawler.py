@@ -1,10 +1,14 @@
 import os
+import re
 import json
 import time
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+from dedup_index import DedupIndex
+from downloads import mark_redownloaded, pending_redownloads, save_response
+
 BASE_URL = "https://arxiv.org/list/cs/recent"
 BASE_DOMAIN = "https://arxiv.org"
 
@@ -23,6 +27,8 @@ else:
     json_data = []
 
 existing_titles = set(item["paper_name"] for item in json_data)
+dedup = DedupIndex()
+requeued = pending_redownloads()
 
 
 def save_json():
@@ -65,8 +71,17 @@ def get_papers(skip):
         title = title_div.text.replace("Title:", "").strip()
         title = " ".join(title.split())
 
+        authors_div = dd.find("div", class_="list-authors")
+        authors = [a.get_text(strip=True) for a in authors_div.find_all("a")] if authors_div else []
+
+        # New-style arXiv IDs start with YYMM
+        id_match = re.search(r"/(\d{2})\d{2}\.\d{4,5}", pdf_url)
+        year = 2000 + int(id_match.group(1)) if id_match else None
+
         papers.append({
             "paper_name": title,
+            "authors": authors,
+            "year": year,
             "pdf_url": pdf_url
         })
 
@@ -75,10 +90,8 @@ def get_papers(skip):
 
 def download_pdf(url, path):
     r = requests.get(url, headers=HEADERS, stream=True)
-    with open(path, "wb") as f:
-        for chunk in r.iter_content(8192):
-            if chunk:
-                f.write(chunk)
+    r.raise_for_status()
+    save_response(r, path)
 
 
 def main():
@@ -95,25 +108,52 @@ def main():
 
         for paper in papers:
 
-            if paper["paper_name"] in existing_titles:
-                continue
-
             safe = sanitize(paper["paper_name"])[:150]
             filename = f"{safe}.pdf"
             local_path = os.path.join(OUTPUT_DIR, filename)
 
+            # Quarantined as broken by the extractor → fetch it again
+            if filename in requeued:
+                try:
+                    print("Re-downloading:", paper["paper_name"])
+                    download_pdf(paper["pdf_url"], local_path)
+                    dedup.add(local_path, paper["paper_name"], "arXiv", pdf_path=local_path,
+                              year=paper["year"], authors=paper["authors"])
+                    mark_redownloaded(filename)
+                    requeued.discard(filename)
+                except Exception as e:
+                    print("Error:", e)
+                continue
+
+            if paper["paper_name"] in existing_titles:
+                continue
+
             if os.path.exists(local_path):
                 continue
 
-            print("Downloading:", paper["paper_name"])
+            record = {
+                "paper_name": paper["paper_name"],
+                "paper_path": local_path
+            }
 
             try:
-                download_pdf(paper["pdf_url"], local_path)
-
-                record = {
-                    "paper_name": paper["paper_name"],
-                    "paper_path": local_path
-                }
+                # Same paper already crawled from another source → link, don't download
+                canonical = dedup.find_title(paper["paper_name"], paper["year"], paper["authors"])
+                if not canonical:
+                    print("Downloading:", paper["paper_name"])
+                    download_pdf(paper["pdf_url"], local_path)
+
+                    canonical = dedup.find_content(local_path)
+                    if canonical:
+                        os.remove(local_path)
+
+                if canonical:
+                    print("Duplicate of:", canonical)
+                    record["paper_path"] = canonical
+                    record["duplicate_of"] = canonical
+                dedup.add(local_path, paper["paper_name"], "arXiv",
+                          pdf_path=local_path, canonical=canonical,
+                          year=paper["year"], authors=paper["authors"])
 
                 json_data.append(record)
                 existing_titles.add(paper["paper_name"])
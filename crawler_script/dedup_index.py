@@ -0,0 +1,253 @@
+"""
+dedup_index.py — Cross-source near-duplicate index shared by the crawlers.
+
+The same paper shows up on arXiv and in ACL/IJCAI proceedings under
+slightly different titles ("Mobile-O: Unified ..." vs "Mobile-O Unified ..."),
+so exact `paper_name` matching downloads and extracts it twice. This index
+catches those duplicates at two points:
+
+  * before download — token-set MinHash over the normalised title, with LSH
+    banding for lookup and an exact Jaccard check on the candidates; a
+    title match only counts when the two records share an author surname,
+    or (when either side has no authors) their years are at most
+    YEAR_SLACK apart, so short or generic titles never drop a different
+    paper on the title alone;
+  * after download  — SHA-256 of the PDF bytes, plus a MinHash over word
+    5-grams of the first pages' text (PyMuPDF) to catch re-typeset copies.
+
+Every record is linked to one canonical record (the first copy seen). The
+index is an append-only JSON-lines file shared by all three crawlers, so
+recording a paper costs one line rather than a rewrite of the whole index.
+It lives at the repository root (DEDUP_INDEX_FILE overrides), whatever
+directory a crawler is started from.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+DEDUP_FILE = os.environ.get(
+    "DEDUP_INDEX_FILE",
+    os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dedup_index.jsonl")),
+)
+
+NUM_PERM = 64
+BANDS = 16                       # 16 bands × 4 rows ≈ 0.5 LSH threshold
+TITLE_THRESHOLD = 0.8            # exact token-set Jaccard to call titles equal
+CONTENT_THRESHOLD = 0.9          # estimated Jaccard on text 5-grams
+CONTENT_PAGES = 2                # pages read for the text fingerprint
+YEAR_SLACK = 1                   # preprint and proceedings are often a year apart
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutations so signatures stay comparable across runs and crawlers.
+_PERMS = []
+_seed = 0x9E3779B97F4A7C15
+for _ in range(NUM_PERM):
+    _seed = (_seed * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+    _a = (_seed >> 3) % _MERSENNE or 1
+    _seed = (_seed * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+    _PERMS.append((_a, (_seed >> 3) % _MERSENNE))
+
+
+# ----------------------------
+# Normalisation + MinHash
+# ----------------------------
+
+def normalize_title(title):
+    text = unicodedata.normalize("NFKD", title)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def author_surnames(authors):
+    """Normalised last names of an author list ("Jane Q. Doe" → "doe")."""
+    names = set()
+    for author in authors or ():
+        words = normalize_title(author).split()
+        if words:
+            names.add(words[-1])
+    return sorted(names)
+
+
+def _parse_year(year):
+    try:
+        return int(str(year)[:4])
+    except (TypeError, ValueError):
+        return None
+
+
+def _same_paper(rec, surnames, year):
+    """Corroborate a title match: shared author surname, else nearby years."""
+    theirs = rec.get("authors")
+    if surnames and theirs:
+        return bool(set(surnames) & set(theirs))
+    other = rec.get("year")
+    if year is not None and other is not None:
+        return abs(year - other) <= YEAR_SLACK
+    return False
+
+
+def _hash_token(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+def minhash(tokens):
+    hashes = [_hash_token(t) for t in set(tokens)]
+    if not hashes:
+        return []
+    return [min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes) for a, b in _PERMS]
+
+
+def estimate_jaccard(sig_a, sig_b):
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def _bands(sig):
+    rows = len(sig) // BANDS
+    return [f"{i}:{'.'.join(map(str, sig[i * rows:(i + 1) * rows]))}" for i in range(BANDS)]
+
+
+def _jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_shingles(path, pages=CONTENT_PAGES, n=5):
+    """Word n-grams of the first `pages` pages; [] when PyMuPDF is unavailable."""
+    try:
+        import fitz
+    except ImportError:
+        return []
+    try:
+        with fitz.open(path) as doc:
+            text = " ".join(doc[i].get_text() for i in range(min(pages, doc.page_count)))
+    except Exception:
+        return []
+    words = normalize_title(text).split()
+    return [" ".join(words[i:i + n]) for i in range(max(0, len(words) - n + 1))]
+
+
+# ----------------------------
+# Index
+# ----------------------------
+
+class DedupIndex:
+
+    def __init__(self, path=DEDUP_FILE):
+        self.path = path
+        self.records = {}
+        self._title_bands = {}
+        self._text_bands = {}
+        self._sha = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    record_id = rec.pop("id")
+                    self.records[record_id] = rec
+                    self._register(record_id, rec)
+
+    def _append(self, record_id, rec):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": record_id, **rec}, ensure_ascii=False) + "\n")
+
+    def _register(self, record_id, rec):
+        if rec.get("canonical", record_id) != record_id:
+            return  # only canonical records are match targets
+        for band in _bands(rec["title_sig"]) if rec.get("title_sig") else []:
+            self._title_bands.setdefault(band, []).append(record_id)
+        for band in _bands(rec["text_sig"]) if rec.get("text_sig") else []:
+            self._text_bands.setdefault(band, []).append(record_id)
+        if rec.get("sha256"):
+            self._sha.setdefault(rec["sha256"], record_id)
+
+    def canonical_of(self, record_id):
+        rec = self.records.get(record_id)
+        return rec.get("canonical", record_id) if rec else None
+
+    # -- before download --
+
+    def find_title(self, title, year=None, authors=None):
+        """
+        Canonical record id of the same paper by title, or None.
+
+        The title must be near-identical and the match corroborated by
+        `authors` or `year` (see `_same_paper`); without either, title
+        matches are never trusted and the content check after download
+        decides.
+        """
+        surnames = author_surnames(authors)
+        year = _parse_year(year)
+        tokens = normalize_title(title).split()
+        sig = minhash(tokens)
+        if not sig:
+            return None
+        seen = set()
+        for band in _bands(sig):
+            for record_id in self._title_bands.get(band, []):
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                rec = self.records[record_id]
+                if (_jaccard(tokens, rec["norm_title"].split()) >= TITLE_THRESHOLD
+                        and _same_paper(rec, surnames, year)):
+                    return record_id
+        return None
+
+    # -- after download / before extraction --
+
+    def find_content(self, pdf_path):
+        """Canonical record id of a PDF with the same bytes or near-identical text, or None."""
+        sha = file_sha256(pdf_path)
+        if sha in self._sha:
+            return self._sha[sha]
+        sig = minhash(text_shingles(pdf_path))
+        if not sig:
+            return None
+        for band in _bands(sig):
+            for record_id in self._text_bands.get(band, []):
+                if estimate_jaccard(sig, self.records[record_id]["text_sig"]) >= CONTENT_THRESHOLD:
+                    return record_id
+        return None
+
+    def add(self, record_id, title, source, pdf_path=None, canonical=None,
+            year=None, authors=None):
+        """Record a paper; `canonical` links it to an existing record instead."""
+        norm = normalize_title(title)
+        rec = {
+            "title": title,
+            "norm_title": norm,
+            "source": source,
+            "title_sig": minhash(norm.split()),
+        }
+        if _parse_year(year) is not None:
+            rec["year"] = _parse_year(year)
+        if authors:
+            rec["authors"] = author_surnames(authors)
+        if canonical and canonical != record_id:
+            rec["canonical"] = self.canonical_of(canonical) or canonical
+        elif pdf_path and os.path.exists(pdf_path):
+            rec["sha256"] = file_sha256(pdf_path)
+            rec["text_sig"] = minhash(text_shingles(pdf_path))
+        self.records[record_id] = rec
+        self._register(record_id, rec)
+        self._append(record_id, rec)
+        return rec.get("canonical", record_id)
@@ -0,0 +1,88 @@
+"""
+downloads.py — Safe PDF downloads and the re-download queue.
+
+A download cut off half-way used to be left at its final path, where the
+crawler's "already have it" check skipped it forever and the extractor
+spent its whole per-file timeout on it. Downloads now go to `<path>.part`
+and are renamed into place only once they start with `%PDF` and, when the
+server sent a Content-Length, have exactly that many bytes.
+
+Files that still turn out broken are moved aside by the extractor's
+pre-flight check (extract_script/pdf_check.py), which appends them to
+quarantine/requeue.jsonl. The crawlers read that queue on start-up and
+download the listed files again, bypassing their title/path/dedup checks.
+"""
+
+import json
+import os
+import time
+
+REQUEUE_FILE = os.environ.get(
+    "PDF_REQUEUE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "quarantine", "requeue.jsonl"),
+)
+
+PDF_MAGIC = b"%PDF"
+
+
+def expected_length(response):
+    """Content-Length of an unencoded response, or None."""
+    if response.headers.get("Content-Encoding"):
+        return None  # iter_content decodes, so the byte count would differ
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def save_response(response, path):
+    """Stream `response` to `<path>.part`, check it, then rename it to `path`."""
+    part_path = path + ".part"
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in response.iter_content(8192):
+                if chunk:
+                    f.write(chunk)
+        commit_download(part_path, path, expected_length(response))
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def commit_download(part_path, path, expected_bytes=None):
+    """Rename a finished download into place; ValueError if it is not a whole PDF."""
+    size = os.path.getsize(part_path)
+    if expected_bytes is not None and size != expected_bytes:
+        raise ValueError(f"incomplete download: {size} of {expected_bytes} bytes")
+    with open(part_path, "rb") as f:
+        if not f.read(1024).lstrip().startswith(PDF_MAGIC):
+            raise ValueError("not a PDF (no %PDF header)")
+    os.replace(part_path, path)
+
+
+# ----------------------------
+# Re-download queue
+# ----------------------------
+
+def _queue_entries(path=REQUEUE_FILE):
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+
+
+def pending_redownloads(path=REQUEUE_FILE):
+    """File names whose latest queue entry is still `quarantined`."""
+    status = {}
+    for entry in _queue_entries(path):
+        status[entry["file"]] = entry.get("status")
+    return {name for name, s in status.items() if s == "quarantined"}
+
+
+def mark_redownloaded(name, path=REQUEUE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"file": name, "status": "redownloaded", "at": time.time()},
+                           ensure_ascii=False) + "\n")
@@ -6,6 +6,9 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+from dedup_index import DedupIndex
+from downloads import mark_redownloaded, pending_redownloads, save_response
+
 BASE = "https://www.ijcai.org"
 ALL_PROC = f"{BASE}/all_proceedings"
 
@@ -23,6 +26,9 @@ if os.path.exists(JSON_FILE):
 else:
     all_data = []
 
+dedup = DedupIndex()
+requeued = pending_redownloads()
+
 
 def save_json():
     with open(JSON_FILE, "w", encoding="utf-8") as f:
@@ -77,8 +83,12 @@ def extract_papers(page_url):
 
         pdf_url = urljoin(page_url, pdf_link["href"])
 
+        authors_div = block.find("div", class_="authors")
+        authors = [a.strip() for a in authors_div.get_text().split(",") if a.strip()] if authors_div else []
+
         papers.append({
             "paper_name": title,
+            "authors": authors,
             "year": year,
             "conference_name": conf_name,
             "workshop_or_main": "main",
@@ -90,10 +100,8 @@ def extract_papers(page_url):
 
 def download_pdf(url, path):
     r = requests.get(url, headers=HEADERS, stream=True)
-    with open(path, "wb") as f:
-        for chunk in r.iter_content(8192):
-            if chunk:
-                f.write(chunk)
+    r.raise_for_status()
+    save_response(r, path)
 
 
 def main():
@@ -114,21 +122,54 @@ def main():
             filename = f"{paper['year']}_{safe_title}.pdf"
             local_path = os.path.join(OUTPUT_DIR, filename)
 
+            # Quarantined as broken by the extractor → fetch it again
+            if filename in requeued:
+                try:
+                    print("Re-downloading:", paper["paper_name"])
+                    download_pdf(paper["pdf_url"], local_path)
+                    dedup.add(local_path, paper["paper_name"], "IJCAI", pdf_path=local_path,
+                              year=paper["year"], authors=paper["authors"])
+                    mark_redownloaded(filename)
+                    requeued.discard(filename)
+                except Exception as e:
+                    print("Error:", e)
+                continue
+
             if os.path.exists(local_path):
                 continue
 
-            print("Downloading:", paper["paper_name"])
+            record = {
+                "paper_name": paper["paper_name"],
+                "year": paper["year"],
+                "conference_name": paper["conference_name"],
+                "workshop_or_main": paper["workshop_or_main"],
+                "paper_path": local_path
+            }
+
+            # Already linked as a duplicate on an earlier run
+            if dedup.canonical_of(local_path):
+                continue
 
             try:
-                download_pdf(paper["pdf_url"], local_path)
-
-                all_data.append({
-                    "paper_name": paper["paper_name"],
-                    "year": paper["year"],
-                    "conference_name": paper["conference_name"],
-                    "workshop_or_main": paper["workshop_or_main"],
-                    "paper_path": local_path
-                })
+                # Same paper already crawled from another source → link, don't download
+                canonical = dedup.find_title(paper["paper_name"], paper["year"], paper["authors"])
+                if not canonical:
+                    print("Downloading:", paper["paper_name"])
+                    download_pdf(paper["pdf_url"], local_path)
+
+                    canonical = dedup.find_content(local_path)
+                    if canonical:
+                        os.remove(local_path)
+
+                if canonical:
+                    print("Duplicate of:", canonical)
+                    record["paper_path"] = canonical
+                    record["duplicate_of"] = canonical
+                dedup.add(local_path, paper["paper_name"], "IJCAI",
+                          pdf_path=local_path, canonical=canonical,
+                          year=paper["year"], authors=paper["authors"])
+
+                all_data.append(record)
 
                 save_json()
                 time.sleep(0.2)
@@ -0,0 +1,9 @@
+"""
+extract_script — PDF → JSON extraction.
+
+The scripts here are run from this directory and import each other by bare
+module name (`from citations import ...`). The package marker lets the
+indexer import the modules it shares with extraction — citations,
+span_mask, sentences, tables — as `extract_script.<module>`, so text is
+normalised the same way on both sides.
+"""
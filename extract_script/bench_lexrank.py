@@ -0,0 +1,82 @@
+"""
+bench_lexrank.py — NumPy LexRank vs. sumy's LexRankSummarizer.
+
+Summarises every section `summary` of the processed outputs in the given
+directories (default: json_output/ and json_output_v2/) with
+`lexrank.summarize_texts` and, when sumy is installed, with sumy's
+`LexRankSummarizer` over the same `AcademicTokenizer` sentences. Reports
+sections/s for both and how many sections got exactly the same top
+sentences.
+
+    python bench_lexrank.py [json_dir ...] [--sentences N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+from bench_sentences import load_texts
+from lexrank import summarize_texts
+
+
+def _sumy_summarizer() -> Callable[[str, int], List[str]]:
+    from sumy.parsers.plaintext import PlaintextParser  # type: ignore
+    from sumy.summarizers.lex_rank import LexRankSummarizer  # type: ignore
+    from sentences import AcademicTokenizer
+
+    tokenizer = AcademicTokenizer()
+    summarizer = LexRankSummarizer()
+
+    def run(text: str, count: int) -> List[str]:
+        document = PlaintextParser.from_string(text, tokenizer).document
+        return [str(s) for s in summarizer(document, count)]
+    return run
+
+
+def _time(fn: Callable[[], List], repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main(argv: List[str]) -> int:
+    opts = {"--sentences": 2, "--repeat": 3}
+    for flag in opts:
+        if flag in argv:
+            i = argv.index(flag)
+            opts[flag] = int(argv[i + 1])
+            argv = argv[:i] + argv[i + 2:]
+    count, repeat = opts["--sentences"], opts["--repeat"]
+    here = Path(__file__).parent
+    dirs = argv or [str(here / "json_output"), str(here / "json_output_v2")]
+    texts: Sequence[str] = load_texts(dirs)
+    if not texts:
+        print(f"No section text found in {dirs}")
+        return 1
+
+    secs, ours = _time(lambda: summarize_texts(texts, count), repeat)
+    print(f"numpy   {len(texts) / secs:10.1f} sections/s  ({secs * 1e3:.1f} ms for {len(texts)})")
+    try:
+        sumy = _sumy_summarizer()
+    except ImportError:
+        print("sumy    skipped (pip install sumy)")
+        return 0
+    secs_ref, ref = _time(lambda: [sumy(t, count) for t in texts], repeat)
+    print(f"sumy    {len(texts) / secs_ref:10.1f} sections/s  ({secs_ref * 1e3:.1f} ms)")
+    same = sum(1 for a, b in zip(ours, ref) if a == b)
+    print(f"speed-up {secs_ref / secs:.1f}x; identical top-{count} sentences in "
+          f"{same}/{len(texts)} sections")
+    for text, a, b in zip(texts, ours, ref):
+        if a != b:
+            print(f"  differs: {text[:60]!r}…\n    numpy: {a}\n    sumy:  {b}")
+    return 0 if same == len(texts) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
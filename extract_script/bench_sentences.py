@@ -0,0 +1,96 @@
+"""
+bench_sentences.py — Sentence splitter throughput vs. NLTK punkt.
+
+Splits every section `summary` of the processed outputs in the given
+directories (default: json_output/ and json_output_v2/) with
+`sentences.split_sentences` and, when NLTK and its punkt data are
+installed, with `nltk.sent_tokenize`. Reports MB/s and sentences/s for
+each, and how many boundaries the two agree on.
+
+    python bench_sentences.py [json_dir ...] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence, Set
+
+from json_writer import read_json
+from sentences import split_sentences
+
+_split_uncached = split_sentences.__wrapped__
+
+
+def load_texts(dirs: Sequence[str]) -> List[str]:
+    texts = []
+    for d in dirs:
+        for path in sorted(Path(d).glob("*_processed.json*")):
+            doc = read_json(path)
+            texts += [s.get("summary", "") for s in doc.get("sections", []) if s.get("summary")]
+    return texts
+
+
+def _boundaries(text: str, sentences: Sequence[str]) -> Set[int]:
+    """Character offsets where each sentence ends, found back in `text`."""
+    ends, pos = set(), 0
+    for sentence in sentences:
+        at = text.find(sentence, pos)
+        if at < 0:
+            continue
+        pos = at + len(sentence)
+        ends.add(pos)
+    return ends
+
+
+def bench(name: str, split: Callable[[str], Sequence[str]], texts: List[str],
+          repeat: int) -> List[Sequence[str]]:
+    n_chars = sum(len(t) for t in texts)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [split(t) for t in texts]
+        best = min(best, time.perf_counter() - start)
+    n_sent = sum(len(s) for s in out)
+    print(f"{name:<10} {n_chars / best / 1e6:8.2f} MB/s  {n_sent / best:12,.0f} sent/s  "
+          f"({n_sent} sentences, {best * 1e3:.1f} ms)")
+    return out
+
+
+def main(argv: List[str]) -> int:
+    repeat = 5
+    if "--repeat" in argv:
+        i = argv.index("--repeat")
+        repeat = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    here = Path(__file__).parent
+    dirs = argv or [str(here / "json_output"), str(here / "json_output_v2")]
+    texts = load_texts(dirs)
+    if not texts:
+        print(f"No section text found in {dirs}")
+        return 1
+    print(f"{len(texts)} sections, {sum(len(t) for t in texts) / 1e6:.2f} MB")
+
+    ours = bench("academic", _split_uncached, texts, repeat)
+    try:
+        import nltk  # type: ignore
+        nltk.data.find("tokenizers/punkt_tab")
+    except (ImportError, LookupError):
+        print("punkt      skipped (pip install nltk; nltk.download('punkt_tab'))")
+        return 0
+    punkt = bench("punkt", nltk.sent_tokenize, texts, repeat)
+
+    agree = total_ours = total_punkt = 0
+    for text, a, b in zip(texts, ours, punkt):
+        ea, eb = _boundaries(text, a), _boundaries(text, b)
+        agree += len(ea & eb)
+        total_ours += len(ea)
+        total_punkt += len(eb)
+    print(f"boundaries: {agree} shared, {total_ours - agree} only academic, "
+          f"{total_punkt - agree} only punkt")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,192 @@
+"""
+doc_identity.py — Stable document IDs and crawl metadata.
+
+A document's ID is derived from the SHA-256 of its PDF bytes:
+
+    paper_<first DOC_ID_HEX hex digits of sha256>
+
+so the same PDF gets the same `doc_id` on every run and on every machine,
+and the same paper crawled twice under different names collapses to one ID.
+Crawl metadata (collection, title, year, venue, track) is looked up in the
+crawler manifests under json/*.json by PDF file name.
+
+IDs written before this scheme looked like `paper_<stem>_<YYYYMMDD>`.
+`migrate_doc_ids` rewrites those outputs in place and records every
+old → new pair in <output_dir>/doc_id_map.json, which `IdMap.resolve`
+uses to translate IDs held by older indexes or reports.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from json_writer import read_json, write_json
+
+logger = logging.getLogger("doc_identity")
+
+DOC_ID_PREFIX = "paper_"
+DOC_ID_HEX = 16                       # 64 bits: collision-free far beyond corpus size
+ID_MAP_FILENAME = "doc_id_map.json"
+CATALOG_DIR = Path(os.environ.get(
+    "SOURCE_CATALOG_DIR", Path(__file__).resolve().parent.parent / "json"
+))
+
+_LEGACY_ID_REGEX = re.compile(r"^paper_(?P<stem>.+)_(?P<date>\d{8})$")
+_KEY_REGEX = re.compile(r"[^a-z0-9]+")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def doc_id_from_hash(content_hash: str) -> str:
+    return DOC_ID_PREFIX + content_hash[:DOC_ID_HEX]
+
+
+def is_legacy_doc_id(doc_id: str) -> bool:
+    return bool(_LEGACY_ID_REGEX.match(doc_id or ""))
+
+
+def _name_key(name: str) -> str:
+    """File names from Windows-style manifests and the local disk, compared loosely."""
+    base = name.replace("\\", "/").rsplit("/", 1)[-1]
+    if base.lower().endswith(".pdf"):
+        base = base[:-4]
+    return _KEY_REGEX.sub("", base.lower())
+
+
+class SourceCatalog:
+    """
+    Crawl metadata keyed by PDF file name, from the crawler manifests.
+
+    Each manifest is a JSON list of `{paper_name, paper_path, year?,
+    conference_name?, workshop_or_main*?}`; the collection is the manifest
+    name without `_json` (acl, arxiv, ijcai).
+    """
+
+    def __init__(self, records: Optional[Dict[str, Dict]] = None) -> None:
+        self._records = records or {}
+
+    @classmethod
+    def load(cls, catalog_dir: Path = CATALOG_DIR) -> "SourceCatalog":
+        records: Dict[str, Dict] = {}
+        for manifest in sorted(Path(catalog_dir).glob("*.json")):
+            collection = manifest.stem.replace("_json", "")
+            try:
+                with manifest.open(encoding="utf-8") as fh:
+                    entries = json.load(fh)
+            except (OSError, ValueError) as exc:
+                logger.warning("Skipping unreadable manifest %s: %s", manifest, exc)
+                continue
+            for entry in entries:
+                key = _name_key(entry.get("paper_path", ""))
+                if key and key not in records:
+                    records[key] = _source_record(collection, entry)
+        logger.info("Source catalog: %d paper(s) from %s", len(records), catalog_dir)
+        return cls(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def lookup(self, pdf_path: str) -> Optional[Dict]:
+        return self._records.get(_name_key(pdf_path))
+
+
+def _source_record(collection: str, entry: Dict) -> Dict:
+    year = str(entry.get("year", "") or "")
+    return {
+        "collection": collection,
+        "title": entry.get("paper_name", ""),
+        "year": int(year) if year.isdigit() else None,
+        "venue": entry.get("conference_name") or None,
+        "track": entry.get("workshop_or_main_conference") or entry.get("workshop_or_main") or None,
+    }
+
+
+_catalog: Optional[SourceCatalog] = None
+
+
+def source_metadata(pdf_path: str) -> Optional[Dict]:
+    """Crawl metadata for `pdf_path`, or None if no manifest lists it."""
+    global _catalog
+    if _catalog is None:
+        _catalog = SourceCatalog.load()
+    return _catalog.lookup(pdf_path)
+
+
+# ---------------------------------------------------------------------------
+# Legacy ID lookup table
+# ---------------------------------------------------------------------------
+
+
+class IdMap:
+    """old doc_id → new doc_id, persisted as <output_dir>/doc_id_map.json."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.mapping: Dict[str, str] = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                self.mapping = json.load(fh)
+
+    @classmethod
+    def for_output_dir(cls, output_dir: str) -> "IdMap":
+        return cls(Path(output_dir) / ID_MAP_FILENAME)
+
+    def add(self, old_id: str, new_id: str) -> None:
+        if old_id and old_id != new_id:
+            self.mapping[old_id] = new_id
+
+    def resolve(self, doc_id: str) -> str:
+        """The current ID for `doc_id` (itself if it was never remapped)."""
+        return self.mapping.get(doc_id, doc_id)
+
+    def save(self) -> None:
+        write_json(dict(sorted(self.mapping.items())), self.path, compact=False)
+
+
+def migrate_doc_ids(output_paths: Iterable[Path], output_dir: str,
+                    hash_for: Dict[str, str], pdf_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rewrite legacy `doc_id`s to content-derived ones and record the mapping.
+
+    `hash_for` maps output path → PDF content hash where already known (the
+    job ledger has it for every converted file); otherwise the PDF is looked
+    up as <pdf_dir>/<stem>.pdf and hashed. Outputs whose PDF cannot be found
+    keep their ID and are counted as `missing`.
+    """
+    id_map = IdMap.for_output_dir(output_dir)
+    stats = {"migrated": 0, "current": 0, "missing": 0}
+    for path in output_paths:
+        doc = read_json(path)
+        old_id = doc.get("doc_id", "")
+        if old_id and not is_legacy_doc_id(old_id):
+            stats["current"] += 1
+            continue
+        stem = path.name.split("_processed", 1)[0]
+        digest = hash_for.get(str(path))
+        pdf_path = Path(pdf_dir) / f"{stem}.pdf" if pdf_dir else None
+        if digest is None and pdf_path is not None and pdf_path.exists():
+            digest = file_sha256(str(pdf_path))
+        if digest is None:
+            logger.warning("No PDF found for %s — keeping %s", path.name, old_id)
+            stats["missing"] += 1
+            continue
+        new_id = doc_id_from_hash(digest)
+        doc = {"doc_id": new_id, **{k: v for k, v in doc.items() if k != "doc_id"}}
+        doc.setdefault("source", source_metadata(f"{stem}.pdf"))
+        write_json(doc, path)
+        id_map.add(old_id, new_id)
+        stats["migrated"] += 1
+    id_map.save()
+    return stats
@@ -21,17 +21,27 @@ Fixed issues:
 
 import os
 import re
-import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
+from functools import lru_cache
+
+from doc_identity import doc_id_from_hash, file_sha256, source_metadata
+from json_writer import JsonWriter, read_json, read_text, write_json
+from lexrank import summarize, summarize_texts
+from markdown_store import MarkdownStore
+from ocr_plan import scan_pages
+from sentences import AcademicTokenizer
+from tables import tables_from_document
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
 BATCH_FILE_TIMEOUT = 300   # seconds — max time per PDF in batch mode
+OUTPUT_COMPACT = os.environ.get("OUTPUT_COMPACT", "1") == "1"   # 0 = indent=2
+SUMMARY_SENTENCES = int(os.environ.get("SUMMARY_SENTENCES", "0"))   # 0 = keep full section text
 
 # ---------------------------------------------------------------------------
 # Citation regex patterns
@@ -50,11 +60,13 @@ CITATION_REGEX = re.compile('|'.join(CITATION_PATTERNS))
 # ---------------------------------------------------------------------------
 
 def _generate_document_id(pdf_path: str) -> str:
-    """Generate a unique document ID from PDF filename and current date."""
-    pdf_name = Path(pdf_path).stem
-    pdf_name_clean = re.sub(r'[^a-zA-Z0-9_]', '_', pdf_name)
-    timestamp = datetime.now().strftime("%Y%m%d")
-    return f"paper_{pdf_name_clean}_{timestamp}"
+    """
+    Stable document ID from the PDF bytes (see doc_identity.py), so re-runs
+    keep the same ID. Empty when the PDF is not on disk (re-parse).
+    """
+    if not os.path.exists(pdf_path):
+        return ""
+    return doc_id_from_hash(file_sha256(pdf_path))
 
 
 # ---------------------------------------------------------------------------
@@ -86,7 +98,10 @@ def extract_pdf_content(pdf_path: str) -> Dict:
     # Device: "cpu" | "cuda" (NVIDIA GPU) | "mps" (Mac Apple Silicon)
     pipeline_options = PdfPipelineOptions()
     pipeline_options.accelerator_options.device = "cpu"
-    pipeline_options.do_ocr = True
+    # OCR only when the PyMuPDF pre-pass finds a page without a usable text
+    # layer (scans, image-only pages); unknown → OCR to be safe.
+    ocr_flags = scan_pages(pdf_path)
+    pipeline_options.do_ocr = ocr_flags is None or any(ocr_flags)
 
     converter = DocumentConverter(
         format_options={
@@ -103,8 +118,10 @@ def extract_pdf_content(pdf_path: str) -> Dict:
         full_text = str(document)
 
     # --- Metadata ---
+    docling_title = getattr(document, 'title', None)
     metadata = {
-        "title": getattr(document, 'title', None) or _extract_title_from_text(full_text),
+        "title": docling_title or _extract_title_from_text(full_text),
+        "title_source": "docling" if docling_title else "markdown",
         "organization": _extract_organization(full_text),
         "source": pdf_path,
         "extraction_date": datetime.now().isoformat(),
@@ -112,16 +129,8 @@ def extract_pdf_content(pdf_path: str) -> Dict:
     }
 
     # --- Content structure ---
-    sections = _parse_sections_from_markdown(full_text)
-    references = _extract_references(full_text)
-    abstract = _extract_abstract(full_text)
-
-    content = {
-        "abstract": abstract,
-        "sections": sections,
-        "tables": [],
-        "references": references,
-    }
+    content = parse_markdown_content(full_text)
+    content["tables"] = tables_from_document(document)
 
     return {
         "metadata": metadata,
@@ -134,6 +143,18 @@ def extract_pdf_content(pdf_path: str) -> Dict:
 # Parsing helpers
 # ---------------------------------------------------------------------------
 
+def parse_markdown_content(full_text: str) -> Dict:
+    """
+    Text stage of the pipeline: abstract, sections and references from the
+    Docling Markdown alone. `--reparse` re-runs just this on cached Markdown.
+    """
+    return {
+        "abstract": _extract_abstract(full_text),
+        "sections": _parse_sections_from_markdown(full_text),
+        "references": _extract_references(full_text),
+    }
+
+
 def _parse_sections_from_markdown(text: str) -> List[Dict]:
     """
     Parse markdown text into sections.
@@ -253,8 +274,7 @@ def _process_paragraphs(text: str) -> List[Dict]:
         if not para:
             continue
 
-        matched = CITATION_REGEX.findall(para)
-        citations = [m if isinstance(m, str) else next(s for s in m if s) for m in matched]
+        citations = [m.group(0) for m in CITATION_REGEX.finditer(para)]
 
         paragraphs.append({
             "paragraph_id": idx,
@@ -457,30 +477,36 @@ def _extract_references(text: str) -> List[Dict]:
 # Summarisation (sumy + LexRank)
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
 def setup_sumy():
-    """Import sumy modules and download NLTK data if necessary."""
+    """
+    Import sumy modules once per process.
+
+    Sentences are split by `AcademicTokenizer` (sentences.py) rather than
+    sumy's punkt-backed Tokenizer, so no NLTK data has to be checked or
+    downloaded.
+    """
     try:
         from sumy.parsers.plaintext import PlaintextParser
-        from sumy.nlp.tokenizers import Tokenizer
         from sumy.summarizers.lex_rank import LexRankSummarizer
-        import nltk
 
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt', quiet=True)
-        try:
-            nltk.data.find('tokenizers/punkt_tab')
-        except LookupError:
-            nltk.download('punkt_tab', quiet=True)
-
-        return PlaintextParser, Tokenizer, LexRankSummarizer
+        return PlaintextParser, AcademicTokenizer, LexRankSummarizer
     except ImportError:
-        raise ImportError("Please install sumy and nltk: pip install sumy nltk")
+        raise ImportError("Please install sumy: pip install sumy")
+
+
+def summarize_text(text: str, sentences_count: int = 2) -> Optional[str]:
+    """Extractive LexRank summary (NumPy implementation, see lexrank.py)."""
+    if not text.strip():
+        return None
+    return " ".join(summarize(text, sentences_count)) or None
 
 
 def summarize_text_with_sumy(text: str, sentences_count: int = 2) -> Optional[str]:
-    """Summarize text using LexRank extractive summarization from sumy library."""
+    """
+    Summarize text using LexRank extractive summarization from sumy library.
+    Kept as the reference for `summarize_text`; see bench_lexrank.py.
+    """
     if not text.strip():
         return None
 
@@ -502,7 +528,9 @@ def summarize_text_with_sumy(text: str, sentences_count: int = 2) -> Optional[st
 def summarize_sections(sections: List[Dict]) -> List[Dict]:
     """
     Attach the full concatenated section text as `section_summary`.
-    No extractive summarisation — keep original content verbatim.
+    No extractive summarisation by default — keep original content verbatim;
+    with SUMMARY_SENTENCES=N every section is cut to its top N LexRank
+    sentences, all sections of the document in one `summarize_texts` call.
     Returns new dicts rather than mutating the originals in-place.
     """
     summarized: List[Dict] = []
@@ -518,6 +546,11 @@ def summarize_sections(sections: List[Dict]) -> List[Dict]:
         updated = {**section, "section_summary": full_text}
         summarized.append(updated)
 
+    if SUMMARY_SENTENCES > 0:
+        texts = [section["section_summary"] for section in summarized]
+        for section, summary in zip(summarized, summarize_texts(texts, SUMMARY_SENTENCES)):
+            section["section_summary"] = " ".join(summary)
+
     return summarized
 
 
@@ -568,15 +601,13 @@ def _build_simple_sections(sections: List[Dict]) -> List[Dict]:
 
 def save_to_json(output_data: Dict, output_path: str) -> None:
     """
-    Save processed data to a UTF-8 JSON file with pretty formatting.
+    Save processed data to a UTF-8 JSON file, atomically (temp file + rename).
 
     Wrapped in try/except IOError so a disk-full or permission error
     on one file does not crash the entire batch run.
     """
     try:
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as fh:
-            json.dump(output_data, fh, ensure_ascii=False, indent=2)
+        write_json(output_data, Path(output_path), compact=OUTPUT_COMPACT)
         print(f"[SUCCESS] Results saved → {output_path}")
     except IOError as exc:
         print(f"[ERROR] Could not save {output_path}: {exc}")
@@ -586,44 +617,69 @@ def save_to_json(output_data: Dict, output_path: str) -> None:
 # Main pipeline
 # ---------------------------------------------------------------------------
 
-def process_pdf(pdf_path: str, output_dir: str = "./output") -> Dict:
-    """
-    Full pipeline: extract → parse → summarise → save.
-    Returns the processed document dict.
-    """
-    print("=" * 60)
-    print("PLAGIARISM DETECTION — PDF PROCESSING PIPELINE")
-    print("=" * 60)
+def _output_path(pdf_path: str, output_dir: str) -> str:
+    return os.path.join(output_dir, f"{Path(pdf_path).stem}_processed.json")
 
-    # Step 1: Extract
-    print("\n[STEP 1] Extracting PDF content...")
-    extracted = extract_pdf_content(pdf_path)
-    sections = extracted["content"]["sections"]
-    print(f"  Found {len(sections)} sections.")
 
-    # Step 2: Summarise
-    print("\n[STEP 2] Summarising sections via sumy extractive summarisation...")
-    sections = summarize_sections(sections)
-    simple_sections = _build_simple_sections(sections)
+def assemble_output(pdf_path: str, title: str, content: Dict,
+                    title_source: str = "markdown") -> Dict:
+    """
+    Summarise the parsed sections and build the output document.
 
-    # Step 3: Assemble output
-    print("\n[STEP 3] Assembling output...")
-    output_data = {
+    `title_source` records where the title came from: "docling" (the
+    document's own title) or "markdown" (`_extract_title_from_text`).
+    """
+    sections = summarize_sections(content["sections"])
+    return {
         "doc_id": _generate_document_id(pdf_path),
-        "title": extracted["metadata"]["title"],
-        "abstract": extracted["content"]["abstract"],
-        "sections": simple_sections,
+        "source": source_metadata(pdf_path),
+        "title": title,
+        "title_source": title_source,
+        "abstract": content["abstract"],
+        "sections": _build_simple_sections(sections),
         "references": [
             {"ref_id": ref.get("ref_id", ""), "raw": ref.get("raw_text", "")}
-            for ref in extracted["content"].get("references", [])
+            for ref in content.get("references", [])
+        ],
+        "tables": [
+            {"table_id": str(i), **table}
+            for i, table in enumerate(content.get("tables", []), start=1)
         ],
     }
 
-    # Step 4: Save
-    print("\n[STEP 4] Saving JSON...")
-    pdf_stem = Path(pdf_path).stem
-    output_path = os.path.join(output_dir, f"{pdf_stem}_processed.json")
-    save_to_json(output_data, output_path)
+
+def _run_pipeline(pdf_path: str) -> Tuple[Dict, str]:
+    """Extract → parse → summarise. Returns (output document, raw Markdown)."""
+    # Step 1: Extract
+    print("\n[STEP 1] Extracting PDF content...")
+    extracted = extract_pdf_content(pdf_path)
+    print(f"  Found {len(extracted['content']['sections'])} sections.")
+
+    # Step 2: Summarise + assemble
+    print("\n[STEP 2] Summarising sections and assembling output...")
+    metadata = extracted["metadata"]
+    output_data = assemble_output(pdf_path, metadata["title"], extracted["content"],
+                                  metadata["title_source"])
+    return output_data, extracted["raw_markdown"]
+
+
+def process_pdf(pdf_path: str, output_dir: str = "./output", save: bool = True) -> Dict:
+    """
+    Full pipeline: extract → parse → summarise → save.
+    Returns the processed document dict. With save=False the caller writes it.
+    The raw Markdown is cached under <output_dir>/markdown/ for `--reparse`.
+    """
+    print("=" * 60)
+    print("PLAGIARISM DETECTION — PDF PROCESSING PIPELINE")
+    print("=" * 60)
+
+    output_data, markdown = _run_pipeline(pdf_path)
+
+    # Step 3: Save
+    if save:
+        print("\n[STEP 3] Saving JSON...")
+        save_to_json(output_data, _output_path(pdf_path, output_dir))
+        MarkdownStore.for_output_dir(output_dir).put(Path(pdf_path).stem, markdown)
 
     print("\n" + "=" * 60)
     print("PROCESSING COMPLETE")
@@ -640,9 +696,10 @@ def _process_pdf_worker(args):
     """
     Top-level worker function for ProcessPoolExecutor.
     Must be a module-level function (not a closure) to be picklable.
+    The parent process writes the result, so the worker never waits on disk.
     """
     pdf_path, output_dir = args
-    return process_pdf(pdf_path, output_dir)
+    return _run_pipeline(pdf_path)
 
 
 def batch_process_pdfs(pdf_directory: str, output_dir: str = "./output") -> List[Dict]:
@@ -660,9 +717,11 @@ def batch_process_pdfs(pdf_directory: str, output_dir: str = "./output") -> List
 
     print(f"[INFO] Found {len(pdf_files)} PDF file(s). Timeout per file: {BATCH_FILE_TIMEOUT}s")
 
-    all_results: List[Dict] = []
+    converted: List[tuple] = []   # (pdf_file, result, write futures)
+    store = MarkdownStore.for_output_dir(output_dir)
 
-    with ProcessPoolExecutor(max_workers=1) as executor:
+    with ProcessPoolExecutor(max_workers=1) as executor, \
+            JsonWriter(compact=OUTPUT_COMPACT) as writer:
         for idx, pdf_file in enumerate(pdf_files, start=1):
             print(f"\n{'=' * 60}")
             print(f"File {idx}/{len(pdf_files)}: {pdf_file.name}")
@@ -670,18 +729,100 @@ def batch_process_pdfs(pdf_directory: str, output_dir: str = "./output") -> List
 
             future = executor.submit(_process_pdf_worker, (str(pdf_file), output_dir))
             try:
-                result = future.result(timeout=BATCH_FILE_TIMEOUT)
-                all_results.append(result)
+                result, markdown = future.result(timeout=BATCH_FILE_TIMEOUT)
+                writes = [
+                    writer.submit(result, Path(_output_path(str(pdf_file), output_dir))),
+                    writer.submit_text(markdown, store.path_for(pdf_file.stem)),
+                ]
+                converted.append((pdf_file, result, writes))
             except FuturesTimeoutError:
                 print(f"[WARNING] Timed out after {BATCH_FILE_TIMEOUT}s — skipping {pdf_file.name}")
                 future.cancel()
             except Exception as exc:
                 print(f"[ERROR] Failed to process {pdf_file.name}: {exc}")
 
+    # The writer has drained its queue on exit; a file only counts once both
+    # its JSON and its Markdown are on disk.
+    all_results: List[Dict] = []
+    for pdf_file, result, writes in converted:
+        try:
+            for write in writes:
+                write.result()
+        except Exception as exc:
+            print(f"[ERROR] Could not save output for {pdf_file.name}: {exc}")
+            continue
+        all_results.append(result)
+
     print(f"\n[INFO] Batch complete. Processed {len(all_results)}/{len(pdf_files)} file(s) successfully.")
     return all_results
 
 
+# ---------------------------------------------------------------------------
+# Re-parse from cached Markdown
+# ---------------------------------------------------------------------------
+
+# Not derivable from Markdown alone. `source` is not listed: it is looked up
+# in the crawl catalog again and only kept when no manifest lists the file.
+_KEPT_ON_REPARSE = ("doc_id", "tables")
+# A title Docling read from the document itself is not in the cached
+# Markdown, so it is kept; a heuristic title is re-derived, so fixes to
+# `_extract_title_from_text` reach existing outputs.
+_DOCLING_TITLE_KEYS = ("title", "title_source")
+
+
+def _reparse_worker(args) -> str:
+    """Re-run the text stage for one cached Markdown file; returns its status."""
+    stem, md_path, out_path = args
+    try:
+        markdown = read_text(Path(md_path))
+        derived = assemble_output(stem + ".pdf", _extract_title_from_text(markdown),
+                                  parse_markdown_content(markdown))
+        old = read_json(Path(out_path)) if os.path.exists(out_path) else None
+        if old is None:
+            write_json(derived, Path(out_path), compact=OUTPUT_COMPACT)
+            return "new"
+        kept = _KEPT_ON_REPARSE
+        if derived["source"] is None:
+            kept += ("source",)
+        if old.get("title_source") == "docling":
+            kept += _DOCLING_TITLE_KEYS
+        merged = {**old, **derived, **{k: old[k] for k in kept if k in old}}
+        if merged == old:
+            return "unchanged"
+        write_json(merged, Path(out_path), compact=OUTPUT_COMPACT)
+        return "changed"
+    except Exception as exc:
+        print(f"[ERROR] Re-parse failed for {stem}: {exc}")
+        return "failed"
+
+
+def reparse_outputs(output_dir: str) -> Dict[str, int]:
+    """
+    Re-derive every output in `output_dir` from its cached Markdown, in
+    parallel, without converting any PDF. Only outputs whose content
+    changed are rewritten; doc_id and tables are kept from the old file,
+    and so is the title when Docling supplied it. `source` is refreshed
+    from the crawl catalog.
+    """
+    store = MarkdownStore.for_output_dir(output_dir)
+    tasks = [
+        (stem, str(store.find(stem)), _output_path(stem + ".pdf", output_dir))
+        for stem in store.stems()
+    ]
+    if not tasks:
+        print(f"[ERROR] No cached Markdown under {store.root}")
+        return {}
+
+    print(f"[INFO] Re-parsing {len(tasks)} document(s) from {store.root}")
+    stats: Dict[str, int] = {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for status in executor.map(_reparse_worker, tasks, chunksize=16):
+            stats[status] = stats.get(status, 0) + 1
+
+    print("[INFO] Re-parse complete: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.items())))
+    return stats
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
@@ -703,6 +844,9 @@ if __name__ == "__main__":
         out_dir = args[2] if len(args) > 2 else default_output_dir
         batch_process_pdfs(pdf_dir, out_dir)
 
+    elif args and args[0] == "--reparse":
+        reparse_outputs(args[1] if len(args) > 1 else default_output_dir)
+
     elif args and args[0] != "--batch":
         pdf_path = args[0]
         out_dir = args[1] if len(args) > 1 else default_output_dir
@@ -719,4 +863,5 @@ if __name__ == "__main__":
             print("               (processes ./pdfs/ folder)")
             print("  Single file: python plagiarism_detector.py <pdf_path> [output_dir]")
             print("  Batch:       python plagiarism_detector.py --batch <dir> [output_dir]")
+            print("  Re-parse:    python plagiarism_detector.py --reparse [output_dir]")
             sys.exit(1)
\ No newline at end of file
@@ -4,7 +4,10 @@ extract_v2.py — Scientific paper PDF extractor.
 Input:  PDF file(s) of scientific papers (WACV/CVPR/ICCV/NeurIPS/arXiv-style).
 Output: JSON per paper, schema identical to json_output/:
     {
-      "doc_id": str,
+      "doc_id": str,               # paper_<sha256 of the PDF, 16 hex digits>
+      "source": {"collection", "title", "year", "venue", "track"} | null,
+      "published": "YYYY-MM-DD" | "",   # from the paper text
+      "venue": str,                # "CVPR", "ACL", ... if named with a year
       "title": str,
       "abstract": str,
       "sections": [
@@ -14,37 +17,104 @@ Output: JSON per paper, schema identical to json_output/:
           "summary": str,          # full section text (NOT summarised)
           "has_citation": bool,
           "citation_count": int,
+          "mask": [[start, end, kind], ...],   # char spans of `summary`
+          "lang": str,             # ISO 639-1 code, "und" if undecidable
+          "formulas": [{"latex", "normalized", "hashes"}, ...],
         }, ...
       ],
       "references": [
         {"ref_id": str, "raw": str}, ...
+      ],
+      "tables": [
+        {"table_id", "page", "caption", "cells", "fingerprint"}, ...
       ]
     }
 
+`mask` marks spans that similarity stages must not fingerprint, with kind
+"c" (citation), "q" (quotation), "e" (equation) or "b" (boilerplate such as
+the CVF watermark and Docling image placeholders). Spans are sorted,
+non-overlapping and half-open.
+
+`formulas` lists the section's non-trivial LaTeX formulas with their
+normalised form and 64-bit fingerprints (see formulas.py). Docling only
+decodes formulas to LaTeX when DOCLING_FORMULAS=1; otherwise they appear
+as placeholders and the list is empty.
+
+`doc_id` depends only on the PDF bytes, so re-runs and re-crawls of the
+same file keep their ID; `source` is the crawl metadata from json/*.json
+(see doc_identity.py). `--migrate-ids` converts outputs written with the
+old date-stamped IDs and records old → new in doc_id_map.json.
+
+`tables` holds the cell grid of every table Docling detected, with a
+numeric fingerprint for finding reused results tables (see tables.py).
+
 Pipeline:
     PDF  ──(Docling)──▶  Markdown  ──(regex)──▶  sections + metadata  ──▶  JSON
+
+PDFs longer than SHARD_MIN_PAGES are converted as SHARD_PAGES-page shards in
+parallel and the shard Markdown is stitched back together before parsing.
+
+With DOCLING_OCR=auto (the default) a PyMuPDF pre-pass flags the pages that
+have no usable text layer (see ocr_plan.py); only those page ranges are
+converted with OCR, the rest without. DOCLING_OCR=1 / 0 forces OCR on / off.
+
+The stitched Markdown is kept under <output_dir>/markdown/ (see
+markdown_store.py); `--reparse` re-runs only the text stages from it.
+
+Before a batch is scheduled every selected PDF gets a pre-flight check
+(see pdf_check.py); truncated or unreadable files are moved to the
+quarantine directory for the crawlers to download again, and recorded as
+`invalid` in the ledger instead of timing out in Docling.
+PDF_QUARANTINE=0 only skips them and leaves them in place.
 """
 
 from __future__ import annotations
 
-import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
-from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures import Future
+from contextlib import nullcontext
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from citations import match_citations, scan_citations, totals
+from doc_identity import doc_id_from_hash, file_sha256, migrate_doc_ids, source_metadata
+from formulas import extract_formulas
+from job_ledger import LEDGER_FILENAME, JobLedger
+from json_writer import ZSTD_SUFFIX, JsonWriter, read_json, read_text, write_json
+from langid import detect_language
+from markdown_store import MarkdownStore
+from ocr_plan import PageRange, ocr_runs, scan_pages
+from pdf_check import quarantine, validate_pdf
+from span_mask import WATERMARK_REGEX, build_span_mask
+from scheduler import Progress, estimate_pages, format_duration, lpt_order, makespan, task_cost, task_timeout
+from tables import tables_from_document
+from worker_pool import MemoryGuardedPool, Task
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
-BATCH_FILE_TIMEOUT_SEC = 600          # per-file timeout in batch mode
+BATCH_FILE_TIMEOUT_SEC = 600          # fallback timeout; batch tasks get one per page (scheduler.py)
+BATCH_MAX_RETRIES = int(os.environ.get("BATCH_MAX_RETRIES", "2"))   # --resume retry cap
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "1"))
+WORKER_MAX_TASKS = int(os.environ.get("WORKER_MAX_TASKS", "50"))          # recycle after N PDFs
+WORKER_MAX_RSS_MB = float(os.environ.get("WORKER_MAX_RSS_MB", "6144"))    # recycle above this RSS
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", "0"))         # 0 = no admission limit
 DEVICE = os.environ.get("DOCLING_DEVICE", "cpu")   # "cpu" | "cuda" | "mps"
-DO_OCR = os.environ.get("DOCLING_OCR", "1") == "1"
+OCR_MODE = os.environ.get("DOCLING_OCR", "auto")   # "auto" (per page) | "1" | "0"
+DO_FORMULAS = os.environ.get("DOCLING_FORMULAS", "0") == "1"   # LaTeX for formulas (slower)
+SHARD_MIN_PAGES = int(os.environ.get("SHARD_MIN_PAGES", "40"))   # shard PDFs longer than this
+SHARD_PAGES = int(os.environ.get("SHARD_PAGES", "20"))           # pages per shard
+OUTPUT_COMPACT = os.environ.get("OUTPUT_COMPACT", "1") == "1"   # 0 = indent=2 for reading by eye
+OUTPUT_ZSTD = os.environ.get("OUTPUT_ZSTD", "0") == "1"         # write *_processed.json.zst
+QUARANTINE = os.environ.get("PDF_QUARANTINE", "1") == "1"      # 0 = skip invalid PDFs in place
 
 logging.basicConfig(
     level=logging.INFO,
@@ -52,29 +122,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("extract_v2")
 
-
 # ---------------------------------------------------------------------------
-# Citation patterns (3 common academic styles)
+# Title / section heuristics
 # ---------------------------------------------------------------------------
 
-_CITATION_PATTERNS = [
-    r"\[\d+(?:,\s*\d+)*\]",                          # [1], [1, 2, 3]
-    r"\([\w\s]+,\s*\d{4}[a-z]?\)",                   # (Author, 2020a)
-    r"\([\w\s]+\s+et\s+al\.,\s*\d{4}[a-z]?\)",       # (Author et al., 2020)
-]
-CITATION_REGEX = re.compile("|".join(_CITATION_PATTERNS))
-
-
-# ---------------------------------------------------------------------------
-# CVF / publisher watermark (so we don't mistake it for the paper title)
-# ---------------------------------------------------------------------------
-
-_WATERMARK_REGEX = re.compile(
-    r"open access|computer vision foundation|ieee xplore|watermark"
-    r"|proceedings|conference on computer vision|arxiv|preprint",
-    re.IGNORECASE,
-)
-
 _SKIP_TITLES = frozenset({
     "abstract", "introduction", "references", "conclusion",
     "related work", "acknowledgements", "acknowledgments",
@@ -130,37 +181,174 @@ def _load_docling():
     return DocumentConverter, InputFormat, PdfFormatOption, PdfPipelineOptions
 
 
-def pdf_to_markdown(pdf_path: str) -> str:
-    """Convert a PDF into Markdown via Docling."""
-    logger.info("Converting PDF → markdown: %s", pdf_path)
+_CONVERTERS: Dict[bool, object] = {}
 
-    DocumentConverter, InputFormat, PdfFormatOption, PdfPipelineOptions = _load_docling()
 
-    opts = PdfPipelineOptions()
-    opts.accelerator_options.device = DEVICE
-    opts.do_ocr = DO_OCR
+def _get_converter(ocr: bool):
+    """
+    Build the Docling converter once per process and OCR setting; model
+    loading dominates small jobs.
+    """
+    if ocr not in _CONVERTERS:
+        DocumentConverter, InputFormat, PdfFormatOption, PdfPipelineOptions = _load_docling()
 
-    converter = DocumentConverter(
-        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=opts)}
-    )
-    result = converter.convert(pdf_path)
+        opts = PdfPipelineOptions()
+        opts.accelerator_options.device = DEVICE
+        opts.do_ocr = ocr
+        opts.do_formula_enrichment = DO_FORMULAS
+
+        _CONVERTERS[ocr] = DocumentConverter(
+            format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=opts)}
+        )
+    return _CONVERTERS[ocr]
+
+
+Conversion = Tuple[str, List[Dict]]   # (markdown, tables)
+Shard = Tuple[Optional[PageRange], bool]   # (pages, None = whole file; OCR on?)
+
+
+def convert_pdf(pdf_path: str, page_range: Optional[PageRange] = None,
+                ocr: Optional[bool] = None) -> Conversion:
+    """
+    Convert a PDF (or only `page_range` of it) via Docling into Markdown and tables.
+
+    `ocr` defaults to on unless DOCLING_OCR=0; `plan_shards` decides it per
+    page range.
+    """
+    if ocr is None:
+        ocr = OCR_MODE != "0"
+    if page_range:
+        logger.info("Converting PDF → markdown: %s [pages %d-%d, ocr=%s]", pdf_path, *page_range, ocr)
+        result = _get_converter(ocr).convert(pdf_path, page_range=page_range)
+    else:
+        logger.info("Converting PDF → markdown: %s [ocr=%s]", pdf_path, ocr)
+        result = _get_converter(ocr).convert(pdf_path)
     document = result.document
 
     if hasattr(document, "export_to_markdown"):
-        return document.export_to_markdown()
-    return str(document)
+        markdown = document.export_to_markdown()
+    else:
+        markdown = str(document)
+    return markdown, tables_from_document(document)
+
+
+def pdf_to_markdown(pdf_path: str, page_range: Optional[PageRange] = None) -> str:
+    """Convert a PDF (or only `page_range` of it) into Markdown via Docling."""
+    return convert_pdf(pdf_path, page_range)[0]
 
 
 # ---------------------------------------------------------------------------
-# Parsing helpers
+# Page-range sharding (large PDFs)
 # ---------------------------------------------------------------------------
 
 
-def _match_paragraph_citations(text: str) -> tuple[str, ...]:
-    """Return all citation strings found in a paragraph."""
-    found = CITATION_REGEX.findall(text)
-    # findall returns str for single-group patterns
-    return tuple(m if isinstance(m, str) else next(s for s in m if s) for m in found)
+def count_pages(pdf_path: str) -> Optional[int]:
+    """Cheap page count via PyMuPDF; None when PyMuPDF is missing or the file is unreadable."""
+    try:
+        import fitz  # type: ignore
+    except ImportError:
+        return None
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return None
+
+
+def plan_shards(pdf_path: str) -> List[Shard]:
+    """
+    Split a PDF into conversion tasks: `(page range, ocr)` pairs in page order.
+
+    With DOCLING_OCR=auto the pages are first grouped into runs with OCR on
+    or off (see ocr_plan.py); PDFs longer than SHARD_MIN_PAGES are then cut
+    into ranges of at most SHARD_PAGES pages. Returns `[(None, ocr)]`
+    (convert the whole file at once) when one setting covers a short PDF or
+    the page count is unknown.
+    """
+    default_ocr = OCR_MODE != "0"
+    flags = scan_pages(pdf_path) if OCR_MODE == "auto" else None
+    pages = len(flags) if flags else count_pages(pdf_path)
+    if not pages:
+        return [(None, default_ocr)]
+    if flags:
+        runs = ocr_runs(flags)
+        if 0 < sum(flags) < len(flags):
+            logger.info("OCR needed on %d of %d page(s) of %s",
+                        sum(flags), len(flags), Path(pdf_path).name)
+    else:
+        runs = [((1, pages), default_ocr)]
+
+    shard = pages > SHARD_MIN_PAGES and SHARD_PAGES >= 1
+    if len(runs) == 1 and not shard:
+        return [(None, runs[0][1])]
+    shards: List[Shard] = []
+    for (first, last), ocr in runs:
+        step = SHARD_PAGES if shard else last - first + 1
+        shards += [
+            ((start, min(start + step - 1, last)), ocr)
+            for start in range(first, last + 1, step)
+        ]
+    return shards
+
+
+_DANGLING_NUMBER_REGEX = re.compile(
+    r"^#+\s+(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.?)\s*$", re.IGNORECASE
+)
+_SENTENCE_END_REGEX = re.compile(r"[.!?:;)\]\"'”]$")
+
+
+def _is_header(line: str) -> bool:
+    return bool(
+        _match_md_header(line) or _match_roman_header(line) or _match_special_header(line)
+    )
+
+
+def _join_shards(left: str, right: str) -> str:
+    """Join two adjacent shard texts, repairing splits at the page boundary."""
+    if not left:
+        return right
+    if not right:
+        return left
+
+    left_lines = left.split("\n")
+    right_lines = right.split("\n")
+    tail, head = left_lines[-1].strip(), right_lines[0].strip()
+
+    # "## 3" at the bottom of one page, "Method" at the top of the next.
+    if _DANGLING_NUMBER_REGEX.match(tail) and head and not _is_header(head):
+        left_lines[-1] = f"{tail} {head.lstrip('#').strip()}"
+        return "\n".join(left_lines) + "\n" + "\n".join(right_lines[1:])
+
+    # A paragraph that continues across the boundary: keep it one paragraph
+    # so its text (and citations) are not split in two.
+    if (
+        tail and head
+        and not _is_header(tail) and not _is_header(head)
+        and not tail.startswith(("|", "<!--", "-", "*"))
+        and not _SENTENCE_END_REGEX.search(tail)
+        and head[0].islower()
+    ):
+        if tail.endswith("-"):
+            left_lines[-1] = tail[:-1] + head
+        else:
+            left_lines[-1] = f"{tail} {head}"
+        return "\n".join(left_lines) + "\n" + "\n".join(right_lines[1:])
+
+    # Otherwise a blank line keeps a header at the top of `right` on its own line.
+    return f"{left}\n\n{right}"
+
+
+def stitch_markdown(parts: List[str]) -> str:
+    """Concatenate shard Markdown in page order before `parse_sections`."""
+    stitched = ""
+    for part in parts:
+        stitched = _join_shards(stitched, part.strip())
+    return stitched
+
+
+# ---------------------------------------------------------------------------
+# Parsing helpers
+# ---------------------------------------------------------------------------
 
 
 def _split_paragraphs(block: str) -> List[Paragraph]:
@@ -171,7 +359,7 @@ def _split_paragraphs(block: str) -> List[Paragraph]:
         if not chunk:
             continue
         paragraphs.append(
-            Paragraph(text=chunk, citations=_match_paragraph_citations(chunk))
+            Paragraph(text=chunk, citations=match_citations(chunk))
         )
     return paragraphs
 
@@ -256,7 +444,7 @@ def extract_title(markdown: str) -> str:
 
     for m in re.finditer(r"^#{1,2}\s+(.+)$", region, re.MULTILINE):
         title = m.group(1).strip().rstrip("#").strip()
-        if _WATERMARK_REGEX.search(title):
+        if WATERMARK_REGEX.search(title):
             continue
         if title.lower() in _SKIP_TITLES:
             continue
@@ -266,7 +454,7 @@ def extract_title(markdown: str) -> str:
 
     for line in region.splitlines():
         stripped = line.strip().lstrip("#").strip()
-        if len(stripped) > 30 and not _WATERMARK_REGEX.search(stripped):
+        if len(stripped) > 30 and not WATERMARK_REGEX.search(stripped):
             if not re.search(r"[@{]|^\d+\.", stripped):
                 return stripped[:300]
 
@@ -286,6 +474,72 @@ def extract_abstract(markdown: str) -> str:
     return m.group(1).strip()[:2000] if m else ""
 
 
+_LABELLED_DATE_REGEX = re.compile(
+    r"(?:Date|Published|Received|Accepted)\s*[:\-]?\s*(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})",
+    re.IGNORECASE,
+)
+_ISO_DATE_REGEX = re.compile(r"((?:19|20)\d{2})[\/\-](\d{1,2})[\/\-](\d{1,2})")
+_MONTHS = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+_WORDY_DATE_REGEX = re.compile(rf"({'|'.join(_MONTHS)})[,\s]+(\d{{4}})", re.IGNORECASE)
+_VENUE_REGEX = re.compile(
+    r"\b(CVPR|ICCV|WACV|ECCV|NeurIPS|ICML|ICLR|AAAI|IJCAI|ACL|EMNLP|NAACL|BMVC|ACCV|ACM MM)"
+    r"[\s\-]*((?:20|19)\d{2})\b",
+    re.IGNORECASE,
+)
+# Usual month of each venue, for dating a paper from "CVPR 2023" alone.
+_VENUE_MONTHS = {
+    "cvpr": 6, "iccv": 10, "wacv": 1, "eccv": 9, "neurips": 12, "icml": 7,
+    "iclr": 5, "aaai": 2, "ijcai": 8, "acl": 7, "emnlp": 11, "naacl": 6,
+    "bmvc": 9, "accv": 12, "acm mm": 10,
+}
+
+
+def extract_publish_date(markdown: str) -> str:
+    """
+    Publication date as YYYY-MM-DD, or "" if none is stated.
+
+    Tried in order: a labelled DD/MM/YYYY or MM/DD/YYYY date (skipped when
+    both parts are <= 12, which is ambiguous), an ISO date, "Month YYYY",
+    then a venue with a year ("CVPR 2023") dated to the venue's usual month.
+    """
+    header = markdown[:2000]
+
+    labelled = _LABELLED_DATE_REGEX.search(header)
+    if labelled:
+        a, b, year = (int(g) for g in labelled.groups())
+        if 1900 < year < 2100 and (a > 12) != (b > 12):
+            day, month = (a, b) if a > 12 else (b, a)
+            if 1 <= month <= 12 and 1 <= day <= 31:
+                return f"{year}-{month:02d}-{day:02d}"
+
+    iso = _ISO_DATE_REGEX.search(header)
+    if iso:
+        year, month, day = (int(g) for g in iso.groups())
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return f"{year}-{month:02d}-{day:02d}"
+
+    wordy = _WORDY_DATE_REGEX.search(header)
+    if wordy and 1900 < int(wordy.group(2)) < 2100:
+        month = _MONTHS.index(wordy.group(1).lower()) + 1
+        return f"{wordy.group(2)}-{month:02d}-01"
+
+    venue = _VENUE_REGEX.search(markdown[:5000])
+    if venue and 1990 < int(venue.group(2)) < 2100:
+        month = _VENUE_MONTHS.get(venue.group(1).lower(), 1)
+        return f"{venue.group(2)}-{month:02d}-01"
+
+    return ""
+
+
+def extract_venue(markdown: str) -> str:
+    """Venue acronym named with a year near the top of the paper ("CVPR"), or ""."""
+    m = _VENUE_REGEX.search(markdown[:5000])
+    return m.group(1).upper().replace("NEURIPS", "NeurIPS") if m else ""
+
+
 def extract_references(markdown: str) -> List[Dict[str, str]]:
     """
     Extract references, joining multi-line entries.
@@ -332,12 +586,6 @@ def extract_references(markdown: str) -> List[Dict[str, str]]:
 # ---------------------------------------------------------------------------
 
 
-def _generate_doc_id(pdf_path: str) -> str:
-    stem = Path(pdf_path).stem
-    safe = re.sub(r"[^a-zA-Z0-9_]", "_", stem)
-    return f"paper_{safe}_{datetime.now().strftime('%Y%m%d')}"
-
-
 _EXCLUDE_SECTION_TITLES = frozenset({
     "references", "bibliography",
 })
@@ -345,41 +593,107 @@ _EXCLUDE_SECTION_TITLES = frozenset({
 
 def _sections_to_output(sections: List[Section]) -> List[Dict]:
     filtered = [s for s in sections if s.title.strip().lower() not in _EXCLUDE_SECTION_TITLES]
-    return [
-        {
+    output = []
+    for idx, sec in enumerate(filtered, start=1):
+        text = sec.full_text
+        output.append({
             "section_id": str(idx),
             "title": sec.title,
-            "summary": sec.full_text,
+            "summary": text,
             "has_citation": sec.citation_count > 0,
             "citation_count": sec.citation_count,
-        }
-        for idx, sec in enumerate(filtered, start=1)
-    ]
+            "mask": build_span_mask(text),
+            "lang": detect_language(text)[0],
+            "formulas": extract_formulas(text),
+        })
+    return output
 
 
-def process_pdf(pdf_path: str, output_dir: str) -> Dict:
-    """Full pipeline for one PDF; returns the output dict and writes JSON."""
-    markdown = pdf_to_markdown(pdf_path)
+def build_output(pdf_path: str, markdown: str, tables: Optional[List[Dict]] = None,
+                 content_hash: Optional[str] = None) -> Dict:
+    """
+    Run the text stages on (stitched) Markdown and assemble the output dict.
 
+    `content_hash` is the PDF's SHA-256 when the caller already has it; it is
+    computed here otherwise. Without a PDF on disk (re-parse) `doc_id` is
+    left empty for the caller to fill.
+    """
+    if content_hash is None and os.path.exists(pdf_path):
+        content_hash = file_sha256(pdf_path)
     sections = parse_sections(markdown)
-    output = {
-        "doc_id": _generate_doc_id(pdf_path),
+    return {
+        "doc_id": doc_id_from_hash(content_hash) if content_hash else "",
+        "source": source_metadata(pdf_path),
         "title": extract_title(markdown),
+        "published": extract_publish_date(markdown),
+        "venue": extract_venue(markdown),
         "abstract": extract_abstract(markdown),
         "sections": _sections_to_output(sections),
         "references": extract_references(markdown),
+        "tables": [
+            {"table_id": str(i), **table} for i, table in enumerate(tables or [], start=1)
+        ],
     }
 
-    out_path = Path(output_dir) / f"{Path(pdf_path).stem}_processed.json"
-    save_json(output, out_path)
+
+def stitch_conversions(parts: List[Conversion]) -> Conversion:
+    """Stitch shard Markdown and concatenate shard tables, in page order."""
+    return stitch_markdown([md for md, _ in parts]), [t for _, tables in parts for t in tables]
+
+
+def _output_path(pdf_path: str, output_dir: str) -> Path:
+    suffix = ".json" + (ZSTD_SUFFIX if OUTPUT_ZSTD else "")
+    return Path(output_dir) / f"{Path(pdf_path).stem}_processed{suffix}"
+
+
+def _make_pool(n_tasks: int) -> MemoryGuardedPool:
+    # Batch tasks always get a worker, even a lone one, for its timeout,
+    # RSS recycling and crash isolation; process_pdf converts a single
+    # shard in-process itself.
+    return MemoryGuardedPool(
+        _convert_worker,
+        max_workers=max(1, min(BATCH_MAX_WORKERS, n_tasks)),
+        max_tasks_per_worker=WORKER_MAX_TASKS,
+        max_worker_rss_mb=WORKER_MAX_RSS_MB or None,
+        memory_budget_mb=MEMORY_BUDGET_MB or None,
+        default_timeout=BATCH_FILE_TIMEOUT_SEC,
+    )
+
+
+def _convert_sharded(pdf_path: str, shards: List[Shard]) -> Conversion:
+    """Convert shards of one PDF in parallel and stitch them back in page order."""
+    parts: List[Optional[Conversion]] = [None] * len(shards)
+    tasks = [
+        Task(key=str(i), args=(pdf_path, pages, ocr),
+             timeout=task_timeout(task_cost(pages[1] - pages[0] + 1, ocr)) if pages else None)
+        for i, (pages, ocr) in enumerate(shards)
+    ]
+    with _make_pool(len(tasks)) as pool:
+        for res in pool.run(tasks):
+            if not res.ok:
+                raise RuntimeError(f"shard {shards[int(res.key)]} {res.status}: {res.error}")
+            parts[int(res.key)] = res.value
+    return stitch_conversions(parts)
+
+
+def process_pdf(pdf_path: str, output_dir: str) -> Dict:
+    """Full pipeline for one PDF; returns the output dict and writes JSON."""
+    shards = plan_shards(pdf_path)
+    if len(shards) > 1:
+        logger.info("Sharding %s into %d page ranges", pdf_path, len(shards))
+        markdown, tables = _convert_sharded(pdf_path, shards)
+    else:
+        markdown, tables = convert_pdf(pdf_path, *shards[0])
+
+    output = build_output(pdf_path, markdown, tables)
+    MarkdownStore.for_output_dir(output_dir, OUTPUT_ZSTD).put(Path(pdf_path).stem, markdown)
+    save_json(output, _output_path(pdf_path, output_dir))
     return output
 
 
 def save_json(data: Dict, path: Path) -> None:
     try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("w", encoding="utf-8") as fh:
-            json.dump(data, fh, ensure_ascii=False, indent=2)
+        write_json(data, path, compact=OUTPUT_COMPACT)
         logger.info("Saved → %s", path)
     except OSError as exc:
         logger.error("Could not save %s: %s", path, exc)
@@ -390,34 +704,366 @@ def save_json(data: Dict, path: Path) -> None:
 # ---------------------------------------------------------------------------
 
 
-def _worker(args: tuple[str, str]) -> Dict:
-    pdf_path, out_dir = args
-    return process_pdf(pdf_path, out_dir)
+def _convert_worker(pdf_path: str, page_range: Optional[PageRange], ocr: bool) -> Conversion:
+    return convert_pdf(pdf_path, page_range, ocr)
 
 
-def batch_process(pdf_dir: str, output_dir: str) -> List[Dict]:
+def batch_process(pdf_dir: str, output_dir: str, resume: bool = False) -> List[Dict]:
+    """
+    Convert every PDF in `pdf_dir`, recording each file in the job ledger.
+
+    PDFs are split into page-range shards by size and OCR need (see
+    `plan_shards`); every shard is its own pool task with a timeout scaled to
+    its pages, tasks are handed out longest first (see scheduler.py), and a
+    document is assembled once all of its shards are back. With `resume`, files the
+    ledger marks as done are skipped unless their bytes changed, and
+    failures are retried up to BATCH_MAX_RETRIES times.
+    """
     pdf_files = sorted(Path(pdf_dir).glob("*.pdf"))
     if not pdf_files:
         logger.error("No PDFs found in %s", pdf_dir)
         return []
 
-    logger.info("Found %d PDF(s). Timeout/file: %ds", len(pdf_files), BATCH_FILE_TIMEOUT_SEC)
-    results: List[Dict] = []
+    hashes: Dict[str, str] = {}
+
+    def hash_of(path: str) -> str:
+        if path not in hashes:
+            hashes[path] = file_sha256(path)
+        return hashes[path]
+
+    with JobLedger.for_output_dir(output_dir) as ledger:
+        selected = ledger.select(
+            (str(p) for p in pdf_files), resume, BATCH_MAX_RETRIES, hash_of=hash_of
+        )
+        if resume:
+            logger.info("Resume: %d of %d PDF(s) left to process", len(selected), len(pdf_files))
+        selected = _preflight(selected, ledger)
+        if not selected:
+            return []
+        hashes = {path: hash_of(path) for path in selected}
+        selected = _skip_duplicates(selected, hashes, output_dir, ledger)
+        if not selected:
+            return []
+        ledger.start_run(len(selected))
+        ledger.mark_queued(selected, hashes)
+        return _run_batch(selected, output_dir, ledger, hashes)
+
+
+def _preflight(selected: List[str], ledger: JobLedger) -> List[str]:
+    """Drop (and quarantine) the PDFs that fail `validate_pdf`."""
+    valid = []
+    for path in selected:
+        reason = validate_pdf(path)
+        if reason is None:
+            valid.append(path)
+            continue
+        ledger.mark_invalid(path, reason)
+        if QUARANTINE:
+            quarantine(path, reason)
+        else:
+            logger.warning("Skipping invalid PDF %s: %s", Path(path).name, reason)
+    if len(valid) < len(selected):
+        logger.info("Pre-flight: %d of %d PDF(s) invalid", len(selected) - len(valid), len(selected))
+    return valid
+
 
-    with ProcessPoolExecutor(max_workers=1) as pool:
-        for idx, pdf in enumerate(pdf_files, start=1):
-            logger.info("[%d/%d] %s", idx, len(pdf_files), pdf.name)
-            future = pool.submit(_worker, (str(pdf), output_dir))
+def _skip_duplicates(
+    pdf_files: List[str], hashes: Dict[str, str], output_dir: str, ledger: JobLedger
+) -> List[str]:
+    """
+    Drop PDFs whose bytes match a file already converted (or queued earlier
+    in this run), so the same paper crawled from two sources is not sent
+    through Docling twice. The duplicate is linked to its canonical file in
+    the ledger.
+    """
+    done = ledger.done_by_hash(hashes.values())
+    first_seen: Dict[str, str] = {}
+    unique: List[str] = []
+    for path in pdf_files:
+        digest = hashes[path]
+        if digest in done and done[digest][0] != path:
+            canonical, out_path = done[digest]
+        elif digest in first_seen:
+            canonical, out_path = first_seen[digest], str(_output_path(first_seen[digest], output_dir))
+        else:
+            first_seen[digest] = path
+            unique.append(path)
+            continue
+        logger.info("Duplicate content — %s is %s", Path(path).name, Path(canonical).name)
+        ledger.mark_duplicate(path, canonical, out_path, digest)
+    return unique
+
+
+def _run_batch(pdf_files: List[str], output_dir: str, ledger: JobLedger,
+               hashes: Dict[str, str]) -> List[Dict]:
+    tasks: List[Task] = []
+    shard_of: Dict[str, Tuple[str, int]] = {}
+    parts: Dict[str, List[Optional[Conversion]]] = {}
+    elapsed: Dict[str, float] = {}
+    costs: Dict[str, float] = {}
+    for pdf in pdf_files:
+        shards = plan_shards(pdf)
+        parts[pdf] = [None] * len(shards)
+        elapsed[pdf] = 0.0
+        for idx, (pages, ocr) in enumerate(shards):
+            key = f"{pdf}#{idx}"
+            shard_of[key] = (pdf, idx)
+            n_pages = pages[1] - pages[0] + 1 if pages else estimate_pages(pdf, count_pages(pdf))
+            costs[key] = task_cost(n_pages, ocr)
+            tasks.append(Task(key=key, args=(pdf, pages, ocr), timeout=task_timeout(costs[key])))
+
+    order = {key: i for i, key in enumerate(lpt_order(costs))}
+    tasks.sort(key=lambda task: order[task.key])
+    workers = max(1, min(BATCH_MAX_WORKERS, len(tasks)))
+    progress = Progress(costs, workers)
+    logger.info(
+        "Found %d PDF(s) → %d task(s), %.0f page(s). Workers: %d, timeout/task: %ds–%ds, "
+        "estimated %s",
+        len(pdf_files), len(tasks), sum(costs.values()), workers,
+        min(t.timeout for t in tasks), max(t.timeout for t in tasks),
+        format_duration(makespan((costs[t.key] for t in tasks), workers) * progress.sec_per_page),
+    )
+    results: Dict[str, Dict] = {}
+    failed: set[str] = set()
+    # Outputs are written by a background thread; a file is marked done in
+    # the ledger only once its JSON has been renamed into place.
+    writes: List[Tuple[str, float, Future, Future]] = []
+    store = MarkdownStore.for_output_dir(output_dir, OUTPUT_ZSTD)
+    started: set[str] = set()
+
+    def mark_started(task: Task) -> None:
+        # A file's attempt is counted when its first shard reaches a worker,
+        # so files still queued when a run dies keep their retries.
+        pdf = shard_of[task.key][0]
+        if pdf not in started:
+            started.add(pdf)
+            ledger.mark_started(pdf)
+
+    def record_writes(wait: bool) -> None:
+        for entry in list(writes):
+            pdf, secs, future, md_future = entry
+            if not (wait or (future.done() and md_future.done())):
+                continue
+            writes.remove(entry)
+            try:
+                md_future.result()
+                ledger.mark_done(pdf, secs, str(future.result()))
+            except Exception as exc:
+                failed.add(pdf)
+                results.pop(pdf, None)
+                ledger.mark_failed(pdf, "failed", secs, f"write: {type(exc).__name__}: {exc}")
+                logger.error("Could not save output for %s: %s", Path(pdf).name, exc)
+
+    with _make_pool(len(tasks)) as pool, JsonWriter(compact=OUTPUT_COMPACT) as writer:
+        for res in pool.run(tasks, on_start=mark_started):
+            pdf, idx = shard_of[res.key]
+            name = Path(pdf).name
+            progress.done(res.key, res.duration, res.ok)
+            if pdf in failed:
+                continue
+            elapsed[pdf] += res.duration
+            if not res.ok:
+                failed.add(pdf)
+                parts.pop(pdf, None)
+                ledger.mark_failed(pdf, "failed" if res.status == "crashed" else res.status,
+                                   elapsed[pdf], res.error)
+                if res.status == "timeout":
+                    logger.warning("Timeout — skipping %s (shard %d)", name, idx)
+                else:
+                    logger.error("Failed %s (shard %d): %s", name, idx, res.error)
+                continue
+
+            parts[pdf][idx] = res.value
+            if any(p is None for p in parts[pdf]):
+                continue
             try:
-                results.append(future.result(timeout=BATCH_FILE_TIMEOUT_SEC))
-            except FuturesTimeoutError:
-                logger.warning("Timeout — skipping %s", pdf.name)
-                future.cancel()
+                markdown, tables = stitch_conversions(parts.pop(pdf))
+                output = build_output(pdf, markdown, tables, hashes.get(pdf))
             except Exception as exc:
-                logger.error("Failed %s: %s", pdf.name, exc)
+                failed.add(pdf)
+                ledger.mark_failed(pdf, "failed", elapsed[pdf], f"{type(exc).__name__}: {exc}")
+                logger.error("Failed %s while parsing: %s", name, exc)
+                continue
+            md_future = writer.submit_text(markdown, store.path_for(Path(pdf).stem))
+            future = writer.submit(output, _output_path(pdf, output_dir))
+            writes.append((pdf, elapsed[pdf], future, md_future))
+            results[pdf] = output
+            record_writes(wait=False)
+            logger.info(
+                "[%d/%d] %s (%.1fs) — %.1f s/page, ETA %s", len(results) + len(failed),
+                len(pdf_files), name, elapsed[pdf], progress.sec_per_page,
+                format_duration(progress.eta()),
+            )
+        restarts = pool.restarts
+    record_writes(wait=True)
+
+    wall, sec_per_page = progress.summary()
+    logger.info(
+        "Batch done: %d/%d succeeded in %s, %.1f s/page (%d worker restart(s))",
+        len(results), len(pdf_files), format_duration(wall), sec_per_page, restarts,
+    )
+    return list(results.values())
 
-    logger.info("Batch done: %d/%d succeeded", len(results), len(pdf_files))
-    return results
+
+# ---------------------------------------------------------------------------
+# Corpus-wide citation recount
+# ---------------------------------------------------------------------------
+
+RECOUNT_BATCH_DOCS = 2000     # documents per bulk scan
+
+
+def _output_files(json_dir: str) -> List[Path]:
+    root = Path(json_dir)
+    return sorted([*root.glob("*_processed.json"), *root.glob(f"*_processed.json{ZSTD_SUFFIX}")])
+
+
+def _recount_batch(paths: List[Path]) -> Dict[str, int]:
+    """Recount one batch with a single bulk scan; rewrite only documents that changed."""
+    batch: List[Tuple[Path, Dict]] = []
+    for path in paths:
+        try:
+            batch.append((path, read_json(path)))
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable %s: %s", path, exc)
+    sections = [sec for _, doc in batch for sec in doc.get("sections", [])]
+    owner = np.repeat(np.arange(len(batch)), [len(doc.get("sections", [])) for _, doc in batch])
+    counts = scan_citations([sec.get("summary", "") for sec in sections]).counts
+    old = np.fromiter(
+        (sec.get("citation_count", -1) for sec in sections), dtype=np.int64, count=len(sections)
+    )
+    stale = np.flatnonzero(old != counts)
+    for i in stale.tolist():
+        sections[i]["citation_count"] = int(counts[i])
+        sections[i]["has_citation"] = bool(counts[i])
+    dirty = np.bincount(owner[stale], minlength=len(batch)) > 0
+    for (path, doc), is_dirty in zip(batch, dirty.tolist()):
+        if is_dirty:
+            write_json(doc, path, compact=OUTPUT_COMPACT)
+    return {
+        "documents": len(batch),
+        "sections": len(sections),
+        "citations": int(totals(counts, owner, len(batch)).sum()),
+        "rewritten": int(dirty.sum()),
+    }
+
+
+def recount_citations(json_dir: str, batch_docs: int = RECOUNT_BATCH_DOCS,
+                      workers: int = 0) -> Dict[str, int]:
+    """
+    Recompute `has_citation` / `citation_count` for every output in `json_dir`.
+
+    Documents are processed in batches; each batch is scanned in one pass
+    (see citations.py), stale sections are found by comparing count arrays,
+    and only documents whose counts changed are rewritten. Batches run in
+    `workers` processes (0 = one per CPU).
+    """
+    files = _output_files(json_dir)
+    batches = [files[i:i + batch_docs] for i in range(0, len(files), batch_docs)]
+    stats = {"documents": 0, "sections": 0, "citations": 0, "rewritten": 0}
+    if not batches:
+        return stats
+    workers = max(1, min(workers or os.cpu_count() or 1, len(batches)))
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) if workers > 1 else nullcontext() as pool:
+        results = pool.imap_unordered(_recount_batch, batches) if pool else map(_recount_batch, batches)
+        for part in results:
+            for key in stats:
+                stats[key] += part[key]
+            logger.info("Recounted %d/%d document(s)", stats["documents"], len(files))
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Re-parse from cached Markdown
+# ---------------------------------------------------------------------------
+
+# Fields that do not come from the Markdown and survive a re-parse. `source`
+# is looked up in the crawl catalog again, so manifests added since the
+# conversion are picked up; the old value is kept only when no manifest
+# lists the file any more.
+_KEPT_ON_REPARSE = ("doc_id", "tables")
+
+
+def _existing_output(stem: str, output_dir: str) -> Path:
+    for suffix in (".json", ".json" + ZSTD_SUFFIX):
+        path = Path(output_dir) / f"{stem}_processed{suffix}"
+        if path.exists():
+            return path
+    return _output_path(f"{stem}.pdf", output_dir)
+
+
+def _reparse_one(args: Tuple[str, str, str]) -> str:
+    stem, md_path, out_path = args
+    try:
+        derived = build_output(f"{stem}.pdf", read_text(Path(md_path)))
+        out = Path(out_path)
+        if out.exists():
+            old = read_json(out)
+            for key in _KEPT_ON_REPARSE:
+                derived.pop(key, None)
+            if derived.get("source") is None:
+                derived.pop("source", None)
+            new = {**old, **derived}
+            if new == old:
+                return "unchanged"
+            write_json(new, out, compact=OUTPUT_COMPACT)
+            return "changed"
+        write_json(derived, out, compact=OUTPUT_COMPACT)
+        return "new"
+    except Exception as exc:
+        logger.error("Re-parse failed for %s: %s", stem, exc)
+        return "failed"
+
+
+def reparse(output_dir: str, workers: int = 0) -> Dict[str, int]:
+    """
+    Re-derive every output in `output_dir` from its cached Markdown.
+
+    Only the text stages run, in `workers` processes (0 = one per CPU).
+    `doc_id` and `tables` (which come from the Docling document, not the
+    Markdown) are kept, `source` is refreshed from the crawl catalog, and a
+    file is rewritten only if its content changed.
+    """
+    store = MarkdownStore.for_output_dir(output_dir)
+    tasks = [
+        (stem, str(store.find(stem)), str(_existing_output(stem, output_dir)))
+        for stem in store.stems()
+    ]
+    stats = {"changed": 0, "unchanged": 0, "new": 0, "failed": 0}
+    if not tasks:
+        logger.error("No cached Markdown under %s", store.root)
+        return stats
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) if workers > 1 else nullcontext() as pool:
+        results = pool.imap_unordered(_reparse_one, tasks, chunksize=16) if pool \
+            else map(_reparse_one, tasks)
+        for done, status in enumerate(results, start=1):
+            stats[status] += 1
+            if done % 1000 == 0:
+                logger.info("Re-parsed %d/%d", done, len(tasks))
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Legacy doc_id migration
+# ---------------------------------------------------------------------------
+
+
+def migrate_ids(output_dir: str, pdf_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Replace date-stamped `doc_id`s in `output_dir` with content-derived ones.
+
+    PDF hashes come from the job ledger where it has them, else from the
+    PDFs in `pdf_dir`. The old → new pairs go to doc_id_map.json.
+    """
+    ledger_path = Path(output_dir) / LEDGER_FILENAME
+    hash_for: Dict[str, str] = {}
+    if ledger_path.exists():
+        ledger = JobLedger(ledger_path)
+        hash_for = ledger.hashes_by_output()
+        ledger.close()
+    return migrate_doc_ids(_output_files(output_dir), output_dir, hash_for, pdf_dir)
 
 
 # ---------------------------------------------------------------------------
@@ -429,7 +1075,11 @@ def _print_usage() -> None:
     print(
         "Usage:\n"
         "  Single:  python extract_v2.py <pdf_path> [output_dir]\n"
-        "  Batch:   python extract_v2.py --batch <pdf_dir> [output_dir]\n"
+        "  Batch:   python extract_v2.py --batch <pdf_dir> [output_dir] [--resume]\n"
+        "  Report:  python extract_v2.py --report [output_dir]\n"
+        "  Recount: python extract_v2.py --recount [output_dir]   (citation stats only)\n"
+        "  Reparse: python extract_v2.py --reparse [output_dir]   (text stages from cached Markdown)\n"
+        "  Migrate: python extract_v2.py --migrate-ids [output_dir] [pdf_dir]   (date-stamped doc_ids)\n"
         "  Default: python extract_v2.py            (uses ./pdf/ → ./json_output/)"
     )
 
@@ -439,13 +1089,53 @@ def main(argv: List[str]) -> int:
     default_pdf_dir = str(here / "pdf")
     default_out_dir = str(here / "json_output")
 
+    resume = "--resume" in argv
+    argv = [a for a in argv if a != "--resume"]
+
+    if argv and argv[0] == "--report":
+        out_dir = argv[1] if len(argv) > 1 else default_out_dir
+        ledger_path = Path(out_dir) / LEDGER_FILENAME
+        if not ledger_path.exists():
+            logger.error("No job ledger at %s", ledger_path)
+            return 1
+        ledger = JobLedger(ledger_path)
+        print(ledger.format_report())
+        ledger.close()
+        return 0
+
+    if argv and argv[0] == "--recount":
+        stats = recount_citations(argv[1] if len(argv) > 1 else default_out_dir,
+                                  workers=BATCH_MAX_WORKERS)
+        logger.info(
+            "%d document(s), %d section(s), %d citation(s); rewrote %d",
+            stats["documents"], stats["sections"], stats["citations"], stats["rewritten"],
+        )
+        return 0
+
+    if argv and argv[0] == "--migrate-ids":
+        out_dir = argv[1] if len(argv) > 1 else default_out_dir
+        stats = migrate_ids(out_dir, argv[2] if len(argv) > 2 else default_pdf_dir)
+        logger.info(
+            "doc_id migration: %d migrated, %d already current, %d without PDF",
+            stats["migrated"], stats["current"], stats["missing"],
+        )
+        return 0
+
+    if argv and argv[0] == "--reparse":
+        stats = reparse(argv[1] if len(argv) > 1 else default_out_dir, workers=os.cpu_count() or 1)
+        logger.info(
+            "Re-parse: %d changed, %d unchanged, %d new, %d failed",
+            stats["changed"], stats["unchanged"], stats["new"], stats["failed"],
+        )
+        return 0 if not stats["failed"] else 1
+
     if argv and argv[0] == "--batch":
         if len(argv) < 2:
             _print_usage()
             return 1
         pdf_dir = argv[1]
         out_dir = argv[2] if len(argv) > 2 else default_out_dir
-        batch_process(pdf_dir, out_dir)
+        batch_process(pdf_dir, out_dir, resume=resume)
         return 0
 
     if argv:
@@ -456,7 +1146,7 @@ def main(argv: List[str]) -> int:
 
     if Path(default_pdf_dir).exists():
         logger.info("Auto-processing %s", default_pdf_dir)
-        batch_process(default_pdf_dir, default_out_dir)
+        batch_process(default_pdf_dir, default_out_dir, resume=resume)
         return 0
 
     _print_usage()
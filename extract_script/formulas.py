@@ -0,0 +1,162 @@
+"""
+formulas.py — Formula extraction, normalisation and fingerprinting.
+
+Docling writes recognised formulas as LaTeX (`$$...$$` display blocks,
+`$...$` inline) when formula enrichment is on; see DOCLING_FORMULAS in
+extract_v2. Each formula is normalised so that copies survive cosmetic
+edits:
+
+    * environments, labels, spacing and sizing commands are dropped
+    * font wrappers are removed (`\\mathbf{x}` → `x`); multi-letter names
+      inside them become function tokens (`\\operatorname{softmax}`)
+    * synonymous operators are canonicalised (`\\leq` → `\\le`,
+      `\\cdot`/`\\times` → `*`, `\\dfrac` → `\\frac`, `:=` → `=`)
+    * variables (single letters and Greek letters) are renamed by order
+      of first appearance, so `a^2+b^2=c^2` and `x^2+y^2=z^2` agree
+
+A formula yields several 64-bit fingerprints: the whole formula, every
+line of a multi-line derivation, and every side of a top-level relation.
+Reusing one step of a derivation is therefore caught even when the
+surrounding steps differ. Trivial formulas (fewer than MIN_TOKENS
+normalised tokens, e.g. `$x_i$`) are not fingerprinted; standard formulas
+that survive that are stop-listed by document frequency in the indexer
+(indexer/formula_index.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, List
+
+MIN_TOKENS = 8
+
+FORMULA_REGEX = re.compile(r"\$\$([\s\S]+?)\$\$|\$([^$\n]{1,300})\$")
+
+_ENV_REGEX = re.compile(r"\\(?:begin|end)\{[a-zA-Z*]+\}")
+_LABEL_REGEX = re.compile(r"\\(?:label|tag|nonumber|notag)(?:\{[^{}]*\})?")
+_WRAPPER_REGEX = re.compile(
+    r"\\(?:mathrm|mathbf|mathit|mathsf|mathtt|mathcal|mathbb|mathfrak|boldsymbol|bm"
+    r"|operatorname\*?|text|textrm|textbf|textit)\s*\{([^{}]*)\}"
+)
+_TOKEN_REGEX = re.compile(r"\\[a-zA-Z]+|\\.|\d+(?:\.\d+)?|@[a-zA-Z]+|[a-zA-Z]|\S")
+
+_DROP = frozenset({
+    r"\left", r"\right", r"\big", r"\Big", r"\bigg", r"\Bigg", r"\bigl", r"\bigr",
+    r"\Bigl", r"\Bigr", r"\displaystyle", r"\textstyle", r"\limits", r"\nolimits",
+    r"\quad", r"\qquad", r"\,", r"\;", r"\:", r"\!", r"\ ", "~", "&",
+})
+_SYNONYMS = {
+    r"\cdot": "*", r"\times": "*", r"\ast": "*",
+    r"\leq": r"\le", r"\leqslant": r"\le", r"\geq": r"\ge", r"\geqslant": r"\ge",
+    r"\neq": r"\ne", r"\to": r"\rightarrow", r"\gets": r"\leftarrow",
+    r"\dfrac": r"\frac", r"\tfrac": r"\frac", r"\lbrace": r"\{", r"\rbrace": r"\}",
+    r"\coloneqq": "=", r"\triangleq": "=", r"\doteq": "=",
+    r"\varepsilon": r"\epsilon", r"\vartheta": r"\theta", r"\varphi": r"\phi",
+    r"\lvert": "|", r"\rvert": "|", r"\vert": "|", r"\mid": "|",
+    r"\lVert": r"\|", r"\rVert": r"\|", r"\Vert": r"\|",
+}
+_GREEK = frozenset(
+    r"\alpha \beta \gamma \delta \epsilon \zeta \eta \theta \iota \kappa \lambda \mu"
+    r" \nu \xi \pi \rho \sigma \tau \upsilon \phi \chi \psi \omega \Gamma \Delta"
+    r" \Theta \Lambda \Xi \Pi \Sigma \Upsilon \Phi \Psi \Omega".split()
+)
+_RELATIONS = frozenset({"=", "<", ">", r"\le", r"\ge", r"\ne", r"\approx", r"\propto",
+                        r"\equiv", r"\sim", r"\simeq"})
+
+
+def _unwrap(match: re.Match) -> str:
+    content = match.group(1).strip()
+    if len(content) > 1 and content.isalpha():
+        return f" @{content} "
+    return f" {content} "
+
+
+def tokenize(latex: str) -> List[str]:
+    """Canonical token list for a LaTeX formula (before variable renaming)."""
+    latex = _ENV_REGEX.sub(" ", latex)
+    latex = _LABEL_REGEX.sub(" ", latex)
+    previous = None
+    while previous != latex:                  # wrappers may nest: \mathbf{\mathrm{x}}
+        previous = latex
+        latex = _WRAPPER_REGEX.sub(_unwrap, latex)
+    latex = latex.replace(":=", "=")
+
+    tokens: List[str] = []
+    for tok in _TOKEN_REGEX.findall(latex):
+        if tok in _DROP:
+            continue
+        tokens.append(_SYNONYMS.get(tok, tok))
+    while tokens and tokens[-1] in {",", ".", ";"}:
+        tokens.pop()
+    return tokens
+
+
+def _rename(tokens: List[str]) -> List[str]:
+    names: Dict[str, str] = {}
+    out = []
+    for tok in tokens:
+        if (len(tok) == 1 and tok.isalpha()) or tok in _GREEK:
+            tok = names.setdefault(tok, f"v{len(names)}")
+        out.append(tok)
+    return out
+
+
+def _split_top_level(tokens: List[str], separators: frozenset) -> List[List[str]]:
+    parts: List[List[str]] = [[]]
+    depth = 0
+    for tok in tokens:
+        if tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+        if depth == 0 and tok in separators:
+            parts.append([])
+        else:
+            parts[-1].append(tok)
+    return [p for p in parts if p]
+
+
+def normalize_formula(latex: str) -> str:
+    return " ".join(_rename(tokenize(latex)))
+
+
+def hash_normalized(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def formula_fingerprints(latex: str) -> List[str]:
+    """Hex fingerprints for the formula, its lines and its relation sides (deduplicated)."""
+    tokens = tokenize(latex)
+    units = [tokens]
+    lines = _split_top_level(tokens, frozenset({r"\\"}))
+    if len(lines) > 1:
+        units += lines
+    for line in lines:
+        sides = _split_top_level(line, _RELATIONS)
+        if sides != [line]:          # continuation lines start with "=" and have one side
+            units += sides
+
+    seen: Dict[str, None] = {}
+    for unit in units:
+        unit = [t for t in unit if t != r"\\"]
+        if len(unit) < MIN_TOKENS:
+            continue
+        seen.setdefault(hash_normalized(" ".join(_rename(unit))), None)
+    return list(seen)
+
+
+def extract_formulas(text: str) -> List[Dict]:
+    """`[{"latex", "normalized", "hashes"}]` for each non-trivial formula in `text`."""
+    formulas = []
+    for m in FORMULA_REGEX.finditer(text):
+        latex = (m.group(1) or m.group(2)).strip()
+        hashes = formula_fingerprints(latex)
+        if not hashes:
+            continue
+        formulas.append({
+            "latex": latex,
+            "normalized": normalize_formula(latex),
+            "hashes": hashes,
+        })
+    return formulas
@@ -0,0 +1,301 @@
+"""
+job_ledger.py — SQLite job ledger for resumable batch runs.
+
+One row per PDF records its latest status, attempt count, duration and
+error, so a batch that crashes (or a machine that reboots) at file 7,000 of
+10,000 can pick up where it stopped, and run statistics can be reported
+without rescanning the output directory.
+
+Status values:
+    pending   scheduled by a run but not yet handed to a worker (no attempt used)
+    running   handed to a worker; left behind if the run died mid-file
+    done      JSON written
+    failed    converter raised / worker crashed
+    timeout   killed after BATCH_FILE_TIMEOUT_SEC
+    duplicate same bytes as a file already converted (see `error` for which)
+    invalid   rejected by the pre-flight check (see pdf_check.py) and quarantined
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("extract_v2.ledger")
+
+LEDGER_FILENAME = "job_ledger.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    pdf_path    TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    started_at  REAL,
+    finished_at REAL,
+    duration    REAL,
+    error       TEXT,
+    output_path TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS jobs_hash ON jobs(content_hash);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    n_scheduled INTEGER NOT NULL
+);
+"""
+
+_RETRYABLE = ("failed", "timeout", "running")
+
+
+class JobLedger:
+    """Thin wrapper around the ledger database; one instance per batch run."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._db.executescript(_SCHEMA)
+        self._run_id: Optional[int] = None
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a ledger was first created."""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if columns and "content_hash" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+            self._db.commit()
+
+    @classmethod
+    def for_output_dir(cls, output_dir: str) -> "JobLedger":
+        return cls(Path(output_dir) / LEDGER_FILENAME)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "JobLedger":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.finish_run()
+        self.close()
+
+    # -- scheduling ---------------------------------------------------------
+
+    def select(self, pdf_paths: Iterable[str], resume: bool, max_retries: int,
+               hash_of: Optional[Callable[[str], str]] = None) -> List[str]:
+        """
+        Filter `pdf_paths` down to the ones this run should process.
+
+        Without `resume` everything is scheduled. With `resume`, completed
+        files are skipped and failed/timed-out/interrupted files are retried
+        while they have used at most `max_retries` retries; files left
+        pending by a run that died before reaching them have used none. Files
+        out of retries are logged. A file recorded
+        as invalid that is back in the input (re-downloaded) is scheduled
+        again; the pre-flight check decides afresh. If `hash_of` is
+        given, a completed file whose bytes no longer match the recorded
+        content hash is scheduled again.
+        """
+        paths = list(pdf_paths)
+        if not resume:
+            return paths
+        rows = dict(
+            (path, (status, attempts, digest))
+            for path, status, attempts, digest in self._db.execute(
+                "SELECT pdf_path, status, attempts, content_hash FROM jobs"
+            )
+        )
+        selected = []
+        exhausted = []
+        for path in paths:
+            status, attempts, digest = rows.get(path, (None, 0, None))
+            if status is None or status in ("pending", "invalid"):
+                selected.append(path)
+            elif status in _RETRYABLE:
+                if attempts <= max_retries:
+                    selected.append(path)
+                else:
+                    exhausted.append((path, status, attempts))
+            elif status == "done" and hash_of and digest and hash_of(path) != digest:
+                selected.append(path)
+        if exhausted:
+            logger.warning("Skipping %d PDF(s) out of retries (%d attempt(s) allowed):",
+                           len(exhausted), max_retries + 1)
+            for path, status, attempts in exhausted:
+                logger.warning("  %s — %s after %d attempt(s)", Path(path).name, status, attempts)
+        return selected
+
+    def start_run(self, n_scheduled: int) -> None:
+        cur = self._db.execute(
+            "INSERT INTO runs(started_at, n_scheduled) VALUES (?, ?)",
+            (time.time(), n_scheduled),
+        )
+        self._run_id = cur.lastrowid
+        self._db.commit()
+
+    def finish_run(self) -> None:
+        if self._run_id is None:
+            return
+        self._db.execute(
+            "UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self._run_id)
+        )
+        self._db.commit()
+        self._run_id = None
+
+    # -- per-file updates ---------------------------------------------------
+
+    def done_by_hash(self, hashes: Iterable[str]) -> Dict[str, tuple[str, str]]:
+        """Map content hash → (pdf_path, output_path) for files already converted."""
+        found: Dict[str, tuple[str, str]] = {}
+        for digest in set(hashes):
+            row = self._db.execute(
+                "SELECT pdf_path, output_path FROM jobs "
+                "WHERE content_hash = ? AND status = 'done' LIMIT 1",
+                (digest,),
+            ).fetchone()
+            if row:
+                found[digest] = row
+        return found
+
+    def hashes_by_output(self) -> Dict[str, str]:
+        """Map output path → content hash for every converted file."""
+        return dict(self._db.execute(
+            "SELECT output_path, content_hash FROM jobs "
+            "WHERE status = 'done' AND output_path IS NOT NULL AND content_hash IS NOT NULL"
+        ))
+
+    def mark_queued(self, pdf_paths: Iterable[str],
+                    hashes: Optional[Dict[str, str]] = None) -> None:
+        """Record the files a run has scheduled; attempts are only counted by `mark_started`."""
+        hashes = hashes or {}
+        self._db.executemany(
+            """
+            INSERT INTO jobs(pdf_path, status, attempts, content_hash)
+            VALUES (?, 'pending', 0, ?)
+            ON CONFLICT(pdf_path) DO UPDATE SET
+                status = 'pending', started_at = NULL, finished_at = NULL, error = NULL,
+                content_hash = COALESCE(excluded.content_hash, content_hash)
+            """,
+            [(path, hashes.get(path)) for path in pdf_paths],
+        )
+        self._db.commit()
+
+    def mark_started(self, pdf_path: str) -> None:
+        """A worker has received the file's first task: one attempt used."""
+        self._db.execute(
+            """
+            INSERT INTO jobs(pdf_path, status, attempts, started_at)
+            VALUES (?, 'running', 1, ?)
+            ON CONFLICT(pdf_path) DO UPDATE SET
+                status = 'running', attempts = attempts + 1,
+                started_at = excluded.started_at, finished_at = NULL, error = NULL
+            """,
+            (pdf_path, time.time()),
+        )
+        self._db.commit()
+
+    def mark_duplicate(self, pdf_path: str, canonical_path: str,
+                       output_path: Optional[str], content_hash: str) -> None:
+        now = time.time()
+        self._db.execute(
+            """
+            INSERT INTO jobs(pdf_path, status, attempts, started_at, finished_at,
+                             duration, error, output_path, content_hash)
+            VALUES (?, 'duplicate', 0, ?, ?, 0, ?, ?, ?)
+            ON CONFLICT(pdf_path) DO UPDATE SET
+                status = 'duplicate', finished_at = excluded.finished_at,
+                error = excluded.error, output_path = excluded.output_path,
+                content_hash = excluded.content_hash
+            """,
+            (pdf_path, now, now, f"duplicate of {canonical_path}", output_path, content_hash),
+        )
+        self._db.commit()
+
+    def mark_invalid(self, pdf_path: str, reason: str) -> None:
+        now = time.time()
+        self._db.execute(
+            """
+            INSERT INTO jobs(pdf_path, status, attempts, started_at, finished_at, duration, error)
+            VALUES (?, 'invalid', 0, ?, ?, 0, ?)
+            ON CONFLICT(pdf_path) DO UPDATE SET
+                status = 'invalid', finished_at = excluded.finished_at, error = excluded.error
+            """,
+            (pdf_path, now, now, reason),
+        )
+        self._db.commit()
+
+    def mark_done(self, pdf_path: str, duration: float, output_path: str) -> None:
+        self._finish(pdf_path, "done", duration, None, output_path)
+
+    def mark_failed(self, pdf_path: str, status: str, duration: float, error: str) -> None:
+        self._finish(pdf_path, status, duration, error, None)
+
+    def _finish(self, pdf_path: str, status: str, duration: float,
+                error: Optional[str], output_path: Optional[str]) -> None:
+        self._db.execute(
+            """
+            UPDATE jobs SET status = ?, finished_at = ?, duration = ?, error = ?,
+                            output_path = COALESCE(?, output_path)
+            WHERE pdf_path = ?
+            """,
+            (status, time.time(), duration, error, output_path, pdf_path),
+        )
+        self._db.commit()
+
+    # -- reporting ----------------------------------------------------------
+
+    def stats(self) -> Dict:
+        counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        n_done, total_sec, mean_sec, max_sec = self._db.execute(
+            "SELECT COUNT(*), SUM(duration), AVG(duration), MAX(duration) "
+            "FROM jobs WHERE status = 'done'"
+        ).fetchone()
+        retried = self._db.execute("SELECT COUNT(*) FROM jobs WHERE attempts > 1").fetchone()[0]
+        wall = self._db.execute(
+            "SELECT SUM(finished_at - started_at) FROM runs WHERE finished_at IS NOT NULL"
+        ).fetchone()[0]
+        errors = self._db.execute(
+            """
+            SELECT error, COUNT(*) AS n FROM jobs
+            WHERE status IN ('failed', 'timeout', 'invalid') GROUP BY error ORDER BY n DESC LIMIT 5
+            """
+        ).fetchall()
+        return {
+            "status_counts": counts,
+            "done": n_done,
+            "retried": retried,
+            "worker_seconds": total_sec or 0.0,
+            "mean_seconds_per_pdf": mean_sec or 0.0,
+            "max_seconds_per_pdf": max_sec or 0.0,
+            "wall_seconds": wall or 0.0,
+            "pdfs_per_hour": (n_done * 3600.0 / wall) if wall else 0.0,
+            "top_errors": errors,
+        }
+
+    def format_report(self) -> str:
+        st = self.stats()
+        total = sum(st["status_counts"].values())
+        lines = [f"Ledger: {self.path}", f"Files tracked: {total}"]
+        for status in ("done", "duplicate", "invalid", "failed", "timeout", "running", "pending"):
+            n = st["status_counts"].get(status, 0)
+            pct = 100.0 * n / total if total else 0.0
+            lines.append(f"  {status:<9} {n:>7}  ({pct:5.1f}%)")
+        lines += [
+            f"Retried files:        {st['retried']}",
+            f"Mean / max sec/PDF:   {st['mean_seconds_per_pdf']:.1f} / {st['max_seconds_per_pdf']:.1f}",
+            f"Worker time (h):      {st['worker_seconds'] / 3600:.2f}",
+            f"Wall time (h):        {st['wall_seconds'] / 3600:.2f}",
+            f"Throughput (PDF/h):   {st['pdfs_per_hour']:.1f}",
+        ]
+        if st["top_errors"]:
+            lines.append("Top errors:")
+            lines += [f"  {n:>5} × {err}" for err, n in st["top_errors"]]
+        return "\n".join(lines)
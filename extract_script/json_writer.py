@@ -0,0 +1,192 @@
+"""
+json_writer.py — Atomic, compact JSON output written off the hot path.
+
+`write_json` encodes a document, writes it to a temporary file next to the
+target, fsyncs it and renames it into place, so a crash never leaves a
+truncated `_processed.json` behind. `JsonWriter` runs those writes on a
+background thread: callers hand over the dict and get a Future back, and
+the directory fsync that makes the renames durable is batched across
+files instead of paid per file.
+
+Encoding is compact by default and uses `orjson` when it is installed.
+Targets ending in `.zst` are compressed with `zstandard`. Cached Markdown
+goes through the same path via `write_text` / `submit_text`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger("json_writer")
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+ZSTD_SUFFIX = ".zst"
+ZSTD_LEVEL = 3
+
+
+def encode(data: Dict, compact: bool = True) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _compress(payload: bytes) -> bytes:
+    try:
+        import zstandard  # type: ignore
+    except ImportError as exc:
+        raise ImportError("zstandard is required for .zst output: pip install zstandard") from exc
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+
+
+def _read_bytes(path: Path) -> bytes:
+    path = Path(path)
+    with path.open("rb") as fh:
+        payload = fh.read()
+    if path.suffix == ZSTD_SUFFIX:
+        try:
+            import zstandard  # type: ignore
+        except ImportError as exc:
+            raise ImportError("zstandard is required for .zst files: pip install zstandard") from exc
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def read_json(path: Path) -> Dict:
+    """Load a document written by `write_json`, compressed or not."""
+    return json.loads(_read_bytes(path))
+
+
+def read_text(path: Path) -> str:
+    """Load a text file written by `write_text`, compressed or not."""
+    return _read_bytes(path).decode("utf-8")
+
+
+def fsync_dir(directory: Path) -> None:
+    """Make renames in `directory` durable; a no-op where directories can't be opened."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json(data: Dict, path: Path, compact: bool = True, sync_dir: bool = True) -> Path:
+    """Write `data` to `path` atomically (temp file + fsync + rename)."""
+    return _write_bytes(encode(data, compact), Path(path), sync_dir)
+
+
+def write_text(text: str, path: Path, sync_dir: bool = True) -> Path:
+    """Write `text` (UTF-8) to `path` atomically."""
+    return _write_bytes(text.encode("utf-8"), Path(path), sync_dir)
+
+
+def _write_bytes(payload: bytes, path: Path, sync_dir: bool) -> Path:
+    if path.suffix == ZSTD_SUFFIX:
+        payload = _compress(payload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.parent / f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with tmp.open("wb") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    if sync_dir:
+        fsync_dir(path.parent)
+    return path
+
+
+class JsonWriter:
+    """
+    Background writer thread with a bounded queue.
+
+    `submit` returns a Future that resolves to the written path (or raises
+    the write error) once the file has been renamed into place. Directory
+    fsyncs run every `dir_fsync_every` files and on `close`. The queue bound
+    applies back-pressure if the disk cannot keep up.
+    """
+
+    def __init__(self, compact: bool = True, max_pending: int = 64,
+                 dir_fsync_every: int = 32) -> None:
+        self.compact = compact
+        self.dir_fsync_every = dir_fsync_every
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self._dirty: Set[Path] = set()
+        self._since_sync = 0
+        self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: Dict, path: Path) -> Future:
+        future: Future = Future()
+        self._queue.put((data, Path(path), future))
+        return future
+
+    def submit_text(self, text: str, path: Path) -> Future:
+        """Like `submit`, for a text file (e.g. cached Markdown)."""
+        future: Future = Future()
+        self._queue.put((text, Path(path), future))
+        return future
+
+    def _sync_dirs(self) -> None:
+        for directory in self._dirty:
+            fsync_dir(directory)
+        self._dirty.clear()
+        self._since_sync = 0
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._sync_dirs()
+                return
+            data, path, future = item
+            try:
+                if isinstance(data, str):
+                    written = write_text(data, path, sync_dir=False)
+                else:
+                    written = write_json(data, path, self.compact, sync_dir=False)
+            except Exception as exc:
+                logger.error("Could not save %s: %s", path, exc)
+                future.set_exception(exc)
+                continue
+            self._dirty.add(written.parent)
+            self._since_sync += 1
+            if self._since_sync >= self.dir_fsync_every:
+                self._sync_dirs()
+            future.set_result(written)
+
+    def close(self) -> None:
+        """Drain the queue, fsync touched directories and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "JsonWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,113 @@
+"""
+langid.py — Offline, CPU-only language identification for section text.
+
+Used by extract_v2 to tag every section with a language so translated
+papers (e.g. a Vietnamese or Chinese rewrite of an English ACL paper) can
+be routed to the cross-lingual matching path.
+
+If `LID_MODEL` points at a fastText language-ID model (lid.176.ftz) and
+the `fasttext` package is installed, that model is used. Otherwise a small
+rule-based detector decides from the Unicode script mix, Vietnamese
+diacritics and function-word profiles. That is enough to separate the
+languages we see in practice, and it has no dependencies.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from typing import Optional, Tuple
+
+UNKNOWN = "und"
+_MIN_LETTERS = 20
+
+_SCRIPTS = (
+    ("ko", 0xAC00, 0xD7AF),   # Hangul syllables
+    ("ja", 0x3040, 0x30FF),   # Hiragana + Katakana
+    ("zh", 0x4E00, 0x9FFF),   # CJK unified ideographs (also used by ja)
+    ("ru", 0x0400, 0x04FF),   # Cyrillic
+    ("ar", 0x0600, 0x06FF),
+    ("hi", 0x0900, 0x097F),   # Devanagari
+    ("th", 0x0E00, 0x0E7F),
+)
+
+_VI_LETTERS = frozenset(
+    "ăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ"
+)
+
+_FUNCTION_WORDS = {
+    "en": "the of and to in is that for with as are this we on by be from which an",
+    "vi": "của và là các những trong được cho với một này không có để đã theo khi",
+    "fr": "le la les des et est une dans pour que qui sur par avec sont du au",
+    "de": "der die und das ist nicht mit den von für eine auf sich des werden zu",
+    "es": "el la los las de que y en un una por con para es del se al",
+    "pt": "o a os as de que e em um uma para com não do da no na",
+    "it": "il la di che e un una per con non sono del della gli nel alla",
+    "id": "yang dan di dengan untuk dari ini dalam pada adalah tidak akan ke",
+}
+_FUNCTION_SETS = {lang: frozenset(words.split()) for lang, words in _FUNCTION_WORDS.items()}
+
+_WORD_REGEX = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+_FASTTEXT_MODEL = None
+
+
+def _fasttext_model():
+    global _FASTTEXT_MODEL
+    path = os.environ.get("LID_MODEL")
+    if _FASTTEXT_MODEL is None and path and os.path.exists(path):
+        try:
+            import fasttext  # type: ignore
+        except ImportError:
+            return None
+        _FASTTEXT_MODEL = fasttext.load_model(path)
+    return _FASTTEXT_MODEL
+
+
+def _detect_rules(text: str) -> Tuple[str, float]:
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) < _MIN_LETTERS:
+        return UNKNOWN, 0.0
+
+    scripts: Counter = Counter()
+    for c in letters:
+        cp = ord(c)
+        for lang, lo, hi in _SCRIPTS:
+            if lo <= cp <= hi:
+                scripts[lang] += 1
+                break
+    if scripts:
+        lang, n = scripts.most_common(1)[0]
+        if n / len(letters) > 0.3:
+            # Japanese text mixes kana into kanji; any real share of kana means ja.
+            if lang == "zh" and scripts["ja"] > 0.1 * n:
+                lang = "ja"
+            return lang, n / len(letters)
+
+    lower = text.lower()
+    vi_share = sum(1 for c in lower if c in _VI_LETTERS) / len(letters)
+    if vi_share > 0.02:
+        return "vi", min(1.0, vi_share * 10)
+
+    words = _WORD_REGEX.findall(lower)
+    if not words:
+        return UNKNOWN, 0.0
+    scores = {
+        lang: sum(1 for w in words if w in vocab) for lang, vocab in _FUNCTION_SETS.items()
+    }
+    best = max(scores, key=scores.get)
+    total = sum(scores.values())
+    if not scores[best]:
+        return UNKNOWN, 0.0
+    return best, scores[best] / total
+
+
+def detect_language(text: str, model: Optional[object] = None) -> Tuple[str, float]:
+    """Return `(iso_639_1_code, confidence)`; `("und", 0.0)` when undecidable."""
+    model = model or _fasttext_model()
+    if model is not None:
+        labels, probs = model.predict(" ".join(text.split())[:5000])
+        if labels:
+            return labels[0].replace("__label__", ""), float(probs[0])
+    return _detect_rules(text)
@@ -0,0 +1,155 @@
+"""
+lexrank.py — LexRank extractive summaries with NumPy.
+
+Same algorithm and parameters as sumy's `LexRankSummarizer` (threshold 0.1,
+power-method epsilon 0.1, tf normalised by the sentence's max tf,
+idf = log(N / (1 + n_j)) within the text being summarised), so it picks
+the same sentences. The difference is where the time goes: sumy computes
+every sentence pair's cosine in a Python double loop over dicts. Here
+`summarize_texts` takes all sections of a document together: their
+sentences form one TF-IDF array (each section numbering its own terms and
+counting its own IDF), every cosine comes from one matrix product, and
+only its diagonal blocks, one per section, are used. Only the power
+iteration, on each section's small 0/1 block, runs per section.
+Batches are capped at _BATCH_SENTENCES sentences to bound the dense arrays.
+
+Sentences are split the way sumy's PlaintextParser splits them with
+`AcademicTokenizer` (see sentences.py): blank lines separate paragraphs,
+lines are joined, all-caps lines are headings and are not ranked. The
+parity and speed check against sumy is bench_lexrank.py.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from sentences import split_sentences, split_words
+
+THRESHOLD = 0.1
+EPSILON = 0.1
+_MAX_ITERATIONS = 1000
+_BATCH_SENTENCES = 256       # sentences per TF-IDF array / cosine product
+
+
+def _is_heading(line: str) -> bool:
+    return line.isupper() and all(not c.isalpha() or c.isupper() for c in line)
+
+
+def plaintext_sentences(text: str) -> List[str]:
+    """Sentences of `text` as sumy's PlaintextParser yields them (headings dropped)."""
+    sentences: List[str] = []
+    buffer = ""
+    for line in text.splitlines() + [""]:
+        line = line.strip()
+        if line and not _is_heading(line):
+            buffer += " " + line
+            continue
+        if buffer.strip():
+            sentences += split_sentences(buffer.strip())
+        buffer = ""
+    return sentences
+
+
+def tfidf_rows(sentences: Sequence[str], starts: Sequence[int] = (0,)) -> np.ndarray:
+    """
+    L2-normalised TF-IDF row per sentence.
+
+    `sentences` may hold several texts back to back, beginning at the
+    (increasing, non-empty) offsets `starts`. Each text is vectorised as if
+    alone: IDF is taken over its own sentences, and its terms are numbered
+    from column 0, so the array is only as wide as the largest text's
+    vocabulary. Rows are therefore only comparable within one text.
+    """
+    words = [split_words(sentence.lower()) for sentence in sentences]
+    bounds = list(starts) + [len(sentences)]
+    vocabs: List[Dict[str, int]] = []
+    ids: List[int] = []
+    for a, b in zip(bounds, bounds[1:]):
+        vocab: Dict[str, int] = {}
+        ids += [vocab.setdefault(w, len(vocab)) for ws in words[a:b] for w in ws]
+        vocabs.append(vocab)
+    term_ids = np.array(ids, dtype=np.int64)
+    row_ids = np.repeat(np.arange(len(sentences)), [len(ws) for ws in words])
+    n_terms = max([1] + [len(vocab) for vocab in vocabs])
+    tf = np.bincount(row_ids * n_terms + term_ids, minlength=len(sentences) * n_terms)
+    tf = tf.reshape(len(sentences), n_terms).astype(np.float64)
+
+    present = tf > 0
+    max_tf = tf.max(axis=1, keepdims=True)
+    max_tf[max_tf == 0] = 1.0
+    starts = np.asarray(starts, dtype=np.int64)
+    sizes = np.diff(np.append(starts, len(sentences)))
+    doc_freq = np.add.reduceat(present, starts, axis=0, dtype=np.int64)
+    idf = np.log(sizes[:, None] / (1.0 + doc_freq))
+    weights = tf / max_tf * np.repeat(idf, sizes, axis=0)
+
+    norms = np.sqrt(np.einsum("ij,ij->i", weights, weights))[:, None]
+    return np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+
+
+def _power_method(matrix: np.ndarray, epsilon: float) -> np.ndarray:
+    p = np.full(len(matrix), 1.0 / len(matrix))
+    transposed = np.ascontiguousarray(matrix.T)
+    with np.errstate(invalid="ignore"):          # all-zero matrix: NaN, as in sumy
+        for _ in range(_MAX_ITERATIONS):
+            nxt = transposed @ p
+            nxt /= np.sqrt(nxt @ nxt)
+            diff = nxt - p
+            p = nxt
+            if not np.sqrt(diff @ diff) > epsilon:
+                break
+    return p
+
+
+def _rank(linked: np.ndarray, epsilon: float) -> np.ndarray:
+    """Power-iteration scores for a 0/1 similarity graph, rows degree-normalised."""
+    adjacency = linked.astype(np.float64)
+    degrees = adjacency.sum(axis=1, keepdims=True)
+    degrees[degrees == 0] = 1.0
+    return _power_method(adjacency / degrees, epsilon)
+
+
+def lexrank_scores(sentences: Sequence[str], threshold: float = THRESHOLD,
+                   epsilon: float = EPSILON) -> np.ndarray:
+    """LexRank score of every sentence: one matrix product, then power iteration."""
+    if not sentences:
+        return np.zeros(0)
+    rows = tfidf_rows(sentences)
+    return _rank(rows @ rows.T > threshold, epsilon)
+
+
+def _batches(sentence_lists: List[List[str]]) -> Iterator[range]:
+    """Consecutive text indices holding about _BATCH_SENTENCES sentences each."""
+    start, size = 0, 0
+    for i, sentences in enumerate(sentence_lists):
+        if size and size + len(sentences) > _BATCH_SENTENCES:
+            yield range(start, i)
+            start, size = i, 0
+        size += len(sentences)
+    if start < len(sentence_lists):
+        yield range(start, len(sentence_lists))
+
+
+def summarize_texts(texts: Sequence[str], sentences_count: int = 2) -> List[List[str]]:
+    """Top `sentences_count` sentences of each text, in their original order."""
+    sentence_lists = [plaintext_sentences(text) for text in texts]
+    summaries: List[List[str]] = []
+    for batch in _batches(sentence_lists):
+        spans, flat = [], []
+        for i in batch:
+            spans.append((len(flat), len(flat) + len(sentence_lists[i])))
+            flat += sentence_lists[i]
+        if flat:
+            rows = tfidf_rows(flat, [a for a, b in spans if b > a])
+            linked = rows @ rows.T > THRESHOLD
+        for i, (a, b) in zip(batch, spans):
+            scores = _rank(linked[a:b, a:b], EPSILON) if b > a else np.zeros(0)
+            best = np.argsort(-scores, kind="stable")[:sentences_count]
+            summaries.append([sentence_lists[i][j] for j in sorted(best.tolist())])
+    return summaries
+
+
+def summarize(text: str, sentences_count: int = 2) -> List[str]:
+    return summarize_texts([text], sentences_count)[0]
@@ -0,0 +1,59 @@
+"""
+markdown_store.py — Raw Docling Markdown kept next to the JSON outputs.
+
+Docling conversion is by far the slowest stage, while the text stages
+(title, abstract, sections, references, masks, formulas) only need its
+Markdown. Keeping the Markdown lets `--reparse` re-derive every output
+after a rule change without converting a single PDF again.
+
+    <output_dir>/markdown/<pdf stem>.md        (or .md.zst when compressed)
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional
+
+from json_writer import ZSTD_SUFFIX, read_text, write_text
+
+MARKDOWN_DIR = "markdown"
+_SUFFIXES = (".md", ".md" + ZSTD_SUFFIX)
+
+
+class MarkdownStore:
+    def __init__(self, root: Path, compress: bool = False) -> None:
+        self.root = Path(root)
+        self.compress = compress
+
+    @classmethod
+    def for_output_dir(cls, output_dir: str, compress: bool = False) -> "MarkdownStore":
+        return cls(Path(output_dir) / MARKDOWN_DIR, compress)
+
+    def path_for(self, stem: str) -> Path:
+        """Where `put` writes the Markdown for `stem`."""
+        return self.root / (stem + _SUFFIXES[1 if self.compress else 0])
+
+    def find(self, stem: str) -> Optional[Path]:
+        """The stored file for `stem`, whichever suffix it was written with."""
+        for suffix in _SUFFIXES:
+            path = self.root / (stem + suffix)
+            if path.exists():
+                return path
+        return None
+
+    def get(self, stem: str) -> Optional[str]:
+        path = self.find(stem)
+        return read_text(path) if path else None
+
+    def put(self, stem: str, markdown: str) -> Path:
+        return write_text(markdown, self.path_for(stem))
+
+    def stems(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        found = set()
+        for path in self.root.iterdir():
+            for suffix in _SUFFIXES:
+                if path.name.endswith(suffix) and not path.name.startswith("."):
+                    found.add(path.name[:-len(suffix)])
+        return sorted(found)
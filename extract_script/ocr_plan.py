@@ -0,0 +1,94 @@
+"""
+ocr_plan.py — Decide page by page whether a PDF needs OCR.
+
+Born-digital papers (CVF, ACL, arXiv) carry a text layer on every page, and
+running Docling's OCR over them costs most of the conversion time for
+nothing. The pre-pass reads each page's text layer with PyMuPDF and flags a
+page for OCR only when:
+
+  * it has fewer than OCR_MIN_CHARS characters of text while images cover
+    at least OCR_MIN_IMAGE_COVER of the page (a scan or an image-only
+    page), or
+  * more than OCR_MAX_BAD_SHARE of its characters are U+FFFD or
+    private-use code points (a text layer whose fonts cannot be decoded).
+
+`ocr_runs` groups the flags into contiguous page ranges, so a document is
+converted as a few runs with OCR on or off rather than page by page.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("extract_v2.ocr")
+
+OCR_MIN_CHARS = 200           # non-whitespace characters on a page with a real text layer
+OCR_MIN_IMAGE_COVER = 0.3     # share of the page area covered by images
+OCR_MAX_BAD_SHARE = 0.3       # undecodable characters tolerated in a text layer
+OCR_ALL_SHARE = 0.5           # OCR the whole document once this share of pages needs it
+
+PageRange = Tuple[int, int]   # 1-based, inclusive (Docling convention)
+
+
+def _bad_share(text: str) -> float:
+    if not text:
+        return 0.0
+    bad = sum(1 for ch in text if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff")
+    return bad / len(text)
+
+
+def _image_cover(page) -> float:
+    area = abs(page.rect) or 1.0
+    covered = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        covered += max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    return min(1.0, covered / area)
+
+
+def page_needs_ocr(page) -> bool:
+    """True if a PyMuPDF page has no usable text layer but does have content."""
+    text = "".join(page.get_text("text").split())
+    if _bad_share(text) > OCR_MAX_BAD_SHARE:
+        return True
+    return len(text) < OCR_MIN_CHARS and _image_cover(page) >= OCR_MIN_IMAGE_COVER
+
+
+def scan_pages(pdf_path: str) -> Optional[List[bool]]:
+    """
+    One OCR flag per page, in page order.
+
+    None when PyMuPDF is missing or cannot read the file; callers then fall
+    back to OCR everywhere.
+    """
+    try:
+        import fitz  # type: ignore
+    except ImportError:
+        return None
+    try:
+        with fitz.open(pdf_path) as doc:
+            return [page_needs_ocr(page) for page in doc]
+    except Exception as exc:
+        logger.warning("OCR pre-pass failed for %s: %s", pdf_path, exc)
+        return None
+
+
+def ocr_runs(flags: List[bool]) -> List[Tuple[PageRange, bool]]:
+    """
+    Contiguous `(page range, ocr)` runs covering every page.
+
+    Documents where at least OCR_ALL_SHARE of the pages need OCR are mostly
+    scans and come back as a single OCR run.
+    """
+    if not flags:
+        return []
+    if sum(flags) >= OCR_ALL_SHARE * len(flags):
+        return [((1, len(flags)), True)]
+    runs: List[Tuple[PageRange, bool]] = []
+    start = 1
+    for page in range(2, len(flags) + 2):
+        if page > len(flags) or flags[page - 1] != flags[start - 1]:
+            runs.append(((start, page - 1), flags[start - 1]))
+            start = page
+    return runs
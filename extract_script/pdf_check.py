@@ -0,0 +1,134 @@
+"""
+pdf_check.py — Pre-flight PDF validation and quarantine.
+
+A download interrupted half-way leaves a file that starts like a PDF but
+has no trailer; Docling then spends the whole BATCH_FILE_TIMEOUT_SEC on it
+before the batch gives up. `validate_pdf` rejects such files in a few
+milliseconds, before anything is scheduled:
+
+  * size — at least MIN_PDF_BYTES;
+  * header — `%PDF-` within the first kilobyte;
+  * trailer — `startxref <offset>` and `%%EOF` in the last bytes;
+  * with PyMuPDF installed — the document opens, needs no password, has
+    pages, and its first and last pages parse.
+
+A `startxref` offset that is out of range or misses the xref is common in
+real files and both PyMuPDF and Docling repair it, so it is only logged;
+the PyMuPDF open decides. Without PyMuPDF such files are let through.
+
+Rejected files are moved to QUARANTINE_DIR under a name suffixed with the
+time and a hash of their bytes (so a second broken copy never overwrites the
+first) and listed by their original name in its requeue.jsonl, which the crawlers read to download them again (see
+crawler_script/downloads.py). A re-downloaded file is a new file to the
+job ledger, so the next batch converts it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("extract_v2.pdf_check")
+
+MIN_PDF_BYTES = 1024
+QUARANTINE_DIR = Path(os.environ.get(
+    "PDF_QUARANTINE_DIR", Path(__file__).resolve().parent.parent / "quarantine"
+))
+REQUEUE_FILENAME = "requeue.jsonl"
+
+_HEAD_BYTES = 1024
+_TAIL_BYTES = 4096
+_STARTXREF_REGEX = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+_XREF_AT_REGEX = re.compile(rb"\s*(?:xref|\d+\s+\d+\s+obj)")
+
+
+def _check_structure(path: str) -> Optional[str]:
+    size = os.path.getsize(path)
+    if size < MIN_PDF_BYTES:
+        return f"too small ({size} bytes)"
+    with open(path, "rb") as fh:
+        head = fh.read(_HEAD_BYTES)
+        if b"%PDF-" not in head:
+            return "no %PDF header"
+        fh.seek(max(0, size - _TAIL_BYTES))
+        tail = fh.read()
+        # Incremental updates append further trailers; the last one counts.
+        m = None
+        for m in _STARTXREF_REGEX.finditer(tail):
+            pass
+        if m is None:
+            return "truncated (no startxref/%%EOF trailer)"
+        offset = int(m.group(1))
+        fh.seek(min(offset, size))
+        if offset >= size or not _XREF_AT_REGEX.match(fh.read(32)):
+            logger.info("%s: startxref offset %d misses the xref (left to the repairing reader)",
+                        Path(path).name, offset)
+    return None
+
+
+def _check_document(path: str) -> Optional[str]:
+    try:
+        import fitz  # type: ignore
+    except ImportError:
+        return None
+    try:
+        with fitz.open(path) as doc:
+            if doc.needs_pass:
+                return "encrypted (password required)"
+            if doc.page_count == 0:
+                return "no pages"
+            doc.load_page(0).get_text("text")
+            doc.load_page(doc.page_count - 1).get_text("text")
+    except Exception as exc:
+        return f"unreadable: {type(exc).__name__}: {exc}"
+    return None
+
+
+def validate_pdf(path: str) -> Optional[str]:
+    """None if `path` looks like a complete, readable PDF; else the reason it does not."""
+    try:
+        return _check_structure(path) or _check_document(path)
+    except OSError as exc:
+        return f"unreadable: {exc}"
+
+
+def _short_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:8]
+
+
+def quarantine(path: str, reason: str, quarantine_dir: Path = QUARANTINE_DIR) -> Path:
+    """Move a rejected PDF out of the input directory and queue it for re-download."""
+    quarantine_dir = Path(quarantine_dir)
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    source = Path(path)
+    size = source.stat().st_size if source.exists() else 0
+    now = time.time()
+    stem = f"{source.stem}.{int(now)}-{_short_hash(source)}"
+    target = quarantine_dir / f"{stem}{source.suffix}"
+    n = 1
+    while target.exists():
+        target = quarantine_dir / f"{stem}-{n}{source.suffix}"
+        n += 1
+    os.replace(source, target)
+    with (quarantine_dir / REQUEUE_FILENAME).open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps({
+            "file": source.name,
+            "quarantined_as": target.name,
+            "source_path": str(source),
+            "reason": reason,
+            "size": size,
+            "status": "quarantined",
+            "at": now,
+        }, ensure_ascii=False) + "\n")
+    logger.warning("Quarantined %s: %s", source.name, reason)
+    return target
@@ -0,0 +1,121 @@
+"""
+scheduler.py — Size-aware ordering, per-task timeouts and ETA for batch runs.
+
+Conversion time grows with page count, and OCR pages cost several times
+more than born-digital ones. Handing out tasks in file-name order leaves a
+200-page paper for the end of the batch, where it keeps one core busy while
+the others sit idle, and one fixed timeout is both too short for long
+papers and far too generous for a 6-page one.
+
+Every task is costed up front from its page range (or, for whole-file
+tasks, the PyMuPDF page count, falling back to file size over
+BYTES_PER_PAGE):
+
+    cost    = pages × (OCR_COST if OCR else 1)
+    timeout = clamp(TIMEOUT_BASE_SEC + cost × TIMEOUT_PER_PAGE_SEC,
+                    TIMEOUT_MIN_SEC, TIMEOUT_MAX_SEC)
+
+`lpt_order` sorts tasks longest-first. The pool gives the next task to
+whichever worker frees up first, so this is Graham's LPT list schedule,
+whose makespan is within 4/3 of optimal; `makespan` simulates it for the
+start-of-batch estimate. `Progress` replaces the prior SEC_PER_PAGE with the
+seconds per page actually observed and turns the remaining cost into an ETA.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BYTES_PER_PAGE = 80_000       # typical born-digital paper; used when the page count is unknown
+OCR_COST = 3.0                # an OCR page costs this many text-layer pages
+SEC_PER_PAGE = float(os.environ.get("BATCH_SEC_PER_PAGE", "3"))   # prior until pages are timed
+TIMEOUT_BASE_SEC = float(os.environ.get("BATCH_TIMEOUT_BASE_SEC", "60"))     # model load, parsing
+TIMEOUT_PER_PAGE_SEC = float(os.environ.get("BATCH_TIMEOUT_PER_PAGE_SEC", "20"))
+TIMEOUT_MIN_SEC = float(os.environ.get("BATCH_TIMEOUT_MIN_SEC", "120"))
+TIMEOUT_MAX_SEC = float(os.environ.get("BATCH_TIMEOUT_MAX_SEC", "3600"))
+
+
+def estimate_pages(pdf_path: str, page_count: Optional[int]) -> int:
+    """`page_count` when known, else a guess from the file size (at least 1)."""
+    if page_count:
+        return page_count
+    try:
+        size = os.path.getsize(pdf_path)
+    except OSError:
+        return 1
+    return max(1, round(size / BYTES_PER_PAGE))
+
+
+def task_cost(pages: int, ocr: bool) -> float:
+    return pages * (OCR_COST if ocr else 1.0)
+
+
+def task_timeout(cost: float) -> float:
+    return min(TIMEOUT_MAX_SEC, max(TIMEOUT_MIN_SEC, TIMEOUT_BASE_SEC + cost * TIMEOUT_PER_PAGE_SEC))
+
+
+def lpt_order(costs: Dict[str, float]) -> List[str]:
+    """Task keys, most expensive first (ties in key order, so runs are repeatable)."""
+    return sorted(costs, key=lambda key: (-costs[key], key))
+
+
+def makespan(costs: Iterable[float], workers: int) -> float:
+    """Finish time of the greedy list schedule of `costs` (in order) on `workers`."""
+    loads = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+
+@dataclass
+class _Observed:
+    cost: float = 0.0
+    seconds: float = 0.0
+
+
+class Progress:
+    """Remaining cost per task plus the observed seconds per page, for an ETA."""
+
+    def __init__(self, costs: Dict[str, float], workers: int) -> None:
+        self.remaining = dict(costs)
+        self.workers = max(1, workers)
+        self.observed = _Observed()
+        self.started = time.monotonic()
+
+    @property
+    def sec_per_page(self) -> float:
+        if self.observed.cost:
+            return self.observed.seconds / self.observed.cost
+        return SEC_PER_PAGE
+
+    def done(self, key: str, seconds: float, ok: bool) -> None:
+        """Record a finished task; only successes feed the rate (timeouts would inflate it)."""
+        cost = self.remaining.pop(key, 0.0)
+        if ok and cost:
+            self.observed.cost += cost
+            self.observed.seconds += seconds
+
+    def eta(self) -> float:
+        """Seconds until the batch is done: spread remaining work, but no less than its longest task."""
+        if not self.remaining:
+            return 0.0
+        rate = self.sec_per_page
+        spread = sum(self.remaining.values()) * rate / min(self.workers, len(self.remaining))
+        return max(spread, max(self.remaining.values()) * rate)
+
+    def summary(self) -> Tuple[float, float]:
+        """`(elapsed seconds, observed seconds per page)`."""
+        return time.monotonic() - self.started, self.sec_per_page
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
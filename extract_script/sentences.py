@@ -0,0 +1,104 @@
+"""
+sentences.py — Rule-based sentence splitter for scientific prose.
+
+NLTK's punkt model is general-purpose: it splits after "et al.", "Fig.",
+"Eq." and reference brackets, and loading it (plus checking its data files)
+is slow enough to matter when called per section. This splitter is a
+single compiled regex over candidate boundaries plus a set lookup for the
+word in front of each one:
+
+  * a boundary is `.`, `!` or `?` (optionally followed by closing quotes or
+    brackets and a numeric citation like "[12]") then whitespace, before a
+    word that does not start in lower case (capitals with diacritics
+    count), or CJK `。！？`;
+  * it is rejected after known abbreviations ("Fig.", "Eq.", "e.g.",
+    "vs.", ...), after single-letter initials ("J. Smith"), and after
+    "et al." unless a capitalised word follows;
+  * decimals ("0.5") and version numbers never match, since no space
+    follows their dot.
+
+It has no dependencies, so the summariser and the embedding index's
+passage chunking share it. `AcademicTokenizer` plugs it into sumy.
+`bench_sentences.py` compares it with punkt on the bundled outputs.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Tuple
+
+_ABBREVIATIONS = frozenset({
+    "fig.", "figs.", "eq.", "eqs.", "tab.", "sec.", "secs.", "sect.", "ch.",
+    "app.", "alg.", "def.", "thm.", "lem.", "prop.", "cor.", "ref.", "refs.",
+    "e.g.", "i.e.", "cf.", "vs.", "viz.", "resp.", "approx.", "w.r.t.", "a.k.a.",
+    "etc.", "incl.", "no.", "nos.", "vol.", "pp.", "p.", "ed.", "eds.",
+    "dr.", "prof.", "mr.", "mrs.", "ms.", "st.", "jr.", "sr.", "inc.", "ltd.", "co.",
+    "jan.", "feb.", "mar.", "apr.", "jun.", "jul.", "aug.", "sep.", "sept.",
+    "oct.", "nov.", "dec.", "u.s.", "u.k.", "ph.d.", "m.sc.", "b.sc.",
+})
+
+_BOUNDARY_REGEX = re.compile(
+    # One leading character class lets the regex engine skip ahead to the
+    # next terminator instead of trying both branches at every position.
+    r"[.!?。！？](?:"
+    r"(?<=[.!?])[.!?]*"
+    r"(?:[\"'”’)\]]+|\s?\[\d+(?:\s*[,–-]\s*\d+)*\])*"   # closing quotes/brackets, "[12]"
+    r"\s+(?=[\"'“‘(\[]?\w)"
+    r"|(?<=[。！？])[。！？]*\s*(?=\S)"                    # CJK: no space needed
+    r")"
+)
+_OPENERS = "\"'“‘(["
+_WORD_REGEX = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+
+
+def _is_boundary(text: str, m: re.Match) -> bool:
+    nxt = text[m.end():m.end() + 2].lstrip(_OPENERS)[:1]
+    if nxt.islower():
+        return False
+    if text[m.start()] != ".":
+        return True
+    word_start = max(text.rfind(" ", 0, m.start()), text.rfind("\n", 0, m.start())) + 1
+    word = text[word_start:m.start() + 1].lstrip(_OPENERS).lower()
+    if word in _ABBREVIATIONS:
+        return False
+    if len(word) == 2 and word[0].isalpha():          # initial: "J. Smith"
+        return False
+    if word == "al.":                                 # "et al. (2020)", "et al. [3]"
+        return text[m.end():m.end() + 1].isalpha()
+    return True
+
+
+@lru_cache(maxsize=4096)
+def split_sentences(text: str) -> Tuple[str, ...]:
+    """Sentences of `text` in order, stripped; cached for texts seen again."""
+    sentences = []
+    pos = 0
+    for m in _BOUNDARY_REGEX.finditer(text):
+        if _is_boundary(text, m):
+            end = m.end() - len(m.group()) + len(m.group().rstrip())
+            sentence = text[pos:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            pos = m.end()
+    tail = text[pos:].strip()
+    if tail:
+        sentences.append(tail)
+    return tuple(sentences)
+
+
+def split_words(sentence: str) -> Tuple[str, ...]:
+    return tuple(_WORD_REGEX.findall(sentence))
+
+
+class AcademicTokenizer:
+    """Drop-in for `sumy.nlp.tokenizers.Tokenizer` backed by `split_sentences`."""
+
+    def __init__(self, language: str = "english") -> None:
+        self.language = language
+
+    def to_sentences(self, paragraph: str) -> Tuple[str, ...]:
+        return split_sentences(paragraph)
+
+    def to_words(self, sentence: str) -> Tuple[str, ...]:
+        return split_words(sentence)
@@ -0,0 +1,64 @@
+"""
+span_mask.py — Character spans of a section that must not count as shared text.
+
+Citation markers, quotations, equations, Docling placeholders and
+publisher/watermark lines are the same in many unrelated papers, so the
+indexer never shingles across them. `build_span_mask` is used both by the
+extractor (the `mask` of every section) and by the indexer's snippet check,
+so a pasted paragraph is masked exactly as indexed text was.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, Tuple
+
+if __package__:
+    from .citations import CITATION_REGEX
+    from .formulas import FORMULA_REGEX
+else:  # run from extract_script/ with sibling imports
+    from citations import CITATION_REGEX
+    from formulas import FORMULA_REGEX
+
+# CVF / publisher watermark (also keeps it from being mistaken for the title)
+WATERMARK_REGEX = re.compile(
+    r"open access|computer vision foundation|ieee xplore|watermark"
+    r"|proceedings|conference on computer vision|arxiv|preprint",
+    re.IGNORECASE,
+)
+
+_QUOTE_REGEX = re.compile(r"“[^”\n]{12,600}”|\"[^\"\n]{12,600}\"")
+_EQUATION_REGEX = re.compile(FORMULA_REGEX.pattern + r"|<!-- formula-not-decoded -->")
+_PLACEHOLDER_REGEX = re.compile(r"<!--[^>]{0,80}-->")
+_LINE_REGEX = re.compile(r"[^\n]+")
+_BOILERPLATE_MAX_LINE = 300   # longer lines are prose that merely mentions arXiv etc.
+
+
+def build_span_mask(text: str) -> List[List]:
+    """
+    Mark citations, quotations, equations and boilerplate in `text`.
+
+    Returns sorted, merged `[start, end, kind]` spans; where spans of
+    different kinds overlap, the earlier span's kind wins.
+    """
+    spans: List[Tuple[int, int, str]] = []
+    spans += [(m.start(), m.end(), "c") for m in CITATION_REGEX.finditer(text)]
+    spans += [(m.start(), m.end(), "q") for m in _QUOTE_REGEX.finditer(text)]
+    spans += [(m.start(), m.end(), "e") for m in _EQUATION_REGEX.finditer(text)]
+    spans += [
+        (m.start(), m.end(), "b") for m in _PLACEHOLDER_REGEX.finditer(text)
+        if "formula" not in m.group(0)
+    ]
+    spans += [
+        (m.start(), m.end(), "b") for m in _LINE_REGEX.finditer(text)
+        if len(m.group(0)) <= _BOILERPLATE_MAX_LINE and WATERMARK_REGEX.search(m.group(0))
+    ]
+    spans.sort()
+
+    merged: List[List] = []
+    for start, end, kind in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end, kind])
+    return merged
@@ -0,0 +1,312 @@
+"""
+worker_pool.py — Memory-guarded process pool for long Docling batch runs.
+
+`ProcessPoolExecutor` never recycles its workers, so converters that leak
+memory (Docling layout models, PaddleOCR) grow until the kernel OOM-kills
+the whole batch. `MemoryGuardedPool` supervises every worker itself:
+
+  * a worker is restarted after `max_tasks_per_worker` tasks, or as soon as
+    its RSS is above `max_worker_rss_mb` when it finishes a task;
+  * a task is only handed out while the summed RSS of all workers stays
+    under `memory_budget_mb`;
+  * a task that runs past its timeout gets its worker killed and replaced;
+  * a task whose worker died before it could be sent (e.g. killed for RSS
+    by an outside monitor) is re-queued on a fresh worker.
+
+Each worker talks to the supervisor over its own pipe, so killing one
+worker can never corrupt a queue shared with the others.
+
+RSS is read with psutil when installed, otherwise from /proc (Linux). On
+platforms with neither, the memory limits are simply not enforced.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("extract_v2.pool")
+
+_MB = 1024 * 1024
+_MAX_SEND_RETRIES = 2   # fresh workers a task is re-queued on when its send fails
+
+
+# ---------------------------------------------------------------------------
+# Task / result records
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Task:
+    key: str                          # caller's identifier, echoed in TaskResult
+    args: tuple
+    timeout: Optional[float] = None   # seconds; None → pool default
+
+
+@dataclass
+class TaskResult:
+    key: str
+    status: str                       # "ok" | "failed" | "timeout" | "crashed"
+    value: Any = None
+    error: str = ""
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+# ---------------------------------------------------------------------------
+# RSS probing
+# ---------------------------------------------------------------------------
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of `pid` in MiB, or None when it cannot be read."""
+    try:
+        import psutil  # type: ignore
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / _MB
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f"/proc/{pid}/statm", "r", encoding="ascii") as fh:
+            resident_pages = int(fh.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+
+def _worker_main(fn: Callable[..., Any], conn) -> None:
+    """Child loop: receive (args) on `conn`, reply (status, value, error)."""
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        if args is None:
+            return
+        try:
+            conn.send(("ok", fn(*args), ""))
+        except Exception as exc:  # reported to the supervisor, not raised
+            conn.send(("failed", None, f"{type(exc).__name__}: {exc}"))
+
+
+class _Worker:
+    """Supervisor-side handle for one child process."""
+
+    def __init__(self, ctx, fn: Callable[..., Any], slot: int) -> None:
+        self.slot = slot
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(fn, child_conn),
+            name=f"extract-worker-{slot}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+        self.task: Optional[Task] = None
+        self.started_at = 0.0
+        self.deadline: Optional[float] = None
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None
+
+    def rss_mb(self) -> Optional[float]:
+        return _rss_mb(self.process.pid) if self.process.pid else None
+
+    def assign(self, task: Task, timeout: Optional[float]) -> None:
+        self.task = task
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout if timeout else None
+        self.conn.send(task.args)
+
+    def finish(self) -> tuple[Task, float]:
+        task, elapsed = self.task, time.monotonic() - self.started_at
+        self.task, self.deadline = None, None
+        self.tasks_done += 1
+        return task, elapsed
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+            else:
+                self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Supervisor
+# ---------------------------------------------------------------------------
+
+
+class MemoryGuardedPool:
+    """
+    Run `fn(*task.args)` for every task on recycled worker processes.
+
+    `fn` must be a module-level function (it is pickled to the children).
+    Results are yielded in completion order by `run()`.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        max_workers: int = 1,
+        max_tasks_per_worker: Optional[int] = 50,
+        max_worker_rss_mb: Optional[float] = None,
+        memory_budget_mb: Optional[float] = None,
+        default_timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+        start_method: str = "spawn",
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self.fn = fn
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.memory_budget_mb = memory_budget_mb
+        self.default_timeout = default_timeout
+        self.poll_interval = poll_interval
+        self._ctx = mp.get_context(start_method)
+        self._workers: List[_Worker] = []
+        self.restarts = 0
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def __enter__(self) -> "MemoryGuardedPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.stop(kill=worker.busy)
+        self._workers = []
+
+    def _spawn(self, slot: int) -> _Worker:
+        return _Worker(self._ctx, self.fn, slot)
+
+    def _restart(self, worker: _Worker, reason: str, kill: bool = False) -> _Worker:
+        logger.info("Recycling worker %d (%s)", worker.slot, reason)
+        worker.stop(kill=kill)
+        fresh = self._spawn(worker.slot)
+        self._workers[self._workers.index(worker)] = fresh
+        self.restarts += 1
+        return fresh
+
+    # -- memory accounting --------------------------------------------------
+
+    def total_rss_mb(self) -> float:
+        return sum(w.rss_mb() or 0.0 for w in self._workers)
+
+    def _may_admit(self) -> bool:
+        """True while the pool is under its memory budget (or idle)."""
+        if not self.memory_budget_mb:
+            return True
+        if not any(w.busy for w in self._workers):
+            # Never stall an idle pool; the recycle check below keeps a
+            # single oversized worker from holding the budget forever.
+            return True
+        return self.total_rss_mb() < self.memory_budget_mb
+
+    def _recycle_reason(self, worker: _Worker) -> Optional[str]:
+        if self.max_tasks_per_worker and worker.tasks_done >= self.max_tasks_per_worker:
+            return f"{worker.tasks_done} tasks"
+        if self.max_worker_rss_mb:
+            rss = worker.rss_mb()
+            if rss is not None and rss > self.max_worker_rss_mb:
+                return f"RSS {rss:.0f} MiB > {self.max_worker_rss_mb:.0f} MiB"
+        return None
+
+    # -- main loop ----------------------------------------------------------
+
+    def run(self, tasks: Iterable[Task],
+            on_start: Optional[Callable[[Task], None]] = None) -> Iterator[TaskResult]:
+        """Yield a result per task; `on_start(task)` is called as each is handed to a worker."""
+        pending: Deque[Task] = deque(tasks)
+        send_failures: Dict[str, int] = {}
+        while len(self._workers) < min(self.max_workers, max(len(pending), 1)):
+            self._workers.append(self._spawn(len(self._workers)))
+
+        while pending or any(w.busy for w in self._workers):
+            for worker in list(self._workers):
+                if worker.busy or not pending:
+                    continue
+                if not self._may_admit():
+                    break
+                task = pending.popleft()
+                try:
+                    worker.assign(task, task.timeout or self.default_timeout)
+                except (EOFError, OSError) as exc:  # died after its last health check
+                    worker.task, worker.deadline = None, None
+                    send_failures[task.key] = send_failures.get(task.key, 0) + 1
+                    if send_failures[task.key] > _MAX_SEND_RETRIES:
+                        yield TaskResult(task.key, "crashed",
+                                         error=f"could not reach a worker: {exc!r}")
+                    else:
+                        pending.appendleft(task)
+                    self._restart(worker, "pipe closed", kill=True)
+                    continue
+                if on_start is not None:
+                    on_start(task)
+
+            busy = {w.conn: w for w in self._workers if w.busy}
+            now = time.monotonic()
+            deadlines = [w.deadline for w in busy.values() if w.deadline]
+            wait_for = self.poll_interval
+            if deadlines:
+                wait_for = max(0.0, min(wait_for, min(deadlines) - now))
+
+            for conn in wait(list(busy), timeout=wait_for):
+                worker = busy[conn]
+                try:
+                    status, value, error = conn.recv()
+                except (EOFError, OSError):
+                    task, elapsed = worker.finish()
+                    worker.process.join(timeout=1)
+                    code = worker.process.exitcode
+                    yield TaskResult(task.key, "crashed", error=f"worker exited ({code})",
+                                     duration=elapsed)
+                    self._restart(worker, "crashed", kill=True)
+                    continue
+                task, elapsed = worker.finish()
+                yield TaskResult(task.key, status, value, error, elapsed)
+                reason = self._recycle_reason(worker)
+                if reason:
+                    self._restart(worker, reason)
+
+            now = time.monotonic()
+            for worker in list(self._workers):
+                if worker.busy and worker.deadline and now >= worker.deadline:
+                    task, elapsed = worker.finish()
+                    yield TaskResult(task.key, "timeout",
+                                     error=f"timed out after {elapsed:.0f}s",
+                                     duration=elapsed)
+                    self._restart(worker, "timeout", kill=True)
@@ -0,0 +1,29 @@
+"""
+indexer — Corpus indexes built from processed paper JSON (json_output/).
+
+Every stage reads the extractor output through `indexer.corpus`, which
+drops the spans the extractor masked (citations, quotations, equations,
+boilerplate) before anything is hashed or embedded.
+"""
+
+from indexer.corpus import (
+    MASK_KINDS,
+    document_paths,
+    document_venue,
+    document_year,
+    iter_documents,
+    load_document,
+    section_text,
+    unmasked_segments,
+)
+
+__all__ = [
+    "MASK_KINDS",
+    "document_paths",
+    "document_venue",
+    "document_year",
+    "iter_documents",
+    "load_document",
+    "section_text",
+    "unmasked_segments",
+]
@@ -0,0 +1,425 @@
+"""
+CLI for the corpus indexes.
+
+    python -m indexer stopshingles --input json_output/ --out index/
+    python -m indexer build  --input json_output/ --out index/ --shards 16 --workers 4
+    python -m indexer plan   --input json_output/ --out index/ --shards 256
+    python -m indexer worker --out index/          # on every machine / process
+    python -m indexer merge  --out index/ [--wait 3600]
+    python -m indexer query  --out index/ --doc paper_processed.json [--fanout] [--threshold 0.05]
+    python -m indexer bloom  --input json_output/ --out index/ [--fp-rate 0.01]
+    python -m indexer screen --out index/ --doc a_processed.json b_processed.json ...
+    python -m indexer snippet --out index/ --text "pasted paragraph ..."   # or --file snippet.txt
+    python -m indexer partition --input json_output/ --out index/ [--by-venue]
+    python -m indexer partition-query --out index/ --doc paper_processed.json [--year 2021] [--venue cvpr]
+    python -m indexer hierarchy --input json_output/ --out index/
+    python -m indexer hierarchy-query --out index/ --doc paper_processed.json
+    python -m indexer suffix --input json_output/ --out index/
+    python -m indexer phrase --out index/ --text "exact passage to look up"
+    python -m indexer repeats --out index/ --doc paper_processed.json [--min-len 8]
+    python -m indexer embed  --input json_output/ --out index/ [--model NAME]
+    python -m indexer similar --out index/ --doc paper_processed.json
+    python -m indexer formulas --input json_output/ --out index/
+    python -m indexer formula-query --out index/ --doc paper_processed.json
+    python -m indexer tables --input json_output/ --out index/
+    python -m indexer table-query --out index/ --doc paper_processed.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+from indexer import bloom
+from indexer import distributed
+from indexer import embedding_index
+from indexer import formula_index
+from indexer import hierarchy
+from indexer import partitions
+from indexer import snippet
+from indexer import suffix_array
+from indexer import table_index
+from indexer.corpus import document_year, load_document
+from indexer.segment import Segment
+from indexer.shingles import document_shingles
+from indexer.stopshingles import (
+    DEFAULT_MAX_DF,
+    DEFAULT_MIN_DOCS,
+    build_from_dir,
+    load_stop_shingles,
+)
+
+
+def _cmd_stopshingles(args: argparse.Namespace) -> int:
+    build_from_dir(
+        args.input,
+        Path(args.out) / distributed.STOP_SHINGLES_FILE,
+        max_df=args.max_df,
+        min_docs=args.min_docs,
+    )
+    return 0
+
+
+def _cmd_plan(args: argparse.Namespace) -> int:
+    distributed.plan_shards(args.input, Path(args.out), args.shards)
+    return 0
+
+
+def _cmd_worker(args: argparse.Namespace) -> int:
+    built = distributed.run_worker(Path(args.out), lease_sec=args.lease)
+    logging.getLogger("indexer").info("Worker built %d shard(s)", built)
+    return 0
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    distributed.merge_index(Path(args.out), wait_sec=args.wait)
+    return 0
+
+
+def _cmd_build(args: argparse.Namespace) -> int:
+    distributed.build_local(args.input, Path(args.out), args.shards, args.workers)
+    return 0
+
+
+def _cmd_query(args: argparse.Namespace) -> int:
+    root = Path(args.out)
+    stop = load_stop_shingles(root / distributed.STOP_SHINGLES_FILE)
+    hashes = document_shingles(load_document(Path(args.doc)), stop=stop)
+    prescreen = bloom.open_prescreen(root)
+    if prescreen is not None:
+        rate = prescreen.hit_rate(hashes)
+        if rate < args.threshold:
+            print(f"# clean: {rate:.3f} of shingles in the corpus filter (< {args.threshold})")
+            return 0
+    if args.fanout:
+        with distributed.ShardedSearcher.from_index_root(root) as searcher:
+            hits = searcher.search(hashes, args.top_k)
+    else:
+        hits = Segment(root / "merged").search(hashes, args.top_k)
+    for doc_id, matches, containment in hits:
+        print(f"{containment:6.3f}  {matches:>6}  {doc_id}")
+    return 0
+
+
+def _cmd_bloom(args: argparse.Namespace) -> int:
+    bloom.build_bloom_filter(
+        args.input, Path(args.out) / bloom.BLOOM_DIR, args.fp_rate, args.capacity
+    )
+    return 0
+
+
+def _cmd_screen(args: argparse.Namespace) -> int:
+    root = Path(args.out)
+    prescreen = bloom.BloomFilter.open(root / bloom.BLOOM_DIR)
+    stop = load_stop_shingles(root / distributed.STOP_SHINGLES_FILE)
+    for path in args.doc:
+        hashes = document_shingles(load_document(Path(path)), prescreen.meta["shingle_size"], stop)
+        rate = prescreen.hit_rate(hashes)
+        verdict = "check" if rate >= args.threshold else "clean"
+        print(f"{rate:6.3f}  {verdict}  {path}")
+    return 0
+
+
+def _cmd_snippet(args: argparse.Namespace) -> int:
+    text = args.text if args.text is not None else Path(args.file).read_text(encoding="utf-8")
+    result = snippet.SnippetChecker(Path(args.out)).check(text, args.top_k)
+    for match in result["matches"]:
+        print(f"{match['containment']:6.3f}  {match['matches']:>6}  {match['doc_id']}")
+        for span in match.get("spans", []):
+            print(f"        §{span['section_id']} [{span['start']}:{span['end']}]  {span['text'][:100]!r}")
+    timings = "  ".join(f"{k} {v * 1e3:.1f} ms" for k, v in result["timings"].items())
+    print(f"# {timings}")
+    return 0
+
+
+def _cmd_partition(args: argparse.Namespace) -> int:
+    partitions.build_partitioned_index(
+        args.input, Path(args.out) / partitions.PARTITION_DIR, by_venue=args.by_venue
+    )
+    return 0
+
+
+def _cmd_partition_query(args: argparse.Namespace) -> int:
+    root = Path(args.out)
+    stop = load_stop_shingles(root / distributed.STOP_SHINGLES_FILE)
+    doc = load_document(Path(args.doc))
+    year = args.year if args.year is not None else document_year(doc)
+    index = partitions.PartitionedIndex(root / partitions.PARTITION_DIR)
+    hits = index.search(document_shingles(doc, stop=stop), args.top_k, year, args.venue)
+    for doc_id, matches, containment in hits:
+        print(f"{containment:6.3f}  {matches:>6}  {doc_id}")
+    return 0
+
+
+def _cmd_hierarchy(args: argparse.Namespace) -> int:
+    hierarchy.build_hierarchical_index(args.input, Path(args.out) / hierarchy.HIERARCHY_DIR)
+    return 0
+
+
+def _cmd_hierarchy_query(args: argparse.Namespace) -> int:
+    index = hierarchy.HierarchicalIndex(Path(args.out) / hierarchy.HIERARCHY_DIR)
+    hits, stats = index.search(
+        load_document(Path(args.doc)), doc_k=args.doc_k, min_doc_matches=args.min_doc_matches,
+        section_k=args.section_k, min_section_score=args.min_section_score,
+        min_paragraph_containment=args.min_containment,
+    )
+    for level in stats:
+        print(f"# {level['level']:<9} {level['in']:>9} → {level['out']:<7} "
+              f"({level['kept']:6.1%})  {level['seconds'] * 1e3:8.1f} ms")
+    for hit in hits[:args.top_k]:
+        print(f"{hit['containment']:6.3f}  {hit['section_score']:5.2f}  "
+              f"§{hit['section_id']}.{hit['paragraph']} ↔ {hit['doc_id']} "
+              f"§{hit['match_section_id']}.{hit['match_paragraph']}")
+    return 0
+
+
+def _cmd_suffix(args: argparse.Namespace) -> int:
+    suffix_array.build_suffix_array(
+        args.input, Path(args.out) / suffix_array.SUFFIX_DIR, chunk=args.chunk
+    )
+    return 0
+
+
+def _cmd_phrase(args: argparse.Namespace) -> int:
+    index = suffix_array.SuffixArray(Path(args.out) / suffix_array.SUFFIX_DIR)
+    count, hits = index.find(args.text, args.limit)
+    print(f"# {count} occurrence(s)")
+    for hit in hits:
+        print(f"{hit['doc_id']}  §{hit['section_id']} @{hit['offset']}")
+    return 0
+
+
+def _cmd_repeats(args: argparse.Namespace) -> int:
+    index = suffix_array.SuffixArray(Path(args.out) / suffix_array.SUFFIX_DIR)
+    for rep in index.maximal_repeats(load_document(Path(args.doc)), args.min_len, args.limit):
+        where = ", ".join(f"{h['doc_id']} §{h['section_id']}" for h in rep["occurrences"])
+        print(f"{rep['length']:>4}  §{rep['section_id']} @{rep['offset']}  ×{rep['count']}  "
+              f"{rep['text'][:80]!r}  → {where}")
+    return 0
+
+
+def _cmd_embed(args: argparse.Namespace) -> int:
+    embedding_index.build_embedding_index(
+        args.input, Path(args.out) / "embeddings", args.model, args.batch_size
+    )
+    return 0
+
+
+def _cmd_similar(args: argparse.Namespace) -> int:
+    index = embedding_index.EmbeddingIndex(Path(args.out) / "embeddings")
+    hits = index.search_document(load_document(Path(args.doc)), args.top_k, args.min_score)
+    for hit in hits:
+        q, m = hit["query"], hit["match"]
+        flag = "x-lingual" if hit["cross_lingual"] else "         "
+        print(
+            f"{hit['score']:.3f} {flag} {q['lang']}→{m['lang']}  "
+            f"§{q['section_id']}.{q['passage']} ↔ {m['doc_id']} §{m['section_id']}.{m['passage']}"
+        )
+    return 0
+
+
+def _cmd_formulas(args: argparse.Namespace) -> int:
+    formula_index.build_formula_index(args.input, Path(args.out) / formula_index.FORMULA_DIR,
+                                      args.max_df, args.min_docs)
+    return 0
+
+
+def _cmd_formula_query(args: argparse.Namespace) -> int:
+    hits = formula_index.search_formulas(
+        Path(args.out) / formula_index.FORMULA_DIR, load_document(Path(args.doc)), args.top_k
+    )
+    for doc_id, shared, fraction in hits:
+        print(f"{fraction:6.3f}  {shared:>6}  {doc_id}")
+    return 0
+
+
+def _cmd_tables(args: argparse.Namespace) -> int:
+    table_index.build_table_index(args.input, Path(args.out) / table_index.TABLE_DIR,
+                                  args.max_df, args.min_tables)
+    return 0
+
+
+def _cmd_table_query(args: argparse.Namespace) -> int:
+    hits = table_index.search_tables(
+        Path(args.out) / table_index.TABLE_DIR, load_document(Path(args.doc)),
+        args.top_k, args.min_share,
+    )
+    for hit in hits:
+        print(f"{hit['share']:6.3f}  {hit['shared']:>4}  table {hit['table_id']} ↔ {hit['match']}")
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(prog="python -m indexer")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stopshingles", help="learn the stop-shingle list from the corpus")
+    p.add_argument("--input", required=True, help="directory of *_processed.json")
+    p.add_argument("--out", required=True, help="index directory")
+    p.add_argument("--max-df", type=float, default=DEFAULT_MAX_DF)
+    p.add_argument("--min-docs", type=int, default=DEFAULT_MIN_DOCS)
+    p.set_defaults(func=_cmd_stopshingles)
+
+    p = sub.add_parser("plan", help="split the corpus into map shards")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--shards", type=int, default=16)
+    p.set_defaults(func=_cmd_plan)
+
+    p = sub.add_parser("worker", help="claim and build shards until none are left")
+    p.add_argument("--out", required=True)
+    p.add_argument("--lease", type=float, default=distributed.DEFAULT_LEASE_SEC,
+                   help="seconds before another worker may take over a claimed shard")
+    p.set_defaults(func=_cmd_worker)
+
+    p = sub.add_parser("merge", help="merge all shard segments into merged/")
+    p.add_argument("--out", required=True)
+    p.add_argument("--wait", type=float, default=0.0,
+                   help="seconds to wait for unfinished shards")
+    p.set_defaults(func=_cmd_merge)
+
+    p = sub.add_parser("build", help="plan + local workers + merge on one machine")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--shards", type=int, default=16)
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(func=_cmd_build)
+
+    p = sub.add_parser("query", help="rank corpus documents against a processed JSON")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--fanout", action="store_true",
+                   help="query shard segments in parallel instead of merged/")
+    p.add_argument("--threshold", type=float, default=bloom.DEFAULT_THRESHOLD,
+                   help="skip the lookup below this Bloom-filter hit rate (if bloom/ exists)")
+    p.set_defaults(func=_cmd_query)
+
+    p = sub.add_parser("bloom", help="build the Bloom-filter prescreen over corpus shingles")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--fp-rate", type=float, default=bloom.DEFAULT_FP_RATE,
+                   help="target false-positive rate (size grows with -ln(rate))")
+    p.add_argument("--capacity", type=int, default=None,
+                   help="expected distinct shingles (default: counted from the corpus)")
+    p.set_defaults(func=_cmd_bloom)
+
+    p = sub.add_parser("screen", help="Bloom-filter hit rate of submissions; flags which need a full query")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True, nargs="+")
+    p.add_argument("--threshold", type=float, default=bloom.DEFAULT_THRESHOLD)
+    p.set_defaults(func=_cmd_screen)
+
+    p = sub.add_parser("snippet", help="check one pasted paragraph against merged/")
+    p.add_argument("--out", required=True)
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument("--text")
+    group.add_argument("--file", help="UTF-8 text file holding the snippet")
+    p.add_argument("--top-k", type=int, default=5)
+    p.set_defaults(func=_cmd_snippet)
+
+    p = sub.add_parser("partition", help="build one segment per publication year (and venue)")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--by-venue", action="store_true", help="split each year by venue as well")
+    p.set_defaults(func=_cmd_partition)
+
+    p = sub.add_parser("partition-query", help="query only partitions the paper could copy from")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--year", type=int, default=None,
+                   help="latest year to search (default: the paper's own year)")
+    p.add_argument("--venue", action="append", default=None,
+                   help="restrict to this venue (repeatable; needs --by-venue partitions)")
+    p.set_defaults(func=_cmd_partition_query)
+
+    p = sub.add_parser("hierarchy", help="document sketches + section vectors for coarse-to-fine search")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.set_defaults(func=_cmd_hierarchy)
+
+    p = sub.add_parser("hierarchy-query", help="prune documents, rank sections, align paragraphs")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=20)
+    p.add_argument("--doc-k", type=int, default=50, help="documents kept by the sketch level")
+    p.add_argument("--min-doc-matches", type=int, default=2)
+    p.add_argument("--section-k", type=int, default=3, help="corpus sections kept per query section")
+    p.add_argument("--min-section-score", type=float, default=0.3)
+    p.add_argument("--min-containment", type=float, default=0.5)
+    p.set_defaults(func=_cmd_hierarchy_query)
+
+    p = sub.add_parser("suffix", help="build the token-level suffix array for exact phrase lookup")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--chunk", type=int, default=suffix_array.SA_CHUNK,
+                   help="suffixes sorted in memory at once (bounds build RAM)")
+    p.set_defaults(func=_cmd_suffix)
+
+    p = sub.add_parser("phrase", help="every corpus occurrence of an exact phrase")
+    p.add_argument("--out", required=True)
+    p.add_argument("--text", required=True)
+    p.add_argument("--limit", type=int, default=100)
+    p.set_defaults(func=_cmd_phrase)
+
+    p = sub.add_parser("repeats", help="maximal verbatim spans a paper shares with the corpus")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--min-len", type=int, default=8, help="minimum span length in tokens")
+    p.add_argument("--limit", type=int, default=20, help="occurrences listed per span")
+    p.set_defaults(func=_cmd_repeats)
+
+    p = sub.add_parser("embed", help="embed corpus passages with a multilingual model")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--model", default=embedding_index.DEFAULT_MODEL)
+    p.add_argument("--batch-size", type=int, default=64)
+    p.set_defaults(func=_cmd_embed)
+
+    p = sub.add_parser("similar", help="semantic / cross-lingual passage matches for a document")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=5)
+    p.add_argument("--min-score", type=float, default=0.8)
+    p.set_defaults(func=_cmd_similar)
+
+    p = sub.add_parser("formulas", help="index formula fingerprints")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--max-df", type=float, default=formula_index.DEFAULT_MAX_DF,
+                   help="drop fingerprints in more than this fraction of documents")
+    p.add_argument("--min-docs", type=int, default=formula_index.DEFAULT_MIN_DOCS)
+    p.set_defaults(func=_cmd_formulas)
+
+    p = sub.add_parser("formula-query", help="documents reusing a paper's formulas")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=10)
+    p.set_defaults(func=_cmd_formula_query)
+
+    p = sub.add_parser("tables", help="index table numeric fingerprints")
+    p.add_argument("--input", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--max-df", type=float, default=table_index.DEFAULT_MAX_DF,
+                   help="drop keys held by more than this share of tables")
+    p.add_argument("--min-tables", type=int, default=table_index.DEFAULT_MIN_TABLES)
+    p.set_defaults(func=_cmd_tables)
+
+    p = sub.add_parser("table-query", help="corpus tables reused by a paper's tables")
+    p.add_argument("--out", required=True)
+    p.add_argument("--doc", required=True)
+    p.add_argument("--top-k", type=int, default=5)
+    p.add_argument("--min-share", type=float, default=table_index.DEFAULT_MIN_SHARE)
+    p.set_defaults(func=_cmd_table_query)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
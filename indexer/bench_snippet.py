@@ -0,0 +1,99 @@
+"""
+bench_snippet.py — Latency distribution of `SnippetChecker.check`.
+
+Queries are paragraphs sampled from the corpus: a third verbatim, a third
+lightly edited (every 7th word dropped), a third shuffled words that should
+match nothing. The checker is opened once and warmed up, as a service would
+be; then every query is timed and p50/p95/p99/max are reported overall and
+per stage, against the 100 ms p99 target.
+
+    python -m indexer.bench_snippet --out index/ --input json_output/ [--queries 600]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from indexer.corpus import iter_documents
+from indexer.snippet import SnippetChecker
+
+P99_TARGET_MS = 100.0
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+
+def sample_snippets(json_dir: str, n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    paragraphs = [
+        p.strip()
+        for _, doc in iter_documents(json_dir)
+        for section in doc.get("sections", [])
+        for p in _PARAGRAPH_SPLIT.split(section.get("summary", ""))
+        if len(p.split()) >= 40
+    ]
+    if not paragraphs:
+        return []
+    snippets = []
+    for i in range(n):
+        words = rng.choice(paragraphs).split()
+        if i % 3 == 1:
+            words = [w for j, w in enumerate(words) if j % 7 != 6]
+        elif i % 3 == 2:
+            rng.shuffle(words)
+        snippets.append(" ".join(words))
+    return snippets
+
+
+def _percentiles(ms: List[float]) -> str:
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return f"p50 {p50:7.2f}  p95 {p95:7.2f}  p99 {p99:7.2f}  max {max(ms):7.2f} ms"
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m indexer.bench_snippet")
+    parser.add_argument("--out", required=True, help="index directory with merged/")
+    parser.add_argument("--input", required=True, help="corpus JSON to sample snippets from")
+    parser.add_argument("--queries", type=int, default=600)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    checker = SnippetChecker(Path(args.out))
+    print(f"opened index ({len(checker.segment)} docs) in {(time.perf_counter() - start) * 1e3:.0f} ms")
+    snippets = sample_snippets(args.input, args.queries)
+    if not snippets:
+        print(f"No paragraphs of 40+ words in {args.input}")
+        return 1
+    for text in snippets[:20]:
+        checker.check(text)
+
+    total: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    found = 0
+    for text in snippets:
+        start = time.perf_counter()
+        result = checker.check(text)
+        total.append((time.perf_counter() - start) * 1e3)
+        found += bool(result["matches"])
+        for stage, seconds in result["timings"].items():
+            stages.setdefault(stage, []).append(seconds * 1e3)
+
+    print(f"{len(snippets)} snippets, {found} with matches")
+    print(f"{'total':<10} {_percentiles(total)}")
+    for stage, ms in stages.items():
+        print(f"{stage:<10} {_percentiles(ms)}")
+    p99 = float(np.percentile(total, 99))
+    print(f"p99 {p99:.2f} ms — {'within' if p99 <= P99_TARGET_MS else 'OVER'} "
+          f"the {P99_TARGET_MS:.0f} ms target")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
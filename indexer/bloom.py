@@ -0,0 +1,186 @@
+"""
+bloom.py — Memory-mapped Bloom filter over corpus shingles, for prescreening.
+
+Most submissions share almost nothing with the corpus beyond stop shingles,
+yet a full query pays an index lookup for every shingle. The filter answers
+"is this shingle anywhere in the corpus?" with k bit probes and no false
+negatives, so a document is screened in one vectorised pass over its
+hashes: if fewer than `threshold` of its shingles hit, the retrieval stages
+are skipped.
+
+Sizing follows the usual formulas for `capacity` items at false-positive
+rate p: m = −capacity·ln p / (ln 2)² bits and k = (m / capacity)·ln 2
+probes (1% → 9.6 bits and 7 probes per shingle; 0.1% → 14.4 bits, 10
+probes). Probe positions use double hashing on the 64-bit shingle hash,
+h1 + i·h2 mod m, so no extra hashing is needed.
+
+Filter directory:
+
+    meta.json   m_bits, k, capacity, fp_rate, fill, expected FP rate, format version
+    bits.u64    m_bits / 64 words (memory-mapped)
+
+A Bloom filter cannot delete; when papers are withdrawn from the corpus,
+rebuild it (the false positives it leaves behind only cost a full query).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import shutil
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from indexer import distributed
+from indexer.corpus import iter_documents, section_text
+from indexer.shingles import SHINGLE_SIZE, document_shingles, tokenize
+from indexer.stopshingles import load_stop_shingles
+
+logger = logging.getLogger("indexer.bloom")
+
+FORMAT_VERSION = 1
+BLOOM_DIR = "bloom"
+DEFAULT_FP_RATE = 0.01
+DEFAULT_THRESHOLD = 0.05     # share of a document's shingles that must hit to run retrieval
+
+_SWAP = np.uint64(32)
+
+
+def bloom_size(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """`(m_bits, k)` for `capacity` items at `fp_rate`; m is a multiple of 64."""
+    capacity = max(1, capacity)
+    m = int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+    m = max(64, (m + 63) // 64 * 64)
+    k = max(1, int(round(m / capacity * math.log(2))))
+    return m, k
+
+
+def _probes(hashes: np.ndarray, m: int, k: int) -> np.ndarray:
+    """`len(hashes) × k` bit positions by double hashing."""
+    h1 = hashes
+    h2 = ((hashes >> _SWAP) | (hashes << _SWAP)) | np.uint64(1)
+    with np.errstate(over="ignore"):
+        probes = h1[:, None] + np.arange(k, dtype=np.uint64)[None, :] * h2[:, None]
+    return probes % np.uint64(m)
+
+
+class BloomFilter:
+    """Bit array plus its (m, k); open an existing one with `BloomFilter.open`."""
+
+    def __init__(self, bits: np.ndarray, m: int, k: int, meta: Optional[Dict] = None) -> None:
+        self.bits = bits
+        self.m = m
+        self.k = k
+        self.meta = meta or {}
+
+    @classmethod
+    def open(cls, path: Path) -> "BloomFilter":
+        path = Path(path)
+        with (path / "meta.json").open("r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        bits = np.memmap(path / "bits.u64", dtype=np.uint64, mode="r",
+                         shape=(meta["m_bits"] // 64,))
+        return cls(bits, meta["m_bits"], meta["k"], meta)
+
+    def add(self, hashes: Iterable[int]) -> None:
+        hashes = np.fromiter(hashes, dtype=np.uint64)
+        if not hashes.size:
+            return
+        probes = _probes(hashes, self.m, self.k).ravel()
+        np.bitwise_or.at(self.bits, probes >> np.uint64(6),
+                         np.uint64(1) << (probes & np.uint64(63)))
+
+    def contains(self, hashes: Iterable[int]) -> np.ndarray:
+        """Membership of every hash (False is certain, True may be a false positive)."""
+        hashes = np.fromiter(hashes, dtype=np.uint64)
+        if not hashes.size:
+            return np.zeros(0, dtype=bool)
+        probes = _probes(hashes, self.m, self.k)
+        words = np.asarray(self.bits[probes >> np.uint64(6)])
+        return ((words >> (probes & np.uint64(63))) & np.uint64(1)).astype(bool).all(axis=1)
+
+    def hit_rate(self, hashes: AbstractSet[int]) -> float:
+        """Share of `hashes` present in the filter (0.0 for no hashes)."""
+        if not hashes:
+            return 0.0
+        return float(self.contains(hashes).mean())
+
+
+def _fill(bits: np.ndarray, m: int, block: int = 1 << 20) -> float:
+    """Share of bits set, counted a block of words at a time."""
+    ones = sum(
+        int(np.unpackbits(np.asarray(bits[i:i + block]).view(np.uint8)).sum())
+        for i in range(0, len(bits), block)
+    )
+    return ones / m
+
+
+def _estimate_capacity(json_dir: str, shingle_size: int) -> int:
+    """Upper bound on distinct shingles: token windows, without hashing them."""
+    return sum(
+        max(0, len(tokenize(section_text(section))) - shingle_size + 1)
+        for _, doc in iter_documents(json_dir)
+        for section in doc.get("sections", [])
+    )
+
+
+def build_bloom_filter(json_dir: str, out_dir: Path, fp_rate: float = DEFAULT_FP_RATE,
+                       capacity: Optional[int] = None, shingle_size: int = SHINGLE_SIZE,
+                       stop: Optional[AbstractSet[int]] = None) -> Path:
+    """
+    Insert every corpus shingle (stop shingles excluded) into a new filter.
+
+    Without `capacity` the corpus is read once more to count token windows,
+    an upper bound on distinct shingles, so the real rate ends up at or
+    below `fp_rate`. Stop shingles default to <out_dir>/../stop_shingles.json.
+    """
+    out_dir = Path(out_dir)
+    if stop is None:
+        stop = load_stop_shingles(out_dir.parent / distributed.STOP_SHINGLES_FILE)
+    if capacity is None:
+        capacity = _estimate_capacity(json_dir, shingle_size)
+    m, k = bloom_size(capacity, fp_rate)
+    logger.info("Bloom filter: capacity %d, %.1f MB, k=%d", capacity, m / 8e6, k)
+
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    bits = np.memmap(tmp / "bits.u64", dtype=np.uint64, mode="w+", shape=(m // 64,))
+    bloom = BloomFilter(bits, m, k)
+    n_docs = 0
+    for _, doc in iter_documents(json_dir):
+        bloom.add(document_shingles(doc, shingle_size, stop))
+        n_docs += 1
+    bits.flush()
+    fill = _fill(bits, m)
+    del bloom, bits
+
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "m_bits": m,
+            "k": k,
+            "capacity": capacity,
+            "fp_rate": fp_rate,
+            "n_docs": n_docs,
+            "shingle_size": shingle_size,
+            "fill": fill,
+            "expected_fp_rate": fill ** k,
+        }, fh)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    logger.info("Bloom filter over %d docs: fill %.3f, expected FP rate %.4f → %s",
+                n_docs, fill, fill ** k, out_dir)
+    return out_dir
+
+
+def open_prescreen(index_root: Path) -> Optional[BloomFilter]:
+    """The index's filter, or None if `python -m indexer bloom` has not been run."""
+    path = Path(index_root) / BLOOM_DIR
+    return BloomFilter.open(path) if (path / "meta.json").exists() else None
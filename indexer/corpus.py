@@ -0,0 +1,122 @@
+"""
+corpus.py — Reading processed paper JSON for indexing.
+
+Sections carry a `mask` of `[start, end, kind]` character spans over their
+`summary` (see extract_script/extract_v2.py). Similarity stages work on the
+unmasked segments only, so citation strings, quotations, equations and
+watermarks neither inflate the index nor produce false candidates. A
+masked span splits the text into separate segments, so no shingle spans
+across it.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from extract_script.json_writer import ZSTD_SUFFIX, read_json
+
+logger = logging.getLogger("indexer")
+
+MASK_KINDS = {
+    "c": "citation",
+    "q": "quotation",
+    "e": "equation",
+    "b": "boilerplate",
+}
+
+
+DOCUMENT_PATTERNS = ("*_processed.json", f"*_processed.json{ZSTD_SUFFIX}")
+
+
+def load_document(path: Path) -> Dict:
+    """Load a processed JSON; `.json.zst` outputs (OUTPUT_ZSTD=1) are decompressed."""
+    return read_json(Path(path))
+
+
+def document_paths(json_dir: str, patterns: Sequence[str] = DOCUMENT_PATTERNS) -> List[Path]:
+    """Processed JSON files in `json_dir`, sorted by name."""
+    return sorted(p for pattern in patterns for p in Path(json_dir).glob(pattern))
+
+
+def iter_documents(json_dir: str, patterns: Sequence[str] = DOCUMENT_PATTERNS) -> Iterator[Tuple[Path, Dict]]:
+    """
+    Yield `(path, document)` for every processed JSON in `json_dir`, sorted by name.
+
+    `doc_id` is derived from the PDF bytes, so two outputs with the same ID
+    are one paper saved under two names; only the first is yielded.
+    """
+    seen = set()
+    for path in document_paths(json_dir, patterns):
+        try:
+            doc = load_document(path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable %s: %s", path, exc)
+            continue
+        doc_id = doc.get("doc_id")
+        if doc_id and doc_id in seen:
+            logger.info("Skipping %s: duplicate of doc_id %s", path.name, doc_id)
+            continue
+        seen.add(doc_id)
+        yield path, doc
+
+
+def document_year(doc: Dict) -> Optional[int]:
+    """
+    Publication year: crawl metadata first, then the date parsed from the text.
+
+    The text date is the first dated venue or date near the top of the
+    paper, which can be a cited paper's, so it is only used for documents
+    no crawl manifest lists.
+    """
+    year = str((doc.get("source") or {}).get("year") or "")
+    if year.isdigit():
+        return int(year)
+    published = str(doc.get("published") or "")[:4]
+    return int(published) if published.isdigit() else None
+
+
+_VENUE_SLUG_REGEX = re.compile(r"[A-Za-z]+")
+
+
+def document_venue(doc: Dict) -> Optional[str]:
+    """
+    Venue as a lowercase slug ("IJCAI 2018" → "ijcai"), or None if unknown.
+
+    Taken from the crawl metadata (the manifest's venue, else its collection)
+    and from the text only for documents no manifest lists.
+    """
+    source = doc.get("source") or {}
+    venue = source.get("venue") or source.get("collection") or doc.get("venue") or ""
+    m = _VENUE_SLUG_REGEX.search(venue)
+    return m.group().lower() if m else None
+
+
+def unmasked_segments(section: Dict, skip: Iterable[str] = tuple(MASK_KINDS)) -> List[str]:
+    """
+    Split a section's text around its masked spans.
+
+    Only spans whose kind is in `skip` are removed. Sections written before
+    masks existed have no `mask` key and come back whole.
+    """
+    text = section.get("summary", "")
+    skip = set(skip)
+    segments: List[str] = []
+    pos = 0
+    for start, end, kind in section.get("mask", ()):
+        if kind not in skip:
+            continue
+        if start > pos:
+            segments.append(text[pos:start])
+        pos = max(pos, end)
+    segments.append(text[pos:])
+    return [seg for seg in segments if seg.strip()]
+
+
+def section_text(section: Dict, skip_masked: bool = True) -> str:
+    """Section text for hashing/embedding; masked spans become line breaks."""
+    if not skip_masked:
+        return section.get("summary", "")
+    return "\n".join(unmasked_segments(section))
@@ -0,0 +1,288 @@
+"""
+distributed.py — Shard-and-merge index build coordinated through a shared directory.
+
+Layout of an index root (any filesystem every machine can see: NFS, SMB,
+or just a local disk for several processes on one box):
+
+    plan.json                 shards → list of processed JSON paths
+    stop_shingles.json        optional; dropped from every segment
+    claims/shard-00007        exclusive claim (O_CREAT|O_EXCL) + lease time
+    segments/shard-00007/     finished segment (renamed into place)
+    merged/                   single merged segment
+
+Workers need no broker: each one repeatedly claims the next unclaimed
+shard by creating its claim file exclusively, indexes it, and publishes the
+segment with an atomic rename. While building, a worker renews its lease by
+touching the claim file, so only a claim whose lease expired without a
+segment appearing (the worker died) is taken over by the next worker; a
+worker that finds its claim taken over abandons the shard.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import socket
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from indexer.corpus import document_paths, load_document
+from indexer.segment import Segment, SegmentWriter, merge_segments
+from indexer.shingles import SHINGLE_SIZE, document_shingles
+from indexer.stopshingles import load_stop_shingles
+
+logger = logging.getLogger("indexer.distributed")
+
+PLAN_FILE = "plan.json"
+STOP_SHINGLES_FILE = "stop_shingles.json"
+DEFAULT_LEASE_SEC = 3600
+
+
+def _shard_name(shard_id: int) -> str:
+    return f"shard-{shard_id:05d}"
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+
+def plan_shards(json_dir: str, index_root: Path, n_shards: int,
+                shingle_size: int = SHINGLE_SIZE) -> Dict:
+    """
+    Split the processed JSON files into `n_shards` map tasks.
+
+    Only paths are listed, so planning reads no document. A paper saved
+    under two names (same `doc_id`) can land in two shards; the merge keeps
+    one copy and the sharded searcher reports it once. A new plan
+    invalidates earlier claims and segments, which are removed.
+    """
+    files = [str(p.resolve()) for p in document_paths(json_dir)]
+    n_shards = max(1, min(n_shards, len(files) or 1))
+    shards = [files[i::n_shards] for i in range(n_shards)]
+    plan = {"shingle_size": shingle_size, "shards": shards}
+
+    index_root = Path(index_root)
+    for stale in ("claims", "segments", "merged"):
+        shutil.rmtree(index_root / stale, ignore_errors=True)
+    (index_root / "claims").mkdir(parents=True, exist_ok=True)
+    (index_root / "segments").mkdir(parents=True, exist_ok=True)
+    tmp = index_root / f".{PLAN_FILE}.tmp"
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump(plan, fh, ensure_ascii=False)
+    os.replace(tmp, index_root / PLAN_FILE)
+    logger.info("Planned %d file(s) into %d shard(s) under %s", len(files), n_shards, index_root)
+    return plan
+
+
+def load_plan(index_root: Path) -> Dict:
+    with (Path(index_root) / PLAN_FILE).open("r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+# ---------------------------------------------------------------------------
+# Map workers
+# ---------------------------------------------------------------------------
+
+
+class LeaseLost(RuntimeError):
+    """Another worker took over a shard this worker was still building."""
+
+
+def _try_claim(claim: Path, segment: Path, lease_sec: float) -> Optional[str]:
+    """Claim a shard and return the claim token; steal the claim if its lease ran out without a segment."""
+    token = f"{socket.gethostname()}:{os.getpid()}:{time.time():.0f}"
+    for _ in range(2):
+        try:
+            fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if segment.exists():
+                return None
+            try:
+                age = time.time() - claim.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < lease_sec:
+                return None
+            logger.warning("Lease on %s expired after %.0fs — reclaiming", claim.name, age)
+            try:
+                claim.unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as fh:
+            fh.write(token)
+        return token
+    return None
+
+
+def _lease_keeper(claim: Path, token: str, lease_sec: float) -> Callable[[], None]:
+    """Heartbeat for a held claim: touch it every lease_sec / 4; LeaseLost if it changed hands."""
+    last = time.time()
+
+    def renew() -> None:
+        nonlocal last
+        if time.time() - last < lease_sec / 4:
+            return
+        try:
+            holder = claim.read_text()
+        except FileNotFoundError:
+            holder = None
+        if holder != token:
+            raise LeaseLost(f"{claim.name} is now held by {holder or 'nobody'}")
+        os.utime(claim)
+        last = time.time()
+
+    return renew
+
+
+def build_shard(files: Sequence[str], out_dir: Path, shingle_size: int,
+                stop: frozenset, heartbeat: Optional[Callable[[], None]] = None) -> Path:
+    writer = SegmentWriter(shingle_size)
+    for path in files:
+        if heartbeat is not None:
+            heartbeat()
+        try:
+            doc = load_document(Path(path))
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable %s: %s", path, exc)
+            continue
+        writer.add(
+            doc.get("doc_id") or Path(path).stem,
+            document_shingles(doc, shingle_size, stop),
+            path=path,
+            title=doc.get("title", ""),
+        )
+    return writer.write(out_dir)
+
+
+def run_worker(index_root: Path, lease_sec: float = DEFAULT_LEASE_SEC) -> int:
+    """Claim and build shards until none are left; returns how many this worker built."""
+    index_root = Path(index_root)
+    plan = load_plan(index_root)
+    stop = load_stop_shingles(index_root / STOP_SHINGLES_FILE)
+    built = 0
+    for shard_id, files in enumerate(plan["shards"]):
+        name = _shard_name(shard_id)
+        segment = index_root / "segments" / name
+        if segment.exists():
+            continue
+        claim = index_root / "claims" / name
+        token = _try_claim(claim, segment, lease_sec)
+        if token is None:
+            continue
+        logger.info("Building %s (%d file(s))", name, len(files))
+        try:
+            build_shard(files, segment, plan["shingle_size"], stop,
+                        heartbeat=_lease_keeper(claim, token, lease_sec))
+        except LeaseLost as exc:
+            logger.warning("Abandoning %s: %s", name, exc)
+            continue
+        built += 1
+    return built
+
+
+def segment_dirs(index_root: Path) -> Tuple[List[Path], List[int]]:
+    """Finished segment directories, and the shard ids still missing."""
+    plan = load_plan(index_root)
+    done, missing = [], []
+    for shard_id in range(len(plan["shards"])):
+        path = Path(index_root) / "segments" / _shard_name(shard_id)
+        if (path / "meta.json").exists():
+            done.append(path)
+        else:
+            missing.append(shard_id)
+    return done, missing
+
+
+def merge_index(index_root: Path, wait_sec: float = 0.0, poll_sec: float = 5.0) -> Path:
+    """Merge every shard's segment into `merged/`, waiting up to `wait_sec` for stragglers."""
+    deadline = time.time() + wait_sec
+    while True:
+        done, missing = segment_dirs(index_root)
+        if not missing:
+            break
+        if time.time() >= deadline:
+            raise RuntimeError(f"{len(missing)} shard(s) not built yet: {missing[:10]}")
+        time.sleep(poll_sec)
+    return merge_segments(done, Path(index_root) / "merged")
+
+
+def build_local(json_dir: str, index_root: Path, n_shards: int, n_workers: int) -> Path:
+    """Plan, run `n_workers` local worker processes, and merge — all on one machine."""
+    plan_shards(json_dir, index_root, n_shards)
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=run_worker, args=(index_root,)) for _ in range(n_workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return merge_index(index_root)
+
+
+# ---------------------------------------------------------------------------
+# Sharded query fan-out
+# ---------------------------------------------------------------------------
+
+_SEGMENT_CACHE: Dict[str, Segment] = {}
+
+
+def _search_segment(args: Tuple[str, List[int], int]) -> List[Tuple[str, int, float]]:
+    path, hashes, top_k = args
+    seg = _SEGMENT_CACHE.get(path)
+    if seg is None:
+        seg = _SEGMENT_CACHE[path] = Segment(Path(path))
+    return seg.search(hashes, top_k)
+
+
+class ShardedSearcher:
+    """
+    Query every segment in parallel and merge the per-segment top-k.
+
+    Each pool process memory-maps the segments it is asked about once and
+    keeps them open, so the OS page cache is shared across processes.
+    """
+
+    def __init__(self, segments: Sequence[Path], processes: Optional[int] = None) -> None:
+        self.segments = [str(p) for p in segments]
+        self._pool = None
+        if self.segments:
+            self._pool = mp.get_context("spawn").Pool(
+                processes or min(len(self.segments), os.cpu_count() or 1))
+
+    @classmethod
+    def from_index_root(cls, index_root: Path, processes: Optional[int] = None) -> "ShardedSearcher":
+        done, missing = segment_dirs(index_root)
+        if missing:
+            logger.warning("Searching without %d unbuilt shard(s)", len(missing))
+        return cls(done, processes)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+    def __enter__(self) -> "ShardedSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def search(self, hashes: Sequence[int], top_k: int = 10) -> List[Tuple[str, int, float]]:
+        if self._pool is None:
+            return []
+        query = list(set(hashes))
+        parts = self._pool.map(_search_segment, [(p, query, top_k) for p in self.segments])
+        hits = [hit for part in parts for hit in part]
+        hits.sort(key=lambda hit: -hit[1])
+        seen = set()
+        unique = []
+        for hit in hits:      # one paper under two names may sit in two segments
+            if hit[0] not in seen:
+                seen.add(hit[0])
+                unique.append(hit)
+        return unique[:top_k]
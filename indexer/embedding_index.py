@@ -0,0 +1,266 @@
+"""
+embedding_index.py — Dense passage vectors for semantic and cross-lingual matching.
+
+Passages (paragraph-sized chunks of unmasked section text) are embedded
+with a multilingual sentence-transformers model that runs offline on CPU.
+A Vietnamese or Chinese rewrite of an English paper lands next to its
+source in the shared vector space, so it is retrieved by the same search,
+at the same cost, as a same-language paraphrase.
+
+Index directory:
+
+    meta.json       model, dim, n_rows, format version
+    rows.jsonl      one {"doc_id", "section_id", "passage", "lang"} per row
+    vectors.f32     n_rows × dim float32, L2-normalised (memory-mapped)
+
+Search is a blocked matrix product over the memory-mapped vectors; when
+`faiss` is installed, an in-memory inner-product index is used instead.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from extract_script.sentences import split_sentences
+from indexer.corpus import iter_documents, unmasked_segments
+
+logger = logging.getLogger("indexer.embedding")
+
+FORMAT_VERSION = 1
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+PASSAGE_CHARS = 600          # roughly the model's 128-token window
+_SEARCH_BLOCK = 65536        # rows scored per matrix product
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+_ENCODERS: Dict[str, object] = {}
+
+
+def load_encoder(model_name: str = DEFAULT_MODEL):
+    """Load (once per process) a sentence-transformers model on CPU."""
+    if model_name not in _ENCODERS:
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except ImportError as exc:
+            raise ImportError(
+                "sentence-transformers is required: pip install sentence-transformers"
+            ) from exc
+        _ENCODERS[model_name] = SentenceTransformer(model_name, device="cpu")
+    return _ENCODERS[model_name]
+
+
+def encode(texts: Sequence[str], model_name: str = DEFAULT_MODEL,
+           batch_size: int = 64) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    vectors = load_encoder(model_name).encode(
+        list(texts), batch_size=batch_size, normalize_embeddings=True,
+        convert_to_numpy=True, show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Passages
+# ---------------------------------------------------------------------------
+
+
+def _chunk(paragraph: str, limit: int) -> Iterator[str]:
+    """
+    Cut a paragraph into ≤`limit`-char pieces at sentence ends where possible.
+
+    Sentences come from the extractor's splitter, so "et al.", "Fig. 3" and
+    citation brackets do not end a passage early.
+    """
+    current = ""
+    for sentence in split_sentences(paragraph):
+        if current and len(current) + len(sentence) + 1 > limit:
+            yield current
+            current = ""
+        while len(sentence) > limit:
+            yield sentence[:limit]
+            sentence = sentence[limit:]
+        current = f"{current} {sentence}".strip()
+    if current:
+        yield current
+
+
+def iter_passages(doc: Dict, limit: int = PASSAGE_CHARS) -> Iterator[Tuple[Dict, str]]:
+    """Yield `(row, text)` for every passage of a processed document."""
+    doc_id = doc.get("doc_id", "")
+    for section in doc.get("sections", []):
+        text = " ".join(unmasked_segments(section))
+        n = 0
+        for paragraph in _PARAGRAPH_SPLIT.split(text):
+            paragraph = " ".join(paragraph.split())
+            if len(paragraph) < 40:
+                continue
+            for piece in _chunk(paragraph, limit):
+                yield {
+                    "doc_id": doc_id,
+                    "section_id": section.get("section_id", ""),
+                    "passage": n,
+                    "lang": section.get("lang", "und"),
+                }, piece
+                n += 1
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+
+def build_embedding_index(json_dir: str, out_dir: Path, model_name: str = DEFAULT_MODEL,
+                          batch_size: int = 64) -> Path:
+    """Embed every passage of the corpus, streaming vectors to disk."""
+    out_dir = Path(out_dir)
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    n_rows, dim = 0, 0
+    langs: Dict[str, int] = {}
+    with (tmp / "vectors.f32").open("wb") as f_vec, \
+            (tmp / "rows.jsonl").open("w", encoding="utf-8") as f_rows:
+        rows: List[Dict] = []
+        texts: List[str] = []
+
+        def flush() -> None:
+            nonlocal n_rows, dim
+            if not texts:
+                return
+            vectors = encode(texts, model_name, batch_size)
+            dim = vectors.shape[1]
+            f_vec.write(vectors.tobytes())
+            for row in rows:
+                f_rows.write(json.dumps(row, ensure_ascii=False) + "\n")
+                langs[row["lang"]] = langs.get(row["lang"], 0) + 1
+            n_rows += len(rows)
+            rows.clear()
+            texts.clear()
+
+        for _, doc in iter_documents(json_dir):
+            for row, text in iter_passages(doc):
+                rows.append(row)
+                texts.append(text)
+            if len(texts) >= 16 * batch_size:
+                flush()
+        flush()
+
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "model": model_name,
+            "dim": dim,
+            "n_rows": n_rows,
+            "langs": langs,
+        }, fh)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    logger.info("Embedded %d passages (%s) → %s", n_rows, langs, out_dir)
+    return out_dir
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+
+class EmbeddingIndex:
+    """Memory-mapped passage vectors plus their row metadata."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with (self.path / "meta.json").open("r", encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        with (self.path / "rows.jsonl").open("r", encoding="utf-8") as fh:
+            self.rows: List[Dict] = [json.loads(line) for line in fh]
+        self.model_name = self.meta["model"]
+        n, dim = self.meta["n_rows"], self.meta["dim"]
+        self.vectors = (
+            np.memmap(self.path / "vectors.f32", dtype=np.float32, mode="r", shape=(n, dim))
+            if n else np.zeros((0, dim), dtype=np.float32)
+        )
+        self._faiss = None
+        try:
+            import faiss  # type: ignore
+        except ImportError:
+            faiss = None
+        if faiss is not None and n:
+            self._faiss = faiss.IndexFlatIP(dim)
+            self._faiss.add(np.ascontiguousarray(self.vectors))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def search_vectors(self, queries: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """`(scores, row_ids)`, each `len(queries) × top_k`, best first."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        k = min(top_k, len(self.rows))
+        if not k or not len(queries):
+            return np.zeros((len(queries), 0), np.float32), np.zeros((len(queries), 0), np.int64)
+        if self._faiss is not None:
+            scores, ids = self._faiss.search(queries, k)
+            return scores, ids.astype(np.int64)
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, len(self.rows), _SEARCH_BLOCK):
+            block = np.asarray(self.vectors[start:start + _SEARCH_BLOCK])
+            scores = queries @ block.T
+            ids = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, ids], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+    def search_document(self, doc: Dict, top_k: int = 5, min_score: float = 0.8,
+                        exclude_self: bool = True) -> List[Dict]:
+        """
+        Passage-level matches for a processed document, in any language.
+
+        Each hit records both languages, so cross-lingual matches
+        (`query_lang != match_lang`) can be reported separately. When the
+        document is itself indexed, its own passages would take the best
+        slots, so `top_k` plus their number are searched before they are
+        dropped.
+        """
+        passages = list(iter_passages(doc))
+        if not passages:
+            return []
+        doc_id = doc.get("doc_id", "")
+        own = sum(row["doc_id"] == doc_id for row in self.rows) if exclude_self else 0
+        queries = encode([text for _, text in passages], self.model_name)
+        scores, ids = self.search_vectors(queries, top_k + own)
+        hits: List[Dict] = []
+        for (row, text), row_scores, row_ids in zip(passages, scores, ids):
+            kept = 0
+            for score, rid in zip(row_scores, row_ids):
+                match = self.rows[rid]
+                if score < min_score or kept == top_k:
+                    break
+                if exclude_self and match["doc_id"] == doc_id:
+                    continue
+                kept += 1
+                hits.append({
+                    "query": row,
+                    "query_text": text,
+                    "match": match,
+                    "score": float(score),
+                    "cross_lingual": match["lang"] != row["lang"],
+                })
+        hits.sort(key=lambda hit: -hit["score"])
+        return hits
@@ -0,0 +1,102 @@
+"""
+formula_index.py — Inverted index over formula fingerprints.
+
+The extractor stores 64-bit fingerprints for each section's formulas
+(`sections[].formulas[].hashes`, see extract_script/formulas.py). They are
+indexed in the same segment format as text shingles, so finding papers
+that reuse a derivation is the same sorted-key lookup as a text query.
+
+Standard formulas are not rare: after variable renaming, the sides of
+cross-entropy, a mean over `\\sum_{i=1}^{N}` or softmax attention hash the
+same in thousands of papers. Fingerprints held by more than DEFAULT_MAX_DF
+of all documents (at least DEFAULT_MIN_DOCS) are written to stop_keys.json
+and dropped from the index, from every query and from the formula pairs
+shown as evidence, as stop shingles are for text.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import AbstractSet, Dict, List, Tuple
+
+from indexer.corpus import iter_documents
+from indexer.segment import Segment, SegmentWriter
+from indexer.stopshingles import (
+    DEFAULT_MAX_DF,
+    DEFAULT_MIN_DOCS,
+    frequent_keys,
+    load_stop_shingles,
+    save_stop_shingles,
+)
+
+logger = logging.getLogger("indexer.formulas")
+
+FORMULA_DIR = "formulas"
+STOP_KEYS_FILE = "stop_keys.json"
+
+
+def _formula_keys(formula: Dict, stop: AbstractSet[int]) -> List[int]:
+    return [k for k in (int(h, 16) for h in formula.get("hashes", ())) if k not in stop]
+
+
+def document_formula_hashes(doc: Dict, stop: AbstractSet[int] = frozenset()) -> List[int]:
+    """Every formula fingerprint in a processed document not in `stop`, as integers."""
+    return [
+        key
+        for section in doc.get("sections", [])
+        for formula in section.get("formulas", ())
+        for key in _formula_keys(formula, stop)
+    ]
+
+
+def build_formula_index(json_dir: str, out_dir: Path, max_df: float = DEFAULT_MAX_DF,
+                        min_docs: int = DEFAULT_MIN_DOCS) -> Path:
+    entries = []
+    for path, doc in iter_documents(json_dir):
+        hashes = document_formula_hashes(doc)
+        if hashes:
+            entries.append((doc.get("doc_id") or path.stem, hashes,
+                            {"path": str(path), "title": doc.get("title", "")}))
+    payload = frequent_keys((hashes for _, hashes, _ in entries), max_df, min_docs)
+    stop = frozenset(payload["hashes"])
+    writer = SegmentWriter(shingle_size=0)
+    for doc_id, hashes, meta in entries:
+        keys = [h for h in hashes if h not in stop]
+        if keys:
+            writer.add(doc_id, keys, **meta)
+    logger.info("Indexing formulas from %d document(s)", len(writer.docs))
+    out_dir = writer.write(Path(out_dir))
+    save_stop_shingles(payload, out_dir / STOP_KEYS_FILE)
+    return out_dir
+
+
+def load_stop_keys(index_dir: Path) -> AbstractSet[int]:
+    """The formula index's stop keys; empty for an index built without them."""
+    return load_stop_shingles(Path(index_dir) / STOP_KEYS_FILE)
+
+
+def matching_formulas(doc: Dict, other: Dict,
+                      stop: AbstractSet[int] = frozenset()) -> List[Tuple[str, str]]:
+    """`(latex, other_latex)` pairs of formulas sharing a fingerprint not in `stop`."""
+    index: Dict[int, str] = {}
+    for section in other.get("sections", []):
+        for formula in section.get("formulas", ()):
+            for key in _formula_keys(formula, stop):
+                index.setdefault(key, formula["latex"])
+    pairs = []
+    for section in doc.get("sections", []):
+        for formula in section.get("formulas", ()):
+            hit = next((index[k] for k in _formula_keys(formula, stop) if k in index), None)
+            if hit is not None:
+                pairs.append((formula["latex"], hit))
+    return pairs
+
+
+def search_formulas(index_dir: Path, doc: Dict, top_k: int = 10) -> List[Tuple[str, int, float]]:
+    """Documents sharing formula fingerprints with `doc`: `(doc_id, shared, fraction)`."""
+    hashes = document_formula_hashes(doc, load_stop_keys(index_dir))
+    if not hashes:
+        return []
+    hits = Segment(Path(index_dir)).search(hashes, top_k + 1)
+    return [hit for hit in hits if hit[0] != doc.get("doc_id")][:top_k]
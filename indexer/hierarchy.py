@@ -0,0 +1,278 @@
+"""
+hierarchy.py — Coarse-to-fine retrieval: document → section → paragraph.
+
+Aligning every paragraph of a query against every paragraph of the corpus
+is exact but far too slow; whole-document scores are fast but cannot say
+where the overlap is. The hierarchical index keeps one cheap structure per
+level and each level only looks at what the previous one kept:
+
+  1. document — a segment over a sample of each document's shingles (the
+     hashes whose low SAMPLE_BITS bits are zero, ~1/8 of them). The same
+     sample of the query's shingles gives a containment estimate for every
+     document from one sorted-key lookup; the best `doc_k` documents with
+     at least `min_doc_matches` sampled hits survive.
+  2. section — one hashed term-frequency vector per section (SECTION_DIM
+     float32, L2-normalised, memory-mapped). Only the sections of the
+     surviving documents are scored against the query's sections; the best
+     `section_k` pairs per query section at cosine ≥ `min_section_score`
+     survive.
+  3. paragraph — the paragraphs of each surviving section pair are aligned
+     by shingle containment, and pairs at ≥ `min_paragraph_containment`
+     are reported.
+
+Index directory:
+
+    meta.json       counts, shingle size, sample bits, section dim
+    docs/           segment over sampled document shingles (see segment.py)
+    sections.jsonl  one {"doc", "section_id"} per row, grouped by document
+    sections.f32    n_sections × SECTION_DIM float32 (memory-mapped)
+
+`HierarchicalIndex.search` returns the alignments together with per-level
+stats (candidates in, kept, seconds), so thresholds can be tuned for recall
+against latency.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import zlib
+from pathlib import Path
+from typing import AbstractSet, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from indexer import distributed
+from indexer.corpus import iter_documents, load_document, section_text
+from indexer.segment import Segment, SegmentWriter
+from indexer.shingles import SHINGLE_SIZE, text_shingles, tokenize
+from indexer.stopshingles import load_stop_shingles
+
+logger = logging.getLogger("indexer.hierarchy")
+
+FORMAT_VERSION = 1
+HIERARCHY_DIR = "hierarchy"
+SAMPLE_BITS = 3              # keep shingles with hash % 8 == 0 at document level
+SECTION_DIM = 512            # hashed term buckets per section vector
+
+_SAMPLE_MASK = (1 << SAMPLE_BITS) - 1
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+
+def sample_shingles(hashes: Sequence[int]) -> Set[int]:
+    """The fixed ~1/2**SAMPLE_BITS subset of `hashes` used at document level."""
+    return {h for h in hashes if not h & _SAMPLE_MASK}
+
+
+def section_vector(text: str, dim: int = SECTION_DIM) -> Optional[np.ndarray]:
+    """Hashed, log-scaled term frequencies, L2-normalised; None for empty text."""
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    buckets = np.fromiter((zlib.crc32(t.encode("utf-8")) % dim for t in tokens),
+                          dtype=np.int64, count=len(tokens))
+    vector = np.log1p(np.bincount(buckets, minlength=dim)).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _paragraphs(section: Dict) -> List[str]:
+    return [p for p in _PARAGRAPH_SPLIT.split(section_text(section)) if p.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+
+def build_hierarchical_index(json_dir: str, out_dir: Path, shingle_size: int = SHINGLE_SIZE,
+                             stop: Optional[AbstractSet[int]] = None) -> Path:
+    """
+    Write the document segment and section vectors for every document.
+
+    Stop shingles default to <out_dir>/../stop_shingles.json when it exists.
+    """
+    out_dir = Path(out_dir)
+    if stop is None:
+        stop = load_stop_shingles(out_dir.parent / distributed.STOP_SHINGLES_FILE)
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    writer = SegmentWriter(shingle_size)
+    n_sections = 0
+    with (tmp / "sections.f32").open("wb") as f_vec, \
+            (tmp / "sections.jsonl").open("w", encoding="utf-8") as f_rows:
+        for path, doc in iter_documents(json_dir):
+            ordinal = len(writer.docs)
+            hashes: Set[int] = set()
+            for section in doc.get("sections", []):
+                text = section_text(section)
+                hashes.update(text_shingles(text, shingle_size))
+                vector = section_vector(text)
+                if vector is None:
+                    continue
+                f_vec.write(vector.tobytes())
+                f_rows.write(json.dumps(
+                    {"doc": ordinal, "section_id": section.get("section_id", "")},
+                    ensure_ascii=False,
+                ) + "\n")
+                n_sections += 1
+            writer.add(
+                doc.get("doc_id") or path.stem,
+                sample_shingles(hashes - stop),
+                path=str(path),
+                title=doc.get("title", ""),
+            )
+    writer.write(tmp / "docs")
+
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "shingle_size": shingle_size,
+            "sample_bits": SAMPLE_BITS,
+            "section_dim": SECTION_DIM,
+            "n_docs": len(writer.docs),
+            "n_sections": n_sections,
+        }, fh)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    logger.info("Hierarchical index: %d docs, %d sections → %s",
+                len(writer.docs), n_sections, out_dir)
+    return out_dir
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+
+def _level(name: str, n_in: int, n_out: int, start: float) -> Dict:
+    return {
+        "level": name,
+        "in": n_in,
+        "out": n_out,
+        "kept": n_out / n_in if n_in else 0.0,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class HierarchicalIndex:
+    """Document segment plus memory-mapped section vectors."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with (self.path / "meta.json").open("r", encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        if self.meta["sample_bits"] != SAMPLE_BITS or self.meta["section_dim"] != SECTION_DIM:
+            raise ValueError(f"{self.path} was built with different parameters; rebuild it")
+        self.docs = Segment(self.path / "docs")
+        self._ordinals = {entry["doc_id"]: i for i, entry in enumerate(self.docs.docs)}
+        self.shingle_size = self.meta["shingle_size"]
+        with (self.path / "sections.jsonl").open("r", encoding="utf-8") as fh:
+            self.sections: List[Dict] = [json.loads(line) for line in fh]
+        n = self.meta["n_sections"]
+        self.vectors = (
+            np.memmap(self.path / "sections.f32", dtype=np.float32, mode="r",
+                      shape=(n, SECTION_DIM))
+            if n else np.zeros((0, SECTION_DIM), dtype=np.float32)
+        )
+        owners = np.fromiter((row["doc"] for row in self.sections), dtype=np.int64, count=n)
+        self.section_offsets = np.searchsorted(owners, np.arange(len(self.docs) + 1))
+        self.stop = load_stop_shingles(self.path.parent / distributed.STOP_SHINGLES_FILE)
+
+    def search(self, doc: Dict, doc_k: int = 50, min_doc_matches: int = 2,
+               section_k: int = 3, min_section_score: float = 0.3,
+               min_paragraph_containment: float = 0.5) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Paragraph alignments for a processed document, and per-level stats.
+
+        Each alignment is `{doc_id, section_id, paragraph, match_section_id,
+        match_paragraph, section_score, containment}`, best first; the
+        document itself (same doc_id) is never matched.
+        """
+        stats: List[Dict] = []
+        k = self.shingle_size
+        query_sections = [
+            (section, section_text(section)) for section in doc.get("sections", [])
+        ]
+
+        # Level 1: sampled document shingles.
+        start = time.perf_counter()
+        hashes: Set[int] = set()
+        for _, text in query_sections:
+            hashes.update(text_shingles(text, k))
+        counts = self.docs.match_counts(sample_shingles(hashes - self.stop))
+        if doc.get("doc_id") in self._ordinals:
+            counts[self._ordinals[doc["doc_id"]]] = 0
+        survivors = [
+            int(i) for i in np.argsort(-counts, kind="stable")[:doc_k]
+            if counts[i] >= min_doc_matches
+        ]
+        stats.append(_level("document", len(self.docs), len(survivors), start))
+
+        # Level 2: section vectors of the surviving documents only.
+        start = time.perf_counter()
+        rows = np.concatenate([
+            np.arange(self.section_offsets[i], self.section_offsets[i + 1]) for i in survivors
+        ]) if survivors else np.zeros(0, dtype=np.int64)
+        queries = [
+            (section, text, vector) for section, text in query_sections
+            for vector in [section_vector(text)] if vector is not None
+        ]
+        pairs: List[Tuple[Dict, int, float]] = []
+        if rows.size and queries:
+            scores = np.stack([v for _, _, v in queries]) @ np.asarray(self.vectors[rows]).T
+            for (section, _, _), row_scores in zip(queries, scores):
+                for j in np.argsort(-row_scores, kind="stable")[:section_k]:
+                    if row_scores[j] < min_section_score:
+                        break
+                    pairs.append((section, int(rows[j]), float(row_scores[j])))
+        stats.append(_level("section", int(rows.size) * len(queries), len(pairs), start))
+
+        # Level 3: paragraph alignment inside the surviving section pairs.
+        start = time.perf_counter()
+        loaded: Dict[int, Dict[str, Dict]] = {}
+        own_paragraphs: Dict[int, List[Set[int]]] = {}
+        compared = 0
+        hits: List[Dict] = []
+        for section, row, score in pairs:
+            owner = self.sections[row]["doc"]
+            if owner not in loaded:
+                other = load_document(Path(self.docs.docs[owner]["path"]))
+                loaded[owner] = {s.get("section_id", ""): s for s in other.get("sections", [])}
+            match = loaded[owner].get(self.sections[row]["section_id"])
+            if match is None:
+                continue
+            theirs = [set(text_shingles(p, k)) - self.stop for p in _paragraphs(match)]
+            if id(section) not in own_paragraphs:
+                own_paragraphs[id(section)] = [
+                    set(text_shingles(p, k)) - self.stop for p in _paragraphs(section)
+                ]
+            for qi, ours in enumerate(own_paragraphs[id(section)]):
+                if not ours:
+                    continue
+                compared += len(theirs)
+                best, best_j = max(
+                    ((len(ours & t) / len(ours), j) for j, t in enumerate(theirs)),
+                    default=(0.0, -1),
+                )
+                if best >= min_paragraph_containment:
+                    hits.append({
+                        "doc_id": self.docs.docs[owner]["doc_id"],
+                        "section_id": section.get("section_id", ""),
+                        "paragraph": qi,
+                        "match_section_id": self.sections[row]["section_id"],
+                        "match_paragraph": best_j,
+                        "section_score": score,
+                        "containment": best,
+                    })
+        stats.append(_level("paragraph", compared, len(hits), start))
+
+        hits.sort(key=lambda hit: (-hit["containment"], -hit["section_score"]))
+        return hits, stats
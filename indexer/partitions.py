@@ -0,0 +1,137 @@
+"""
+partitions.py — Shingle index split by publication year (and optionally venue).
+
+Only a paper published no later than the suspect can be its source, so the
+corpus is indexed as one segment per partition:
+
+    <out>/partitions/partitions.json     {key: {"year", "venue", "n_docs"}}
+    <out>/partitions/2018/               segment of every 2018 paper
+    <out>/partitions/2018/ijcai/         ... or one per year and venue (--by-venue)
+    <out>/partitions/unknown/            papers with no year
+
+The year and venue come from the crawl metadata (`source.year`,
+`source.venue` or the manifest's collection) and fall back to what the
+extractor parsed from the paper (`published`, `venue`) only when the paper
+is in no manifest. A query for a 2021
+paper opens only the partitions up to 2021, plus `unknown`, which can never
+be ruled out; the later partitions are neither read nor paged in. Every
+partition is an ordinary segment (see segment.py), so the per-partition
+search is `Segment.search` and the results merge by shared shingles as in
+the sharded searcher.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from indexer import distributed
+from indexer.corpus import document_venue, document_year, iter_documents
+from indexer.segment import Segment
+from indexer.shingles import SHINGLE_SIZE
+from indexer.stopshingles import load_stop_shingles
+
+logger = logging.getLogger("indexer.partitions")
+
+PARTITION_DIR = "partitions"
+MANIFEST = "partitions.json"
+UNKNOWN = "unknown"
+
+
+def partition_key(doc: Dict, by_venue: bool = False) -> str:
+    """"2021", "2021/cvpr" with `by_venue`, or "unknown" when the year is missing."""
+    year = document_year(doc)
+    if year is None:
+        return UNKNOWN
+    if not by_venue:
+        return str(year)
+    return f"{year}/{document_venue(doc) or UNKNOWN}"
+
+
+def build_partitioned_index(json_dir: str, out_dir: Path, by_venue: bool = False,
+                            shingle_size: int = SHINGLE_SIZE,
+                            stop: Optional[frozenset] = None) -> Dict[str, Dict]:
+    """
+    Write one segment per partition and the manifest; returns the manifest.
+
+    Stop shingles default to <out_dir>/../stop_shingles.json (as learned by
+    `python -m indexer stopshingles`) when that file exists.
+    """
+    out_dir = Path(out_dir)
+    if stop is None:
+        stop = load_stop_shingles(out_dir.parent / distributed.STOP_SHINGLES_FILE)
+
+    groups: Dict[str, List[str]] = {}
+    manifest: Dict[str, Dict] = {}
+    for path, doc in iter_documents(json_dir):
+        key = partition_key(doc, by_venue)
+        groups.setdefault(key, []).append(str(path))
+        if key not in manifest:
+            year = document_year(doc)
+            manifest[key] = {
+                "year": year,
+                "venue": key.split("/", 1)[1] if "/" in key else None,
+                "n_docs": 0,
+            }
+        manifest[key]["n_docs"] += 1
+
+    for key in sorted(groups):
+        logger.info("Building partition %s (%d file(s))", key, len(groups[key]))
+        distributed.build_shard(groups[key], out_dir / key, shingle_size, stop)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with (out_dir / MANIFEST).open("w", encoding="utf-8") as fh:
+        json.dump(dict(sorted(manifest.items())), fh, ensure_ascii=False, indent=1)
+    logger.info("Wrote %d partition(s) to %s", len(manifest), out_dir)
+    return manifest
+
+
+class PartitionedIndex:
+    """Partition manifest plus lazily opened per-partition segments."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        with (self.root / MANIFEST).open("r", encoding="utf-8") as fh:
+            self.partitions: Dict[str, Dict] = json.load(fh)
+        self._segments: Dict[str, Segment] = {}
+
+    def segment(self, key: str) -> Segment:
+        if key not in self._segments:
+            self._segments[key] = Segment(self.root / key)
+        return self._segments[key]
+
+    def select(self, year: Optional[int] = None,
+               venues: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Partitions a paper from `year` could have copied from.
+
+        Keeps years up to and including `year` (a source can appear in the
+        same year) and, when `venues` is given, only those venues. Partitions
+        with no year or no venue are always kept. `year=None` keeps all years.
+        """
+        wanted = {v.lower() for v in venues} if venues else None
+        keys = []
+        for key, info in self.partitions.items():
+            if year is not None and info["year"] is not None and info["year"] > year:
+                continue
+            venue = info.get("venue")
+            if wanted is not None and venue not in (None, UNKNOWN) and venue not in wanted:
+                continue
+            keys.append(key)
+        return sorted(keys)
+
+    def search(self, hashes: Sequence[int], top_k: int = 10, year: Optional[int] = None,
+               venues: Optional[Iterable[str]] = None) -> List[Tuple[str, int, float]]:
+        """`Segment.search` over the selected partitions, merged by shared shingles."""
+        keys = self.select(year, venues)
+        logger.info(
+            "Searching %d of %d partition(s) (%d docs skipped)",
+            len(keys), len(self.partitions),
+            sum(info["n_docs"] for k, info in self.partitions.items() if k not in keys),
+        )
+        query = list(set(hashes))
+        hits = [hit for key in keys for hit in self.segment(key).search(query, top_k)]
+        hits.sort(key=lambda hit: -hit[1])
+        return hits[:top_k]
@@ -0,0 +1,287 @@
+"""
+segment.py — Immutable inverted-index segment over shingle hashes.
+
+A segment is a directory:
+
+    meta.json       counts, shingle size, format version
+    docs.json       [{"doc_id", "path", "title", "n_shingles"}, ...]
+    keys.u64        sorted distinct shingle hashes            (uint64)
+    offsets.i64     postings[offsets[i]:offsets[i+1]] ↔ keys[i] (int64)
+    postings.u32    local document ordinals                   (uint32)
+
+The arrays are raw little-endian binaries opened with `numpy.memmap`, so
+loading a segment costs nothing until pages are touched and several query
+processes share the OS page cache. Segments are written into a temporary
+directory and renamed into place, so a reader never sees a partial one.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indexer.shingles import SHINGLE_SIZE
+
+logger = logging.getLogger("indexer.segment")
+
+FORMAT_VERSION = 1
+
+_KEYS = "keys.u64"
+_OFFSETS = "offsets.i64"
+_POSTINGS = "postings.u32"
+
+
+def _write_array(path: Path, arr: np.ndarray) -> None:
+    with path.open("wb") as fh:
+        fh.write(np.ascontiguousarray(arr).tobytes())
+
+
+def _open_array(path: Path, dtype, count: int) -> np.ndarray:
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _posting_positions(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenated `arange(start, end)` for every pair, without a Python loop."""
+    lengths = (ends - starts).astype(np.int64)
+    if not lengths.size:
+        return np.zeros(0, dtype=np.int64)
+    first = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(first, lengths) + np.repeat(starts, lengths)
+
+
+def _publish(tmp_dir: Path, out_dir: Path) -> None:
+    """
+    Move a finished segment from `tmp_dir` to `out_dir`.
+
+    A directory cannot be replaced by rename while it has files, so an
+    existing segment is first renamed aside, the new one renamed in, and
+    only then is the old one deleted. `out_dir` is missing only between two
+    renames, never while files are being deleted, and readers that already
+    mapped the old files keep reading them until they close.
+    """
+    old = out_dir.parent / f".{out_dir.name}.old-{os.getpid()}-{time.time_ns()}"
+    try:
+        os.replace(out_dir, old)
+    except FileNotFoundError:
+        old = None
+    os.replace(tmp_dir, out_dir)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+class SegmentWriter:
+    """Accumulate documents in memory, then write one segment."""
+
+    def __init__(self, shingle_size: int = SHINGLE_SIZE) -> None:
+        self.shingle_size = shingle_size
+        self.docs: List[Dict] = []
+        self._keys: List[np.ndarray] = []
+        self._ords: List[np.ndarray] = []
+
+    def add(self, doc_id: str, hashes: Iterable[int], **meta) -> None:
+        keys = np.fromiter(set(hashes), dtype=np.uint64)
+        ordinal = len(self.docs)
+        self.docs.append({"doc_id": doc_id, "n_shingles": int(keys.size), **meta})
+        self._keys.append(keys)
+        self._ords.append(np.full(keys.size, ordinal, dtype=np.uint32))
+
+    def write(self, out_dir: Path) -> Path:
+        out_dir = Path(out_dir)
+        keys = np.concatenate(self._keys) if self._keys else np.zeros(0, np.uint64)
+        ords = np.concatenate(self._ords) if self._ords else np.zeros(0, np.uint32)
+        order = np.lexsort((ords, keys))
+        _write_segment(out_dir, keys[order], ords[order], self.docs, self.shingle_size)
+        return out_dir
+
+
+def _write_segment(out_dir: Path, sorted_keys: np.ndarray, postings: np.ndarray,
+                   docs: List[Dict], shingle_size: int) -> None:
+    uniq, starts = np.unique(sorted_keys, return_index=True)
+    offsets = np.append(starts, sorted_keys.size).astype(np.int64)
+
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    _write_array(tmp / _KEYS, uniq.astype(np.uint64))
+    _write_array(tmp / _OFFSETS, offsets)
+    _write_array(tmp / _POSTINGS, postings.astype(np.uint32))
+    with (tmp / "docs.json").open("w", encoding="utf-8") as fh:
+        json.dump(docs, fh, ensure_ascii=False)
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "shingle_size": shingle_size,
+            "n_docs": len(docs),
+            "n_keys": int(uniq.size),
+            "n_postings": int(postings.size),
+        }, fh)
+    _publish(tmp, out_dir)
+    logger.info("Wrote segment %s (%d docs, %d keys)", out_dir, len(docs), uniq.size)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment directory."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with (self.path / "meta.json").open("r", encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        with (self.path / "docs.json").open("r", encoding="utf-8") as fh:
+            self.docs: List[Dict] = json.load(fh)
+        self.shingle_size = self.meta["shingle_size"]
+        self.keys = _open_array(self.path / _KEYS, np.uint64, self.meta["n_keys"])
+        self.offsets = _open_array(self.path / _OFFSETS, np.int64, self.meta["n_keys"] + 1)
+        self.postings = _open_array(self.path / _POSTINGS, np.uint32, self.meta["n_postings"])
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def match_counts(self, hashes: Sequence[int]) -> np.ndarray:
+        """Number of distinct query shingles each document contains."""
+        query = np.unique(np.asarray(list(hashes), dtype=np.uint64))
+        counts = np.zeros(len(self.docs), dtype=np.int64)
+        if not query.size or not self.keys.size:
+            return counts
+        idx = np.searchsorted(self.keys, query)
+        valid = idx < self.keys.size
+        idx, query = idx[valid], query[valid]
+        idx = idx[self.keys[idx] == query]
+        if not idx.size:
+            return counts
+        hits = self.postings[_posting_positions(self.offsets[idx], self.offsets[idx + 1])]
+        return np.bincount(hits, minlength=len(self.docs)).astype(np.int64)
+
+    def search(self, hashes: Sequence[int], top_k: int = 10,
+               min_matches: int = 1) -> List[Tuple[str, int, float]]:
+        """
+        Top documents by shared shingles: `(doc_id, matches, containment)`.
+
+        Containment is the fraction of the query's distinct shingles found
+        in the document.
+        """
+        n_query = len(set(hashes))
+        counts = self.match_counts(hashes)
+        if not n_query or not counts.any():
+            return []
+        candidates = np.flatnonzero(counts >= max(min_matches, 1))
+        top = candidates[np.argsort(-counts[candidates], kind="stable")][:top_k]
+        return [
+            (self.docs[i]["doc_id"], int(counts[i]), float(counts[i]) / n_query)
+            for i in top
+        ]
+
+    def iter_pairs(self, lo: int, hi: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """`(key, local_ordinal)` pairs for keys in [lo, hi) (hi=None → unbounded)."""
+        a = int(np.searchsorted(self.keys, np.uint64(lo)))
+        b = self.keys.size if hi is None else int(np.searchsorted(self.keys, np.uint64(hi)))
+        if a >= b:
+            return np.zeros(0, np.uint64), np.zeros(0, np.uint32)
+        lengths = np.diff(self.offsets[a:b + 1])
+        keys = np.repeat(np.asarray(self.keys[a:b]), lengths)
+        ords = np.asarray(self.postings[self.offsets[a]:self.offsets[b]])
+        return keys, ords
+
+
+# ---------------------------------------------------------------------------
+# Merging
+# ---------------------------------------------------------------------------
+
+
+def merge_segments(segment_dirs: Sequence[Path], out_dir: Path, key_ranges: int = 16) -> Path:
+    """
+    Merge segments into one, a hash range at a time.
+
+    Memory is bounded by roughly 1/`key_ranges` of the total postings rather
+    than the whole corpus: each range is gathered from every segment,
+    sorted, and streamed to the output files.
+
+    A `doc_id` indexed by more than one segment (one paper saved under two
+    names, planned into different shards) is kept from the first segment
+    only; the other copies' postings are dropped.
+    """
+    segments = [Segment(d) for d in segment_dirs]
+    if not segments:
+        raise ValueError("nothing to merge")
+    shingle_sizes = {s.shingle_size for s in segments}
+    if len(shingle_sizes) != 1:
+        raise ValueError(f"segments use different shingle sizes: {shingle_sizes}")
+
+    docs: List[Dict] = []
+    remaps: List[np.ndarray] = []     # local ordinal → merged ordinal, -1 for a duplicate
+    seen = set()
+    for seg in segments:
+        remap = np.full(len(seg.docs), -1, dtype=np.int64)
+        for i, doc in enumerate(seg.docs):
+            if doc["doc_id"] not in seen:
+                seen.add(doc["doc_id"])
+                remap[i] = len(docs)
+                docs.append(doc)
+        remaps.append(remap)
+    n_dropped = sum(len(seg.docs) for seg in segments) - len(docs)
+    if n_dropped:
+        logger.info("Dropping %d duplicate doc_id(s) while merging", n_dropped)
+
+    out_dir = Path(out_dir)
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    step = (1 << 64) // key_ranges
+    n_keys = n_postings = 0
+    with (tmp / _KEYS).open("wb") as f_keys, \
+            (tmp / _OFFSETS).open("wb") as f_offsets, \
+            (tmp / _POSTINGS).open("wb") as f_postings:
+        for r in range(key_ranges):
+            lo = r * step
+            hi = None if r == key_ranges - 1 else (r + 1) * step
+            parts = [seg.iter_pairs(lo, hi) for seg in segments]
+            keys = np.concatenate([k for k, _ in parts])
+            ords = np.concatenate([remap[o] for (_, o), remap in zip(parts, remaps)])
+            kept = ords >= 0
+            keys, ords = keys[kept], ords[kept]
+            if not keys.size:
+                continue
+            order = np.lexsort((ords, keys))
+            keys, ords = keys[order], ords[order]
+            uniq, starts = np.unique(keys, return_index=True)
+            f_keys.write(uniq.tobytes())
+            f_offsets.write((starts.astype(np.int64) + n_postings).tobytes())
+            f_postings.write(ords.astype(np.uint32).tobytes())
+            n_keys += uniq.size
+            n_postings += keys.size
+        f_offsets.write(np.array([n_postings], dtype=np.int64).tobytes())
+
+    with (tmp / "docs.json").open("w", encoding="utf-8") as fh:
+        json.dump(docs, fh, ensure_ascii=False)
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "shingle_size": shingle_sizes.pop(),
+            "n_docs": len(docs),
+            "n_keys": n_keys,
+            "n_postings": n_postings,
+        }, fh)
+    _publish(tmp, out_dir)
+    logger.info("Merged %d segments → %s (%d docs, %d keys)", len(segments), out_dir, len(docs), n_keys)
+    return out_dir
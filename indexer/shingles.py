@@ -0,0 +1,69 @@
+"""
+shingles.py — Word shingles and their 64-bit hashes.
+
+All shingle-based indexes hash the same way: lower-cased word tokens of the
+unmasked section text (`indexer.corpus.unmasked_segments`), k consecutive
+tokens per shingle, BLAKE2b truncated to 64 bits. Shingles never cross a
+masked span.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from indexer.corpus import unmasked_segments
+
+SHINGLE_SIZE = 5
+
+_TOKEN_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _TOKEN_REGEX.findall(text)
+
+
+def hash_shingle(shingle: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def iter_shingles(tokens: List[str], k: int = SHINGLE_SIZE) -> Iterator[Tuple[int, str]]:
+    """Yield `(hash, text)` for every k-token window of `tokens`."""
+    for i in range(len(tokens) - k + 1):
+        shingle = " ".join(tokens[i:i + k])
+        yield hash_shingle(shingle), shingle
+
+
+def text_shingles(text: str, k: int = SHINGLE_SIZE) -> List[int]:
+    return [h for h, _ in iter_shingles(tokenize(text), k)]
+
+
+def section_shingles(section: Dict, k: int = SHINGLE_SIZE) -> List[int]:
+    """Shingle hashes of one section, in text order, masked spans excluded."""
+    hashes: List[int] = []
+    for segment in unmasked_segments(section):
+        hashes.extend(text_shingles(segment, k))
+    return hashes
+
+
+def document_shingles(
+    doc: Dict,
+    k: int = SHINGLE_SIZE,
+    stop: Optional[AbstractSet[int]] = None,
+) -> Set[int]:
+    """Distinct shingle hashes of a processed document, minus `stop` shingles."""
+    hashes: Set[int] = set()
+    for section in doc.get("sections", []):
+        hashes.update(section_shingles(section, k))
+    if stop:
+        hashes.difference_update(stop)
+    return hashes
+
+
+def drop_stop_shingles(hashes: Iterable[int], stop: AbstractSet[int]) -> List[int]:
+    return [h for h in hashes if h not in stop]
@@ -0,0 +1,175 @@
+"""
+snippet.py — Check one pasted paragraph against the corpus index.
+
+A reviewer with a single suspicious paragraph should not have to go
+through PDF conversion. `SnippetChecker` takes raw text and:
+
+  1. normalises it the way the extractor builds a section: paragraphs split
+     on blank lines and stripped (`_split_paragraphs` in extract_v2.py),
+     joined with blank lines, and masked with the extractor's own
+     `build_span_mask` (citations, quotations, equations, boilerplate), so
+     it yields exactly the shingles an indexed section with that text would;
+  2. shingles it and drops stop shingles — when nothing is left (a snippet
+     of boilerplate or under SHINGLE_SIZE words) it returns at once, and
+     when the index has a Bloom filter (bloom.py) a snippet whose shingles
+     mostly miss it returns without touching the segment;
+  3. counts shared shingles per document with one sorted-key lookup on the
+     merged segment;
+  4. for the best few documents only, finds which token spans of which
+     section carry the shared shingles.
+
+The checker is meant to be opened once and queried many times: the segment
+is memory-mapped, and the shingled sections of recently matched papers are
+cached. Each result carries per-stage timings; bench_snippet.py measures the
+latency distribution over corpus paragraphs.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import AbstractSet, Dict, List, Sequence, Tuple
+
+from extract_script.span_mask import build_span_mask
+from indexer import distributed
+from indexer.bloom import DEFAULT_THRESHOLD, open_prescreen
+from indexer.corpus import load_document, unmasked_segments
+from indexer.segment import Segment
+from indexer.shingles import iter_shingles, tokenize
+from indexer.stopshingles import load_stop_shingles
+
+logger = logging.getLogger("indexer.snippet")
+
+SPAN_DOCS = 3                # documents whose matching spans are located
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+
+def snippet_section(text: str) -> Dict:
+    """A pasted snippet as an extractor-style section (`summary` + span `mask`)."""
+    paragraphs = [p.strip() for p in _PARAGRAPH_SPLIT.split(text.strip()) if p.strip()]
+    summary = "\n\n".join(paragraphs)
+    return {"section_id": "snippet", "summary": summary, "mask": build_span_mask(summary)}
+
+
+def _spans(hashes: Sequence[int], wanted: AbstractSet[int], k: int) -> List[Tuple[int, int]]:
+    """Token ranges `[start, end)` covered by shingles in `wanted`, merged."""
+    spans: List[Tuple[int, int]] = []
+    for i, h in enumerate(hashes):
+        if h not in wanted:
+            continue
+        if spans and i <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], i + k)
+        else:
+            spans.append((i, i + k))
+    return spans
+
+
+@lru_cache(maxsize=256)
+def _shingled_sections(path: str, k: int) -> Tuple[Tuple[str, int, Tuple[str, ...], Tuple[int, ...]], ...]:
+    """
+    `(section_id, base, tokens, shingle hashes)` per unmasked segment of a
+    corpus document; `base` is the segment's first token within its section.
+    """
+    doc = load_document(Path(path))
+    out = []
+    for section in doc.get("sections", []):
+        base = 0
+        for segment in unmasked_segments(section):
+            tokens = tokenize(segment)
+            hashes = tuple(h for h, _ in iter_shingles(tokens, k))
+            out.append((section.get("section_id", ""), base, tuple(tokens), hashes))
+            base += len(tokens)
+    return tuple(out)
+
+
+class SnippetChecker:
+    """Memory-mapped merged segment plus stop shingles, opened once."""
+
+    def __init__(self, index_root: Path) -> None:
+        root = Path(index_root)
+        self.segment = Segment(root / "merged")
+        self.shingle_size = self.segment.shingle_size
+        self.stop = load_stop_shingles(root / distributed.STOP_SHINGLES_FILE)
+        self._ordinals = {d["doc_id"]: i for i, d in enumerate(self.segment.docs)}
+        self.bloom = open_prescreen(root)
+
+    def check(self, text: str, top_k: int = 5, min_matches: int = 2,
+              span_docs: int = SPAN_DOCS, threshold: float = DEFAULT_THRESHOLD) -> Dict:
+        """
+        Papers sharing shingles with `text`, best first.
+
+        Snippets under `threshold` Bloom-filter hits skip the lookup.
+        Returns `{"matches": [...], "timings": {stage: seconds}}`; each match
+        is `{doc_id, title, matches, containment, spans}`, where `spans` (for
+        the first `span_docs` matches) lists `{section_id, start, end, text}`
+        token ranges of the paper and `snippet_spans` the matching ranges of
+        the snippet itself.
+        """
+        k = self.shingle_size
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        section = snippet_section(text)
+        pieces = []
+        for segment in unmasked_segments(section):
+            tokens = tokenize(segment)
+            pieces.append((tokens, [h for h, _ in iter_shingles(tokens, k)]))
+        query = {h for _, hashes in pieces for h in hashes} - self.stop
+        timings["normalise"] = time.perf_counter() - start
+        if not query:
+            return {"matches": [], "timings": timings}
+
+        if self.bloom is not None:
+            start = time.perf_counter()
+            passed = self.bloom.hit_rate(query) >= threshold
+            timings["prescreen"] = time.perf_counter() - start
+            if not passed:
+                return {"matches": [], "timings": timings}
+
+        start = time.perf_counter()
+        hits = self.segment.search(query, top_k, min_matches)
+        timings["lookup"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matches: List[Dict] = []
+        for rank, (doc_id, shared, containment) in enumerate(hits):
+            entry = self.segment.docs[self._ordinals[doc_id]]
+            match = {
+                "doc_id": doc_id,
+                "title": entry.get("title", ""),
+                "matches": shared,
+                "containment": containment,
+            }
+            if rank < span_docs and entry.get("path"):
+                match.update(self._locate(entry["path"], query, pieces))
+            matches.append(match)
+        timings["spans"] = time.perf_counter() - start
+        return {"matches": matches, "timings": timings}
+
+    def _locate(self, path: str, query: AbstractSet[int],
+                pieces: Sequence[Tuple[List[str], List[int]]]) -> Dict:
+        k = self.shingle_size
+        try:
+            sections = _shingled_sections(path, k)
+        except (OSError, ValueError) as exc:
+            logger.warning("Cannot read %s for spans: %s", path, exc)
+            return {"spans": [], "snippet_spans": []}
+        theirs = set()
+        spans = []
+        for section_id, base, tokens, hashes in sections:
+            theirs.update(hashes)
+            for a, b in _spans(hashes, query, k):
+                spans.append({"section_id": section_id, "start": base + a, "end": base + b,
+                              "text": " ".join(tokens[a:b])})
+        shared = query & theirs
+        snippet_spans = []
+        offset = 0
+        for tokens, hashes in pieces:
+            for a, b in _spans(hashes, shared, k):
+                snippet_spans.append({"start": offset + a, "end": offset + b,
+                                      "text": " ".join(tokens[a:b])})
+            offset += len(tokens)
+        return {"spans": spans, "snippet_spans": snippet_spans}
@@ -0,0 +1,164 @@
+"""
+stopshingles.py — Corpus-learned stop-shingle list.
+
+Template phrases ("in this paper we propose", "proceedings of the aaai
+conference") occur in thousands of papers and blow up posting lists in any
+shingle index. This stage counts each shingle's *document* frequency in a
+single streaming pass over json_output/ with a count-min sketch, so memory
+stays fixed however large the corpus grows, and writes the shingles above a
+frequency cut-off to a stop list that retrieval drops.
+
+A count-min sketch only over-estimates, so a rare shingle can at worst be
+over-counted by hash collisions; `width` bounds that error to roughly
+`total_occurrences / width` per row.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List
+
+from indexer.corpus import iter_documents, unmasked_segments
+from indexer.shingles import SHINGLE_SIZE, iter_shingles, tokenize
+
+logger = logging.getLogger("indexer.stopshingles")
+
+DEFAULT_MAX_DF = 0.005       # drop shingles in more than 0.5% of documents…
+DEFAULT_MIN_DOCS = 20        # …but never ones seen in fewer than this many
+
+_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+
+
+class CountMinSketch:
+    """Fixed-size frequency sketch with conservative update."""
+
+    def __init__(self, width: int = 1 << 22, depth: int = 4, seed: int = 0x5EED) -> None:
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+        state = seed
+        self._coeffs = []
+        for _ in range(depth):
+            state = (state * 6364136223846793005 + 1442695040888963407) & _MASK64
+            a = (state >> 3) % _PRIME or 1
+            state = (state * 6364136223846793005 + 1442695040888963407) & _MASK64
+            self._coeffs.append((a, (state >> 3) % _PRIME))
+
+    def _cells(self, key: int) -> List[int]:
+        return [((a * key + b) % _PRIME) % self.width for a, b in self._coeffs]
+
+    def add(self, key: int) -> int:
+        """Increment `key` and return its new estimate."""
+        cells = self._cells(key)
+        estimate = min(row[c] for row, c in zip(self._rows, cells)) + 1
+        for row, c in zip(self._rows, cells):
+            if row[c] < estimate:
+                row[c] = estimate
+        return estimate
+
+    def estimate(self, key: int) -> int:
+        return min(row[c] for row, c in zip(self._rows, self._cells(key)))
+
+
+def build_stop_shingles(
+    documents: Iterable[Dict],
+    k: int = SHINGLE_SIZE,
+    max_df: float = DEFAULT_MAX_DF,
+    min_docs: int = DEFAULT_MIN_DOCS,
+    width: int = 1 << 22,
+    depth: int = 4,
+) -> Dict:
+    """
+    One pass over `documents`; returns the stop-list payload.
+
+    A shingle becomes a candidate as soon as its estimated document
+    frequency reaches `min_docs`; once the corpus size is known, candidates
+    below `max_df * n_docs` are discarded.
+    """
+    sketch = CountMinSketch(width, depth)
+    candidates: Dict[int, str] = {}
+    n_docs = 0
+
+    for doc in documents:
+        n_docs += 1
+        seen: Dict[int, str] = {}
+        for section in doc.get("sections", []):
+            for segment in unmasked_segments(section):
+                for h, text in iter_shingles(tokenize(segment), k):
+                    seen.setdefault(h, text)
+        for h, text in seen.items():
+            if sketch.add(h) >= min_docs and h not in candidates:
+                candidates[h] = text
+        if n_docs % 10000 == 0:
+            logger.info("Counted %d documents, %d candidates", n_docs, len(candidates))
+
+    cutoff = max(min_docs, int(max_df * n_docs))
+    stop = {h: text for h, text in candidates.items() if sketch.estimate(h) >= cutoff}
+    logger.info(
+        "%d documents → %d stop shingles (document frequency ≥ %d)",
+        n_docs, len(stop), cutoff,
+    )
+    ranked = sorted(stop.items(), key=lambda item: -sketch.estimate(item[0]))
+    return {
+        "shingle_size": k,
+        "n_docs": n_docs,
+        "min_doc_freq": cutoff,
+        "hashes": [h for h, _ in ranked],
+        "examples": [
+            {"shingle": text, "doc_freq": sketch.estimate(h)} for h, text in ranked[:200]
+        ],
+    }
+
+
+def frequent_keys(key_sets: Iterable[Iterable[int]], max_df: float,
+                  min_docs: int) -> Dict:
+    """
+    Stop-list payload for a small key space (table or formula fingerprints).
+
+    Counts are exact, one `Counter` entry per distinct key, so this is only
+    for indexes far smaller than the shingle index. Each element of
+    `key_sets` is one document (or table); keys in at least
+    `max(min_docs, max_df * n)` of them are listed.
+    """
+    counts: Counter = Counter()
+    n_docs = 0
+    for keys in key_sets:
+        n_docs += 1
+        counts.update(set(keys))
+    cutoff = max(min_docs, int(max_df * n_docs))
+    stop = sorted((h for h, c in counts.items() if c >= cutoff), key=lambda h: -counts[h])
+    logger.info("%d entries → %d stop keys (document frequency ≥ %d)", n_docs, len(stop), cutoff)
+    return {
+        "n_docs": n_docs,
+        "min_doc_freq": cutoff,
+        "hashes": stop,
+        "examples": [{"hash": f"{h:016x}", "doc_freq": counts[h]} for h in stop[:200]],
+    }
+
+
+def save_stop_shingles(payload: Dict, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, indent=2)
+    logger.info("Saved %d stop shingles → %s", len(payload["hashes"]), path)
+
+
+def load_stop_shingles(path: Path) -> FrozenSet[int]:
+    """Stop-shingle hashes from `path`; empty when the file does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return frozenset()
+    with path.open("r", encoding="utf-8") as fh:
+        return frozenset(json.load(fh)["hashes"])
+
+
+def build_from_dir(json_dir: str, out_path: Path, **kwargs) -> Dict:
+    payload = build_stop_shingles((doc for _, doc in iter_documents(json_dir)), **kwargs)
+    save_stop_shingles(payload, out_path)
+    return payload
@@ -0,0 +1,370 @@
+"""
+suffix_array.py — Generalized suffix array over the corpus, for exact phrases.
+
+Shingle indexes answer "which papers share many 5-word windows"; an
+investigation also needs "where else does this exact 40-word passage
+appear?". The suffix array answers that for any length: every section's
+normalised tokens (same tokenizer as the shingles, masked spans removed)
+are mapped to integer ids and concatenated, each section followed by a
+separator, and every token position is sorted by the token sequence that
+starts there. A phrase of m tokens is then one binary search, O(m log n),
+and all its occurrences are a contiguous run of the array.
+
+Index directory (arrays are raw little-endian, memory-mapped):
+
+    meta.json      counts, chunk size, format version
+    vocab.json     token of every id (id 0 is the section separator)
+    docs.json      [{"doc_id", "path", "title"}, ...]
+    sections.json  [{"doc", "section_id"}, ...]
+    starts.i64     first token position of every section
+    text.u32       token ids, a separator after each section, WINDOW pad
+    sa.i64         suffix start positions in sorted order (separators excluded)
+    lcp.u32        lcp[i] = common prefix length of suffixes sa[i-1], sa[i]
+
+The build keeps RAM bounded: the text is streamed to disk, then suffixes
+are sorted one bucket of first-token ids at a time (at most `chunk`
+suffixes, or one token's occurrences if that is larger), comparing WINDOW
+tokens per round and only going deeper for suffixes still tied. Buckets
+are in id order, so writing them one after another gives the full array.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indexer.corpus import iter_documents, section_text
+from indexer.shingles import tokenize
+
+logger = logging.getLogger("indexer.suffix")
+
+FORMAT_VERSION = 1
+SUFFIX_DIR = "suffix"
+SA_CHUNK = 1 << 23           # suffixes sorted in memory at once
+WINDOW = 8                   # tokens compared per sorting round
+SEP = 0                      # section separator; sorts before every token
+MISSING = np.uint32(0xFFFFFFFF)  # query token absent from the corpus
+
+_BLOCK = 1 << 24             # tokens per scan block
+_OFFSETS = np.arange(WINDOW)
+
+
+def _windows(text: np.ndarray, positions: np.ndarray, depth: int) -> np.ndarray:
+    return np.asarray(text[positions[:, None] + depth + _OFFSETS])
+
+
+def _ties(keys: np.ndarray, group: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows equal to a neighbour on the whole window (no separator in it), and their run ids."""
+    same = np.all(keys[1:] == keys[:-1], axis=1) & np.all(keys[:-1] != SEP, axis=1)
+    if group is not None:
+        same &= group[1:] == group[:-1]
+    tied = np.zeros(len(keys), dtype=bool)
+    tied[1:] |= same
+    tied[:-1] |= same
+    run_start = np.ones(len(keys), dtype=bool)
+    run_start[1:] = ~same
+    return tied, np.cumsum(run_start)[tied]
+
+
+def _sort_suffixes(text: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Sort suffix start positions, WINDOW tokens per round, refining only ties."""
+    def order_by(keys: np.ndarray, *minor_major) -> np.ndarray:
+        columns = tuple(keys[:, j] for j in reversed(range(WINDOW)))
+        return np.lexsort(minor_major[:1] + columns + minor_major[1:])
+
+    keys = _windows(text, positions, 0)
+    order = order_by(keys, positions)
+    positions, keys = positions[order], keys[order]
+    tied, group = _ties(keys, None)
+    idx = np.nonzero(tied)[0]
+    depth = WINDOW
+    while idx.size:
+        sub = positions[idx]
+        keys = _windows(text, sub, depth)
+        order = order_by(keys, sub, group)
+        positions[idx] = sub[order]
+        tied, group = _ties(keys[order], group[order])
+        idx = idx[tied]
+        depth += WINDOW
+    return positions
+
+
+def _adjacent_lcp(text: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """LCP of each sorted suffix with the one before it (0 for the first)."""
+    lcp = np.zeros(len(positions), dtype=np.uint32)
+    active = np.arange(len(positions) - 1)
+    depth = 0
+    while active.size:
+        a = _windows(text, positions[active], depth)
+        b = _windows(text, positions[active + 1], depth)
+        eq = (a == b) & (a != SEP)
+        full = eq.all(axis=1)
+        done = ~full
+        lcp[active[done] + 1] = depth + np.argmin(eq[done], axis=1)
+        active = active[full]
+        depth += WINDOW
+    return lcp
+
+
+def _buckets(counts: np.ndarray, chunk: int) -> List[Tuple[int, int]]:
+    """Consecutive first-token id ranges holding about `chunk` suffixes each."""
+    cum = np.cumsum(counts)
+    ranges, lo = [], 1
+    while lo < len(counts):
+        hi = int(np.searchsorted(cum, cum[lo - 1] + chunk, side="right"))
+        hi = max(hi, lo + 1)
+        ranges.append((lo, min(hi, len(counts))))
+        lo = hi
+    return ranges
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+
+def build_suffix_array(json_dir: str, out_dir: Path, chunk: int = SA_CHUNK) -> Path:
+    out_dir = Path(out_dir)
+    tmp = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    vocab: Dict[str, int] = {"": SEP}
+    docs: List[Dict] = []
+    sections: List[Dict] = []
+    starts: List[int] = []
+    n_tokens = 0
+    with (tmp / "text.u32").open("wb") as fh:
+        for path, doc in iter_documents(json_dir):
+            ordinal = len(docs)
+            docs.append({
+                "doc_id": doc.get("doc_id") or path.stem,
+                "path": str(path),
+                "title": doc.get("title", ""),
+            })
+            for section in doc.get("sections", []):
+                tokens = tokenize(section_text(section))
+                if not tokens:
+                    continue
+                ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in tokens),
+                                  dtype=np.uint32, count=len(tokens))
+                sections.append({"doc": ordinal, "section_id": section.get("section_id", "")})
+                starts.append(n_tokens)
+                fh.write(np.append(ids, np.uint32(SEP)).tobytes())
+                n_tokens += len(tokens) + 1
+        fh.write(np.zeros(WINDOW, dtype=np.uint32).tobytes())
+
+    text = np.memmap(tmp / "text.u32", dtype=np.uint32, mode="r", shape=(n_tokens + WINDOW,))
+    counts = np.zeros(len(vocab), dtype=np.int64)
+    for start in range(0, n_tokens, _BLOCK):
+        counts += np.bincount(text[start:min(start + _BLOCK, n_tokens)], minlength=len(vocab))
+    counts[SEP] = 0
+    n_suffixes = int(counts.sum())
+
+    ranges = _buckets(counts, chunk)
+    with (tmp / "sa.i64").open("wb") as f_sa, (tmp / "lcp.u32").open("wb") as f_lcp:
+        for b, (lo, hi) in enumerate(ranges):
+            positions = np.concatenate([
+                np.nonzero((block >= lo) & (block < hi))[0] + start
+                for start in range(0, n_tokens, _BLOCK)
+                for block in [np.asarray(text[start:min(start + _BLOCK, n_tokens)])]
+            ]).astype(np.int64)
+            if not positions.size:
+                continue
+            positions = _sort_suffixes(text, positions)
+            f_sa.write(positions.tobytes())
+            f_lcp.write(_adjacent_lcp(text, positions).tobytes())
+            logger.info("Sorted bucket %d/%d (%d suffixes)", b + 1, len(ranges), positions.size)
+    del text
+
+    with (tmp / "starts.i64").open("wb") as fh:
+        fh.write(np.asarray(starts, dtype=np.int64).tobytes())
+    for name, payload in (("vocab.json", sorted(vocab, key=vocab.get)),
+                          ("docs.json", docs), ("sections.json", sections)):
+        with (tmp / name).open("w", encoding="utf-8") as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+    with (tmp / "meta.json").open("w", encoding="utf-8") as fh:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "n_tokens": n_tokens,
+            "n_suffixes": n_suffixes,
+            "n_sections": len(sections),
+            "n_docs": len(docs),
+            "vocab_size": len(vocab),
+            "chunk": chunk,
+        }, fh)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    logger.info("Suffix array: %d suffixes over %d docs → %s", n_suffixes, len(docs), out_dir)
+    return out_dir
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+
+def _open(path: Path, dtype, count: int) -> np.ndarray:
+    """Memory-mapped array as a plain ndarray view (memmap's per-item overhead hurts bisection)."""
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.asarray(np.memmap(path, dtype=dtype, mode="r", shape=(count,)))
+
+
+class SuffixArray:
+    """Memory-mapped suffix array with phrase lookup and maximal-repeat listing."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with (self.path / "meta.json").open("r", encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        with (self.path / "vocab.json").open("r", encoding="utf-8") as fh:
+            self.vocab: List[str] = json.load(fh)
+        with (self.path / "docs.json").open("r", encoding="utf-8") as fh:
+            self.docs: List[Dict] = json.load(fh)
+        with (self.path / "sections.json").open("r", encoding="utf-8") as fh:
+            self.sections: List[Dict] = json.load(fh)
+        self._ids = {token: i for i, token in enumerate(self.vocab)}
+        n = self.meta["n_tokens"]
+        self.text = _open(self.path / "text.u32", np.uint32, n + WINDOW)
+        self.sa = _open(self.path / "sa.i64", np.int64, self.meta["n_suffixes"])
+        self.lcp = _open(self.path / "lcp.u32", np.uint32, self.meta["n_suffixes"])
+        self.starts = _open(self.path / "starts.i64", np.int64, len(self.sections))
+        self._ordinals = {doc["doc_id"]: i for i, doc in enumerate(self.docs)}
+
+    def __len__(self) -> int:
+        return len(self.sa)
+
+    def encode(self, tokens: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self._ids.get(t, MISSING) for t in tokens),
+                           dtype=np.uint32, count=len(tokens))
+
+    def _compare(self, position: int, pattern: np.ndarray) -> int:
+        """Sign of (suffix at `position`) − `pattern`, over the pattern's length."""
+        window = np.asarray(self.text[position:position + len(pattern)])
+        if len(window) < len(pattern):
+            window = np.append(window, np.zeros(len(pattern) - len(window), np.uint32))
+        diff = np.nonzero(window != pattern)[0]
+        if not diff.size:
+            return 0
+        return -1 if window[diff[0]] < pattern[diff[0]] else 1
+
+    def _range(self, pattern: np.ndarray) -> Tuple[int, int]:
+        """`[lo, hi)` of suffixes starting with `pattern`: binary search, then the LCP run."""
+        if not len(pattern):
+            return 0, len(self.sa)
+        if (pattern == MISSING).any():
+            return 0, 0
+        lo, hi = 0, len(self.sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._compare(int(self.sa[mid]), pattern) < 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self.sa) or self._compare(int(self.sa[lo]), pattern) != 0:
+            return lo, lo
+        end = lo + 1
+        while end < len(self.sa):
+            block = np.asarray(self.lcp[end:end + 4096])
+            below = np.nonzero(block < len(pattern))[0]
+            if below.size:
+                return lo, end + int(below[0])
+            end += block.size
+        return lo, end
+
+    def _bisect(self, lo: int, hi: int, depth: int, token: int, right: bool) -> int:
+        text, sa = self.text, self.sa
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = int(text[sa[mid] + depth])
+            if t < token or (right and t == token):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _locate(self, position: int) -> Dict:
+        s = int(np.searchsorted(self.starts, position, side="right")) - 1
+        row = self.sections[s]
+        return {
+            "doc_id": self.docs[row["doc"]]["doc_id"],
+            "section_id": row["section_id"],
+            "offset": int(position - self.starts[s]),
+        }
+
+    def _doc_span(self, doc_id: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Token positions `[start, end)` of an indexed document, if it is indexed."""
+        if doc_id not in self._ordinals:
+            return None
+        owners = [row["doc"] for row in self.sections]
+        first = int(np.searchsorted(owners, self._ordinals[doc_id]))
+        last = int(np.searchsorted(owners, self._ordinals[doc_id], side="right"))
+        if first == last:
+            return None
+        end = int(self.starts[last]) if last < len(self.starts) else self.meta["n_tokens"]
+        return int(self.starts[first]), end
+
+    def _has_other(self, lo: int, hi: int, span: Optional[Tuple[int, int]]) -> bool:
+        if span is None or hi - lo > span[1] - span[0]:
+            return hi > lo
+        positions = np.asarray(self.sa[lo:hi])
+        return bool(((positions < span[0]) | (positions >= span[1])).any())
+
+    def find(self, phrase: str, limit: int = 100) -> Tuple[int, List[Dict]]:
+        """Occurrence count of a phrase, and up to `limit` `{doc_id, section_id, offset}`."""
+        tokens = tokenize(phrase)
+        if not tokens:
+            return 0, []
+        lo, hi = self._range(self.encode(tokens))
+        return hi - lo, [self._locate(int(p)) for p in self.sa[lo:min(hi, lo + limit)]]
+
+    def maximal_repeats(self, doc: Dict, min_len: int = 8, limit: int = 20) -> List[Dict]:
+        """
+        Every maximal span of a processed document that also occurs in the corpus.
+
+        A span is reported when it is at least `min_len` tokens, cannot be
+        extended to the right, and is not the tail of the span reported one
+        token earlier. Occurrences inside the document itself (when it is
+        indexed) are ignored. Each result is `{section_id, offset, length,
+        text, count, occurrences}`, longest first.
+        """
+        span = self._doc_span(doc.get("doc_id"))
+        repeats: List[Dict] = []
+        for section in doc.get("sections", []):
+            tokens = tokenize(section_text(section))
+            query = self.encode(tokens)
+            prev = 0
+            for i in range(len(query)):
+                depth = max(prev - 1, 0)
+                lo, hi = self._range(query[i:i + depth])
+                while i + depth < len(query) and query[i + depth] != MISSING:
+                    token = int(query[i + depth])
+                    nlo = self._bisect(lo, hi, depth, token, right=False)
+                    nhi = self._bisect(nlo, hi, depth, token, right=True)
+                    if not self._has_other(nlo, nhi, span):
+                        break
+                    lo, hi, depth = nlo, nhi, depth + 1
+                if depth >= min_len and depth >= prev:
+                    hits = [self._locate(int(p)) for p in self.sa[lo:hi]]
+                    if span is not None:
+                        hits = [h for h in hits if h["doc_id"] != doc["doc_id"]]
+                    repeats.append({
+                        "section_id": section.get("section_id", ""),
+                        "offset": i,
+                        "length": depth,
+                        "text": " ".join(tokens[i:i + depth]),
+                        "count": len(hits),
+                        "occurrences": hits[:limit],
+                    })
+                prev = depth
+        repeats.sort(key=lambda r: -r["length"])
+        return repeats
@@ -0,0 +1,103 @@
+"""
+table_index.py — Find reused results tables by their numeric fingerprints.
+
+Every table the extractor fingerprinted (`tables[].fingerprint.hashes`, see
+extract_script/tables.py) becomes one entry of a segment, keyed
+`<doc_id>#t<table_id>`. A query table is looked up key by key, so candidates
+come straight from the postings with no pairwise table comparison; the
+share of the query's keys an entry holds ranks it. Exact copies share every
+key, and reordered or lightly perturbed copies still share most (see the
+measurements in tables.py, which DEFAULT_MIN_SHARE is set against).
+
+Keys are recomputed from the stored cells, so outputs extracted before a
+fingerprint change are indexed with the current keys. Keys held by more
+than DEFAULT_MAX_DF of all tables (at least DEFAULT_MIN_TABLES) are written
+to stop_keys.json and dropped from the index and from every query, as stop
+shingles are for text.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterator, List, Tuple
+
+from extract_script.tables import table_fingerprint
+from indexer.corpus import iter_documents
+from indexer.segment import Segment, SegmentWriter
+from indexer.stopshingles import frequent_keys, load_stop_shingles, save_stop_shingles
+
+logger = logging.getLogger("indexer.tables")
+
+TABLE_DIR = "tables"
+STOP_KEYS_FILE = "stop_keys.json"
+DEFAULT_MIN_SHARE = 0.35
+DEFAULT_MAX_DF = 0.02
+DEFAULT_MIN_TABLES = 50
+
+
+def iter_table_keys(doc: Dict, stop: AbstractSet[int] = frozenset()) -> Iterator[Tuple[Dict, List[int]]]:
+    """Yield `(table, hashes)` for every fingerprinted table of a processed document."""
+    for table in doc.get("tables", ()):
+        if table.get("cells"):
+            hashes = table_fingerprint(table["cells"])["hashes"]
+        else:
+            hashes = table.get("fingerprint", {}).get("hashes", ())
+        keys = [k for k in (int(h, 16) for h in hashes) if k not in stop]
+        if keys:
+            yield table, keys
+
+
+def _entry_id(doc_id: str, table: Dict) -> str:
+    return f"{doc_id}#t{table.get('table_id', '')}"
+
+
+def build_table_index(json_dir: str, out_dir: Path, max_df: float = DEFAULT_MAX_DF,
+                      min_tables: int = DEFAULT_MIN_TABLES) -> Path:
+    entries = [
+        (_entry_id(doc.get("doc_id") or path.stem, table), hashes, {
+            "path": str(path),
+            "page": table.get("page"),
+            "caption": table.get("caption", "")[:200],
+        })
+        for path, doc in iter_documents(json_dir)
+        for table, hashes in iter_table_keys(doc)
+    ]
+    payload = frequent_keys((hashes for _, hashes, _ in entries), max_df, min_tables)
+    stop = frozenset(payload["hashes"])
+    writer = SegmentWriter(shingle_size=0)
+    for entry_id, hashes, meta in entries:
+        keys = [h for h in hashes if h not in stop]
+        if keys:
+            writer.add(entry_id, keys, **meta)
+    logger.info("Indexing %d table(s)", len(writer.docs))
+    out_dir = writer.write(Path(out_dir))
+    save_stop_shingles(payload, out_dir / STOP_KEYS_FILE)
+    return out_dir
+
+
+def search_tables(index_dir: Path, doc: Dict, top_k: int = 5,
+                  min_share: float = DEFAULT_MIN_SHARE) -> List[Dict]:
+    """
+    Corpus tables matching the tables of `doc`, best first.
+
+    `share` is the fraction of the query table's keys found in the match.
+    Tables of `doc` itself are skipped.
+    """
+    segment = Segment(Path(index_dir))
+    stop = load_stop_shingles(Path(index_dir) / STOP_KEYS_FILE)
+    doc_id = doc.get("doc_id", "")
+    hits: List[Dict] = []
+    for table, hashes in iter_table_keys(doc, stop):
+        for entry_id, shared, share in segment.search(hashes, top_k + 1):
+            if share < min_share or entry_id.startswith(f"{doc_id}#t"):
+                continue
+            hits.append({
+                "table_id": table.get("table_id"),
+                "caption": table.get("caption", ""),
+                "match": entry_id,
+                "shared": shared,
+                "share": share,
+            })
+    hits.sort(key=lambda hit: -hit["share"])
+    return hits
@@ -5,6 +5,8 @@ import io
 from PIL import Image
 from paddleocr import PaddleOCR
 
+from image_hash import image_hashes
+
 OUTPUT_IMG_DIR = "images"
 os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
 
@@ -37,6 +39,7 @@ def process_pdf(pdf_path):
 
             image_bytes = base_image["image"]
             image = Image.open(io.BytesIO(image_bytes))
+            hashes = image_hashes(image)
 
             img_path = os.path.join(
                 OUTPUT_IMG_DIR,
@@ -58,6 +61,9 @@ def process_pdf(pdf_path):
                 "type": "figure",
                 "page": page_idx,
                 "image_path": img_path,
+                "xref": xref,
+                "phash": hashes["phash"],
+                "dhash": hashes["dhash"],
                 "ocr_text": ocr_texts
             })
 
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# extract_script modules import their siblings by bare name, as when run from
+# that directory; the indexer package is imported from the repository root.
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "extract_script"))
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,48 @@
+import random
+import re
+
+import numpy as np
+
+from citations import match_citations, scan_citations, totals
+
+_PIECES = [
+    "we follow prior work", "[1]", "[2, 3]", "[12,4]", "(Smith, 2020)", "(Nguyen et al., 2019a)",
+    "(Lee and\n\nPark, 2021)", "\n\n", "\n", "[", "]", "(see 2020)", "results", "(Tran,", "2018)",
+]
+
+
+def _per_paragraph(text):
+    return [c for p in re.split(r"\n\s*\n", text) for c in match_citations(p)]
+
+
+def _random_texts(rng, n):
+    return ["".join(rng.choice(_PIECES) + rng.choice(["", " "]) for _ in range(rng.randint(0, 25)))
+            for _ in range(n)]
+
+
+def test_bulk_scan_matches_per_paragraph_counts():
+    rng = random.Random(11)
+    texts = _random_texts(rng, 300) + ["", "(Lee and\n\nPark, 2021) [1]"]
+    scan = scan_citations(texts)
+
+    expected = [_per_paragraph(t) for t in texts]
+    assert scan.counts.tolist() == [len(c) for c in expected]
+    for i, citations in enumerate(expected):
+        assert scan.citations(i) == list(citations)
+
+
+def test_whole_text_scan_ignores_paragraphs():
+    texts = ["(Lee and\n\nPark, 2021)", "[1] and [2]"]
+    assert scan_citations(texts, split_paragraphs=False).counts.tolist() == [1, 2]
+    assert scan_citations(texts).counts.tolist() == [0, 2]
+
+
+def test_matches_never_cross_texts():
+    texts = ["ends with [1", "2] starts here", "(Smith", ", 2020)"]
+    assert scan_citations(texts).counts.tolist() == [0, 0, 0, 0]
+
+
+def test_totals_sum_sections_per_document():
+    counts = np.array([2, 0, 3, 1])
+    owner = np.array([0, 0, 2, 2])
+    assert totals(counts, owner, 3).tolist() == [2, 0, 4]
@@ -0,0 +1,57 @@
+from job_ledger import JobLedger
+
+
+def _ledger(tmp_path):
+    return JobLedger(tmp_path / "ledger.sqlite")
+
+
+def _attempts(ledger, path):
+    return ledger._db.execute("SELECT status, attempts FROM jobs WHERE pdf_path = ?",
+                              (path,)).fetchone()
+
+
+def test_queued_files_keep_their_retries_after_a_crash(tmp_path):
+    paths = ["a.pdf", "b.pdf", "c.pdf"]
+    for _ in range(5):                      # five runs, each dying after starting a.pdf
+        ledger = _ledger(tmp_path)
+        selected = ledger.select(paths, resume=True, max_retries=2)
+        ledger.mark_queued(selected)
+        if "a.pdf" in selected:
+            ledger.mark_started("a.pdf")
+        ledger.close()
+
+    ledger = _ledger(tmp_path)
+    assert _attempts(ledger, "a.pdf") == ("running", 3)
+    assert _attempts(ledger, "b.pdf") == ("pending", 0)
+    assert ledger.select(paths, resume=True, max_retries=2) == ["b.pdf", "c.pdf"]
+
+
+def test_failures_are_retried_up_to_the_cap(tmp_path, caplog):
+    ledger = _ledger(tmp_path)
+    for _ in range(3):
+        assert ledger.select(["a.pdf"], resume=True, max_retries=2) == ["a.pdf"]
+        ledger.mark_queued(["a.pdf"])
+        ledger.mark_started("a.pdf")
+        ledger.mark_failed("a.pdf", "timeout", 1.0, "timed out")
+    assert ledger.select(["a.pdf"], resume=True, max_retries=2) == []
+    assert "out of retries" in caplog.text
+
+
+def test_done_is_skipped_unless_bytes_changed(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.mark_queued(["a.pdf"], {"a.pdf": "h1"})
+    ledger.mark_started("a.pdf")
+    ledger.mark_done("a.pdf", 2.0, "a_processed.json")
+    assert ledger.select(["a.pdf"], resume=True, max_retries=2, hash_of=lambda p: "h1") == []
+    assert ledger.select(["a.pdf"], resume=True, max_retries=2,
+                         hash_of=lambda p: "h2") == ["a.pdf"]
+    assert ledger.select(["a.pdf"], resume=False, max_retries=2) == ["a.pdf"]
+
+
+def test_report_counts_pending(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.mark_queued(["a.pdf", "b.pdf"])
+    ledger.mark_started("a.pdf")
+    report = ledger.format_report()
+    assert "running         1" in report
+    assert "pending         1" in report
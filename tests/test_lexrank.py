@@ -0,0 +1,30 @@
+import random
+
+import numpy as np
+
+from lexrank import lexrank_scores, plaintext_sentences, summarize_texts
+
+_WORDS = ("model attention token layer training loss data image feature network "
+          "results method baseline accuracy dataset encoder").split()
+
+
+def _text(rng):
+    paragraphs = [
+        " ".join(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 12))).capitalize() + "."
+                 for _ in range(rng.randint(1, 6)))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return "\n\n".join(paragraphs)
+
+
+def _alone(text, count):
+    sentences = plaintext_sentences(text)
+    best = np.argsort(-lexrank_scores(sentences), kind="stable")[:count]
+    return [sentences[i] for i in sorted(best.tolist())]
+
+
+def test_batched_summaries_match_texts_summarised_alone():
+    rng = random.Random(5)
+    texts = [_text(rng) for _ in range(80)] + ["", "RESULTS", "One sentence only."]
+    rng.shuffle(texts)
+    assert summarize_texts(texts, 2) == [_alone(t, 2) for t in texts]
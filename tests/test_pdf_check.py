@@ -0,0 +1,65 @@
+import json
+
+import pdf_check
+from pdf_check import quarantine, validate_pdf
+
+
+def _pdf_bytes(xref_shift=0):
+    """A one-page PDF padded past MIN_PDF_BYTES, with its xref offset moved by `xref_shift`."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n%" + b"x" * 2000 + b"\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % (xref + xref_shift)
+    return bytes(out)
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_complete_pdf_passes(tmp_path):
+    assert validate_pdf(_write(tmp_path, "ok.pdf", _pdf_bytes())) is None
+
+
+def test_shifted_xref_offset_is_left_to_the_repairing_reader(tmp_path):
+    assert validate_pdf(_write(tmp_path, "shifted.pdf", _pdf_bytes(xref_shift=7))) is None
+    assert validate_pdf(_write(tmp_path, "beyond.pdf", _pdf_bytes(xref_shift=10 ** 6))) is None
+
+
+def test_broken_files_are_rejected(tmp_path):
+    data = _pdf_bytes()
+    assert "truncated" in validate_pdf(_write(tmp_path, "cut.pdf", data[: len(data) - 40]))
+    assert "too small" in validate_pdf(_write(tmp_path, "empty.pdf", b""))
+    html = b"<!DOCTYPE html><html>" + b" " * 2000 + b"</html>"
+    assert "header" in validate_pdf(_write(tmp_path, "page.pdf", html))
+
+
+def test_quarantine_keeps_every_copy(tmp_path):
+    qdir = tmp_path / "quarantine"
+    first = quarantine(_write(tmp_path, "a.pdf", b"one"), "truncated", qdir)
+    second = quarantine(_write(tmp_path, "a.pdf", b"two"), "truncated", qdir)
+    assert first != second
+    assert first.read_bytes() == b"one" and second.read_bytes() == b"two"
+    entries = [json.loads(line) for line in (qdir / pdf_check.REQUEUE_FILENAME).open()]
+    assert [e["file"] for e in entries] == ["a.pdf", "a.pdf"]
+    assert [e["quarantined_as"] for e in entries] == [first.name, second.name]
+
+
+def test_quarantine_same_bytes_twice(tmp_path):
+    qdir = tmp_path / "quarantine"
+    first = quarantine(_write(tmp_path, "a.pdf", b"same"), "truncated", qdir)
+    second = quarantine(_write(tmp_path, "a.pdf", b"same"), "truncated", qdir)
+    assert first.exists() and second.exists() and first != second
@@ -0,0 +1,92 @@
+import json
+import random
+
+import numpy as np
+
+from indexer import suffix_array
+from indexer.suffix_array import SEP, WINDOW, SuffixArray, _adjacent_lcp, _sort_suffixes
+
+
+def _corpus_text(rng):
+    """Token ids with separators; a few sections are copied so ties run past WINDOW."""
+    sections = [[rng.randint(1, 4) for _ in range(rng.randint(1, 40))] for _ in range(30)]
+    sections += [list(sections[i]) for i in range(0, 30, 5)]
+    sections += [sections[1][: len(sections[1]) // 2] + [rng.randint(1, 4)]]
+    ids = [t for section in sections for t in section + [SEP]]
+    return np.array(ids + [SEP] * WINDOW, dtype=np.uint32), len(ids)
+
+
+def _prefix(text, p):
+    """Tokens of the suffix at `p` up to and including its separator."""
+    end = p
+    while text[end] != SEP:
+        end += 1
+    return tuple(int(t) for t in text[p:end + 1])
+
+
+def _common(a, b):
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n] and a[n] != SEP:
+        n += 1
+    return n
+
+
+def test_sort_and_lcp_match_brute_force():
+    rng = random.Random(3)
+    for _ in range(5):
+        text, n = _corpus_text(rng)
+        positions = np.nonzero(text[:n] != SEP)[0].astype(np.int64)
+        rng.shuffle(positions)
+        order = _sort_suffixes(text, positions.copy())
+
+        assert sorted(order.tolist()) == sorted(positions.tolist())
+        keys = [_prefix(text, p) for p in order.tolist()]
+        assert keys == sorted(keys)
+
+        lcp = _adjacent_lcp(text, order)
+        assert lcp[0] == 0
+        assert lcp[1:].tolist() == [_common(a, b) for a, b in zip(keys, keys[1:])]
+
+
+def _doc(doc_id, *texts):
+    return {
+        "doc_id": doc_id,
+        "title": doc_id,
+        "sections": [{"section_id": str(i), "summary": t} for i, t in enumerate(texts)],
+    }
+
+
+def _build(tmp_path, docs, chunk=suffix_array.SA_CHUNK):
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    for doc in docs:
+        (json_dir / f"{doc['doc_id']}_processed.json").write_text(json.dumps(doc))
+    return SuffixArray(suffix_array.build_suffix_array(str(json_dir), tmp_path / "sa", chunk))
+
+
+SHARED = ("the proposed encoder aligns every token with its nearest prototype "
+          "before the attention weights are normalised over all heads")
+
+
+def test_find_counts_every_occurrence(tmp_path):
+    index = _build(tmp_path, [
+        _doc("a", f"we show that {SHARED} in all cases"),
+        _doc("b", "an unrelated method", f"here {SHARED}"),
+        _doc("c", "nothing shared at all"),
+    ], chunk=8)
+
+    count, hits = index.find("nearest prototype before the attention")
+    assert count == 2
+    assert {h["doc_id"] for h in hits} == {"a", "b"}
+    assert index.find("prototype unseen")[0] == 0
+    assert index.find("all heads in")[0] == 1       # does not run across a section break
+
+
+def test_maximal_repeats_ignores_the_document_itself(tmp_path):
+    query = _doc("a", f"we show that {SHARED} in all cases")
+    index = _build(tmp_path, [query, _doc("b", f"here {SHARED}")])
+
+    repeats = index.maximal_repeats(query, min_len=8)
+    assert repeats[0]["text"] == SHARED
+    assert repeats[0]["count"] == 1
+    assert repeats[0]["occurrences"][0]["doc_id"] == "b"
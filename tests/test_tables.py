@@ -0,0 +1,50 @@
+import json
+import random
+
+from tables import parse_number, table_fingerprint
+
+from indexer import table_index
+
+
+def _cells(values):
+    header = [["Method", "A", "B", "C", "D"]]
+    return header + [[f"m{i}"] + [f"{v:.1f}" for v in row] for i, row in enumerate(values)]
+
+
+def _random_table(rng):
+    return [[round(rng.uniform(70, 95), 1) for _ in range(4)] for _ in range(5)]
+
+
+def _doc(doc_id, values):
+    return {"doc_id": doc_id, "tables": [{"table_id": "1", "cells": _cells(values)}]}
+
+
+def test_parse_number():
+    assert parse_number("85.3") == 85.3
+    assert parse_number("**85.3** ± 0.2") == 85.3
+    assert parse_number("12,345") == 12345
+    assert parse_number("−3.1%") == -3.1
+    assert parse_number("ResNet-50") is None
+
+
+def test_reordered_copy_keeps_order_free_keys():
+    values = _random_table(random.Random(0))
+    shuffled = [row[::-1] for row in values[::-1]]
+    a = set(table_fingerprint(_cells(values))["hashes"])
+    b = set(table_fingerprint(_cells(shuffled))["hashes"])
+    assert len(a & b) / len(a) > 0.9
+
+
+def test_perturbed_copies_are_found_and_unrelated_tables_are_not(tmp_path):
+    rng = random.Random(7)
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    tables = [_random_table(rng) for _ in range(400)]
+    for n, values in enumerate(tables):
+        (json_dir / f"p{n:04d}_processed.json").write_text(json.dumps(_doc(f"p{n}", values)))
+    index_dir = table_index.build_table_index(str(json_dir), tmp_path / "tables")
+
+    for n in range(40):
+        nudged = [[round(v + rng.choice((-0.1, 0.1)), 1) for v in row] for row in tables[n]]
+        hits = table_index.search_tables(index_dir, _doc("query", nudged), top_k=3)
+        assert [hit["match"] for hit in hits] == [f"p{n}#t1"]